@@ -0,0 +1,224 @@
+"""Заготовки для списков в админке, которые не тормозят на больших
+таблицах."""
+from datetime import timedelta
+
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.contrib.admin.views.main import ChangeList
+from django.core import checks
+from django.core.paginator import Paginator
+from django.db.models.functions import Left
+from django.template.response import TemplateResponse
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from .models import SlowQuery
+
+# Дальше этого числа строки в списке не считаются
+COUNT_LIMIT = 10000
+
+
+class BoundedCountPaginator(Paginator):
+    """Считает строки не дальше COUNT_LIMIT.
+
+    COUNT(*) по миллионам строк читает всю таблицу, а из подзапроса
+    с LIMIT база останавливается на первых COUNT_LIMIT строках. Если
+    их больше, страниц просто показывается меньше, чем есть.
+    """
+
+    @cached_property
+    def count(self):
+        # Порядок для подсчёта не важен, а сортировка мешает базе
+        # остановиться раньше
+        return self.object_list.order_by()[:COUNT_LIMIT].count()
+
+
+class PreviewChangeList(ChangeList):
+    """Достаёт укороченный текст только для строк текущей страницы.
+
+    Аннотация на весь queryset попала бы и в подсчёт строк, и в запросы
+    навигации по датам, поэтому начало текста читается отдельным
+    запросом по первичным ключам страницы.
+    """
+
+    def get_results(self, request):
+        super().get_results(request)
+        self.result_list = list(self.result_list)
+        model_admin = self.model_admin
+        previews = dict(
+            self.root_queryset.model._default_manager.filter(
+                pk__in=[obj.pk for obj in self.result_list]
+            ).annotate(
+                preview=Left(
+                    model_admin.preview_field,
+                    model_admin.preview_length + 1,
+                ),
+            ).order_by().values_list('pk', 'preview')
+        )
+        for obj in self.result_list:
+            obj.preview = previews.get(obj.pk) or ''
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Список без точных подсчётов и с укороченным текстом.
+
+    Поле preview_field не читается из базы целиком: вместо него в списке
+    выводятся первые preview_length символов, обрезанные в базе.
+
+    Поиск по тексту (LIKE '%...%') читает каждую строку, поэтому без
+    выбранного в date_hierarchy или фильтре периода он идёт только по
+    строкам за последние search_days дней — их база находит по индексу
+    даты. Об этом в списке выводится сообщение.
+    """
+
+    preview_field = 'text'
+    preview_length = 80
+    search_days = 30
+    paginator = BoundedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        match = request.resolver_match
+        if match is None or not match.url_name.endswith('_changelist'):
+            # В форме редактирования нужен полный текст
+            return queryset
+        return queryset.defer(self.preview_field)
+
+    def get_changelist(self, request, **kwargs):
+        return PreviewChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        date_field = self.date_hierarchy
+        if search_term and date_field and not any(
+            key.startswith(f'{date_field}__') for key in request.GET
+        ):
+            since = timezone.now() - timedelta(days=self.search_days)
+            queryset = queryset.filter(**{f'{date_field}__gte': since})
+            self.message_user(
+                request,
+                f'Поиск по тексту идёт за последние {self.search_days} '
+                f'дней. Чтобы искать раньше, выберите период.',
+                messages.INFO,
+            )
+        return super().get_search_results(request, queryset, search_term)
+
+    def get_list_display(self, request):
+        return tuple(
+            'preview' if name == self.preview_field else name
+            for name in super().get_list_display(request)
+        )
+
+    def preview(self, obj):
+        text = obj.preview
+        if len(text) > self.preview_length:
+            text = text[:self.preview_length].rstrip() + '…'
+        return text
+    preview.short_description = 'Текст'
+
+
+class BackgroundActionsMixin:
+    """Действия над выбранными строками, которые выполняет очередь задач.
+
+    Стандартное удаление отключено: оно загружает все выбранные объекты
+    вместе со связанными прямо в запросе к админке.
+    """
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    def confirm_action(self, request, queryset, title, form=None):
+        """Страница подтверждения; отправляет действие повторно с apply."""
+        context = {
+            **self.admin_site.each_context(request),
+            'title': title,
+            'opts': self.model._meta,
+            'count': queryset.count(),
+            'form': form,
+            'action': request.POST['action'],
+            'selected': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            'select_across': request.POST.get('select_across', '0'),
+        }
+        return TemplateResponse(request, 'admin/bulk_action.html', context)
+
+    def report_jobs(self, request, jobs):
+        self.message_user(
+            request,
+            f'Поставлено в очередь задач: {jobs}. '
+            'Ход выполнения виден в разделе «Задачи».',
+        )
+
+
+class SoftDeleteAdminMixin(BackgroundActionsMixin):
+    """Удаление в админке только помечает объект функцией
+    soft_delete_function(obj), а зависимые строки удаляет фоновая задача.
+
+    soft_delete_function обязательна: без неё manage.py check сообщает
+    об ошибке core.E001.
+    """
+
+    soft_delete_function = None
+
+    def check(self, **kwargs):
+        errors = super().check(**kwargs)
+        if self.soft_delete_function is None:
+            errors.append(checks.Error(
+                'Не задана soft_delete_function.',
+                obj=type(self),
+                id='core.E001',
+            ))
+        return errors
+
+    def soft_delete(self, obj):
+        # Через класс, чтобы функция не стала методом
+        type(self).soft_delete_function(obj)
+
+    def get_deleted_objects(self, objs, request):
+        # Связанные объекты не собираем: их может быть очень много,
+        # а удалит их всё равно фоновая задача
+        return [str(obj) for obj in objs], {}, set(), []
+
+    def delete_model(self, request, obj):
+        self.soft_delete(obj)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset.iterator():
+            self.soft_delete(obj)
+
+    def delete_in_background(self, request, queryset):
+        if 'apply' not in request.POST:
+            return self.confirm_action(
+                request, queryset,
+                f'Удаление: {self.model._meta.verbose_name_plural}',
+            )
+        jobs = queryset.count()
+        self.delete_queryset(request, queryset)
+        self.report_jobs(request, jobs)
+    delete_in_background.short_description = 'Удалить выбранные'
+    delete_in_background.allowed_permissions = ('delete',)
+
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    """Журнал медленных запросов только для чтения; пишет его
+    SlowQueryMiddleware."""
+    list_display = ('shape_preview', 'count', 'total_time', 'max_time',
+                    'view', 'last_seen')
+    search_fields = ('shape', 'view')
+    readonly_fields = ('shape', 'sql', 'params', 'view', 'plan', 'stack',
+                       'count', 'total_time', 'max_time', 'first_seen',
+                       'last_seen')
+    exclude = ('fingerprint',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def shape_preview(self, obj):
+        return str(obj)
+    shape_preview.short_description = 'Вид запроса'
@@ -0,0 +1,108 @@
+"""Подсчёт ссылок на файлы хранилища с адресацией по содержимому.
+
+Когда ссылок на файл не остаётся, он удаляется не сразу, а фоновой
+задачей после BLOB_GRACE_PERIOD: за это время тот же файл может быть
+загружен снова, и тогда удалять его нельзя.
+
+Хранилище отмечает каждую запись файла (touch) до того, как проверит,
+есть ли он на диске, а collect удаляет строку и файл в одной транзакции
+и только если строку давно не трогали. Запись строки упирается
+в блокировку транзакции collect, поэтому загрузка либо продлевает срок
+до удаления, либо видит, что файла уже нет, и пишет его заново.
+Файл, который загрузили, но так и не сослались на него (форма
+не прошла проверку), collect тоже удалит.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from jobs.queue import enqueue_on_commit
+from .models import MediaBlob
+
+COLLECT_TASK = 'core.collect_blobs'
+
+
+def grace_period():
+    return getattr(settings, 'BLOB_GRACE_PERIOD', 60 * 60)
+
+
+def touch(name):
+    """Отмечает, что файл только что записан или загружен снова.
+
+    Без ссылок он проживёт ещё grace_period(): за это время сохранится
+    пост, который на него сошлётся.
+    """
+    now = timezone.now()
+    MediaBlob.objects.bulk_create(
+        [MediaBlob(name=name, released=now)], ignore_conflicts=True
+    )
+    if MediaBlob.objects.filter(name=name, refcount=0).update(released=now):
+        # Ссылок нет — файл ждёт сборщика, как после release()
+        enqueue_on_commit(
+            COLLECT_TASK, delay=grace_period(), dedupe_key=COLLECT_TASK
+        )
+
+
+def acquire(name):
+    """Добавляет ссылку на файл."""
+    if not name:
+        return
+    MediaBlob.objects.bulk_create(
+        [MediaBlob(name=name)], ignore_conflicts=True
+    )
+    MediaBlob.objects.filter(name=name).update(
+        refcount=F('refcount') + 1, released=None
+    )
+
+
+def release(name, count=1):
+    """Убирает count ссылок на файл; последняя ссылка планирует удаление.
+
+    Файлы, которых нет в учёте, не трогаем.
+    """
+    if not name:
+        return
+    with transaction.atomic():
+        MediaBlob.objects.filter(name=name, refcount__gt=0).update(
+            refcount=Greatest(F('refcount') - count, 0)
+        )
+        orphaned = MediaBlob.objects.filter(
+            name=name, refcount=0, released__isnull=True
+        ).update(released=timezone.now())
+    if orphaned:
+        enqueue_on_commit(
+            COLLECT_TASK, delay=grace_period(), dedupe_key=COLLECT_TASK
+        )
+
+
+def collect(storage, now=None):
+    """Удаляет файлы без ссылок, у которых истёк срок ожидания.
+
+    Возвращает список удалённых имён.
+    """
+    # sorl импортируется при первой сборке, а не при старте процесса
+    from sorl.thumbnail import delete as delete_with_thumbnails
+    from sorl.thumbnail.images import ImageFile
+
+    deadline = (now or timezone.now()) - timedelta(seconds=grace_period())
+    collected = []
+    candidates = MediaBlob.objects.filter(
+        refcount=0, released__lte=deadline
+    ).values_list('name', flat=True)
+    for name in candidates:
+        # Файл удаляется в той же транзакции, что и строка: touch
+        # дождётся её конца (см. описание модуля)
+        with transaction.atomic():
+            deleted, _ = MediaBlob.objects.filter(
+                name=name, refcount=0, released__lte=deadline
+            ).delete()
+            if deleted:
+                # Удаляет и сам файл, и его миниатюры вместе с записями
+                # в хранилище ключей sorl
+                delete_with_thumbnails(ImageFile(name, storage))
+                collected.append(name)
+    return collected
@@ -0,0 +1,179 @@
+"""Кеширование страниц с инвалидацией по тегам.
+
+Каждый тег ("group:cats", "post:42" и т. п.) хранит в кеше случайный
+токен. Закешированная страница запоминает токены своих тегов
+и считается устаревшей, как только любой из них сменился или пропал.
+Поэтому сброс тега — это одно удаление ключа, а не поиск всех страниц.
+
+fetch_fresh — значение с защитой от одновременного пересчёта (см. ниже).
+"""
+import hashlib
+import math
+import random
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+
+TAG_KEY_PREFIX = 'cache_tag:'
+
+
+def is_shared(alias):
+    """Видят ли кеш alias все процессы (не locmem и не dummy)."""
+    return settings.CACHES[alias]['BACKEND'] not in getattr(
+        settings, 'PROCESS_LOCAL_CACHES', ()
+    )
+
+
+def get_page_cache():
+    return caches[getattr(settings, 'PAGE_CACHE_ALIAS', 'default')]
+
+
+def _tag_key(tag):
+    # В слагах и именах бывает кириллица, а ключи memcached — только ASCII
+    return TAG_KEY_PREFIX + hashlib.md5(tag.encode()).hexdigest()
+
+
+def get_tag_tokens(tags, create=False):
+    """Возвращает {тег: токен} для известных кешу тегов.
+
+    С create=True для отсутствующих тегов заводятся новые токены.
+    """
+    cache = get_page_cache()
+    keys = {_tag_key(tag): tag for tag in tags}
+    tokens = {
+        keys[key]: token for key, token in cache.get_many(keys).items()
+    }
+    if create:
+        for key, tag in keys.items():
+            if tag not in tokens:
+                token = uuid.uuid4().hex
+                # add() не перетирает токен, заведённый параллельно
+                if not cache.add(key, token, timeout=None):
+                    token = cache.get(key)
+                tokens[tag] = token
+    return tokens
+
+
+def invalidate_tags(*tags):
+    """Помечает устаревшими все страницы, закешированные с этими тегами."""
+    tags = {tag for tag in tags if tag}
+    if tags:
+        get_page_cache().delete_many([_tag_key(tag) for tag in tags])
+
+
+def skip_page_cache(request):
+    """Не класть текущую страницу в кеш страниц.
+
+    Нужно, когда часть страницы взята из другого кеша (фрагмент
+    шаблона): она может быть старше токенов тегов страницы, и после
+    сброса тега устаревшая страница снова закешировалась бы под
+    свежими токенами.
+    """
+    request.skip_page_cache = True
+
+
+def page_cache(tags):
+    """Разрешает кешировать страницу целиком для анонимных посетителей.
+
+    tags — функция, получающая именованные аргументы из URL
+    и возвращающая теги страницы. Дополнительные теги, известные
+    только после рендеринга, view может положить в `response.cache_tags`.
+    """
+    def decorator(view):
+        view.page_cache_tags = tags
+        return view
+    return decorator
+
+
+# Пересчёт с защитой от «набега»
+
+FRESH_SUFFIX = ':fresh'
+LOCK_SUFFIX = ':lock'
+# Как часто ждущий запрос проверяет, не посчитал ли значение другой
+WAIT_INTERVAL = 0.05
+
+
+def fetch_fresh(cache, key, compute, timeout, stale=60, lock_timeout=10,
+                wait=1, beta=1.0):
+    """Возвращает (значение, состояние) для key, при необходимости
+    пересчитывая его через compute().
+
+    Само значение лежит под key как есть, на timeout + stale секунд,
+    поэтому обычный cache.get(key) и cache.delete(key) работают
+    по-прежнему. Рядом, на timeout секунд, хранится отметка свежести.
+    Когда она истекает, значение пересчитывает один запрос — тот, что
+    взял короткую блокировку, — а остальные отдают устаревшее значение.
+    Пересчёт может начаться и раньше срока, с вероятностью, растущей
+    к его концу и пропорциональной времени прошлого пересчёта (beta —
+    множитель), чтобы срок не истекал под нагрузкой. Если значения нет
+    вовсе, запросы до wait секунд ждут того, кто его считает.
+
+    Состояние: 'hit', 'stale' (отдано устаревшее), 'early' (пересчитано
+    до срока) или 'miss'.
+    """
+    if timeout is None:
+        value = cache.get(key)
+        if value is not None:
+            return value, 'hit'
+        value = compute()
+        cache.set(key, value, None)
+        return value, 'miss'
+
+    fresh_key = key + FRESH_SUFFIX
+    entries = cache.get_many([key, fresh_key])
+    value = entries.get(key)
+    fresh = entries.get(fresh_key)
+    if value is not None:
+        if fresh is not None and not expires_early(fresh, beta):
+            return value, 'hit'
+        status = 'early' if fresh is not None else 'stale'
+        if not acquire(cache, key, lock_timeout):
+            # Пересчитывает другой запрос
+            return value, 'hit' if fresh is not None else 'stale'
+        return recompute(cache, key, compute, timeout, stale), status
+
+    if acquire(cache, key, lock_timeout):
+        return recompute(cache, key, compute, timeout, stale), 'miss'
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        value = cache.get(key)
+        if value is not None:
+            return value, 'hit'
+    # Не дождались — считаем сами, без блокировки
+    value, _ = compute_timed(compute)
+    return value, 'miss'
+
+
+def expires_early(fresh, beta):
+    """Вероятностный досрочный пересчёт (XFetch): fresh — срок свежести
+    и длительность прошлого пересчёта."""
+    deadline, delta = fresh
+    if not beta or not delta:
+        return False
+    # 1 - random() лежит в (0, 1], логарифм не уходит в минус бесконечность
+    return time.time() - delta * beta * math.log(
+        1 - random.random()
+    ) >= deadline
+
+
+def acquire(cache, key, lock_timeout):
+    return cache.add(key + LOCK_SUFFIX, True, lock_timeout)
+
+
+def compute_timed(compute):
+    started = time.monotonic()
+    value = compute()
+    return value, time.monotonic() - started
+
+
+def recompute(cache, key, compute, timeout, stale):
+    try:
+        value, delta = compute_timed(compute)
+        cache.set(key, value, timeout + stale)
+        cache.set(key + FRESH_SUFFIX, (time.time() + timeout, delta), timeout)
+    finally:
+        cache.delete(key + LOCK_SUFFIX)
+    return value
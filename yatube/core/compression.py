@@ -0,0 +1,105 @@
+"""Общие помощники для сжатия ответов и статики (gzip и brotli)."""
+import zlib
+
+try:
+    import brotli
+except ImportError:  # brotli — необязательная зависимость
+    brotli = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+# Для статики, которая сжимается один раз при collectstatic,
+# можно позволить себе максимальную степень сжатия.
+STATIC_GZIP_LEVEL = 9
+STATIC_BROTLI_QUALITY = 11
+# 16 + 15: zlib пишет gzip-заголовок с нулевым mtime,
+# поэтому одинаковые данные сжимаются в одинаковые байты.
+GZIP_WBITS = 31
+
+COMPRESSIBLE_EXTENSIONS = (
+    '.css', '.js', '.html', '.svg', '.json', '.txt', '.xml', '.ico',
+    '.map', '.eot', '.ttf', '.otf',
+)
+
+
+def available_encodings():
+    """Кодировки, которые умеет сервер, в порядке предпочтения."""
+    if brotli is not None:
+        return ('br', 'gzip')
+    return ('gzip',)
+
+
+def parse_accept_encoding(header):
+    """Разбирает Accept-Encoding в словарь {кодировка: q}."""
+    accepted = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+def choose_encoding(header, encodings=None):
+    """Выбирает лучшую кодировку из encodings, которую принимает клиент.
+
+    При равных q побеждает кодировка, стоящая раньше в encodings.
+    """
+    if not header:
+        return None
+    if encodings is None:
+        encodings = available_encodings()
+    accepted = parse_accept_encoding(header)
+    best, best_quality = None, 0.0
+    for coding in encodings:
+        quality = accepted.get(coding, accepted.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def compress(data, encoding, static=False):
+    """Сжимает байты выбранной кодировкой."""
+    if encoding == 'br':
+        quality = STATIC_BROTLI_QUALITY if static else BROTLI_QUALITY
+        return brotli.compress(data, quality=quality)
+    if encoding == 'gzip':
+        level = STATIC_GZIP_LEVEL if static else GZIP_LEVEL
+        compressor = zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+        return compressor.compress(data) + compressor.flush()
+    raise ValueError(f'Неизвестная кодировка: {encoding}')
+
+
+def is_compressible(name):
+    return name.lower().endswith(COMPRESSIBLE_EXTENSIONS)
+
+
+def compress_stream(chunks, encoding):
+    """Сжимает поток по кусочкам, сбрасывая буфер после каждого из них,
+    чтобы клиент получал данные, не дожидаясь конца ответа."""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        for chunk in chunks:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+    elif encoding == 'gzip':
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, GZIP_WBITS)
+        for chunk in chunks:
+            data = compressor.compress(chunk) + compressor.flush(
+                zlib.Z_SYNC_FLUSH
+            )
+            if data:
+                yield data
+        yield compressor.flush()
+    else:
+        raise ValueError(f'Неизвестная кодировка: {encoding}')
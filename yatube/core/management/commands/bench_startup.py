@@ -0,0 +1,103 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from statistics import median
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def parse_importtime(stderr):
+    """{модуль: (собственное время, с вложенными)} в секундах из вывода
+    python -X importtime."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        if not own.strip().isdigit():
+            # Строка заголовка
+            continue
+        modules[name.strip()] = (
+            int(own) / 1e6, int(cumulative) / 1e6
+        )
+    return modules
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет холодный старт в свежих процессах: время импорта '
+        'по модулям, загрузку WSGI-приложения и первый ответ.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', default='/',
+            help='Адрес первого запроса.',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=3,
+            help='Сколько раз запускать; выводятся медианы.',
+        )
+        parser.add_argument(
+            '--top', type=int, default=20,
+            help='Сколько самых долгих модулей показать.',
+        )
+
+    def handle(self, *args, **options):
+        runs = [self.run(options['path']) for _ in range(options['repeat'])]
+        self.stdout.write(self.style.MIGRATE_HEADING('Старт'))
+        for key, title in (('process', 'процесс целиком'),
+                           ('boot', 'импорт yatube.wsgi'),
+                           ('first_response', 'первый ответ')):
+            value = median(run[key] for run in runs)
+            self.stdout.write(f'  {title:<20} {value * 1000:8.1f} мс')
+        self.stdout.write(f'  статус первого ответа: {runs[-1]["status"]}')
+
+        own = defaultdict(list)
+        cumulative = defaultdict(list)
+        for run in runs:
+            for name, (own_time, total_time) in run['modules'].items():
+                own[name].append(own_time)
+                cumulative[name].append(total_time)
+        packages = defaultdict(float)
+        for name, times in own.items():
+            packages[name.split('.')[0]] += median(times)
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            'Импорт по пакетам (собственное время модулей)'
+        ))
+        self.write_top(packages, options['top'])
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            'Модули с вложенными импортами'
+        ))
+        self.write_top(
+            {name: median(times) for name, times in cumulative.items()},
+            options['top'],
+        )
+
+    def write_top(self, times, top):
+        ranked = sorted(times.items(), key=lambda item: -item[1])[:top]
+        for name, value in ranked:
+            self.stdout.write(f'  {value * 1000:8.1f} мс  {name}')
+
+    def run(self, path):
+        started = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-m', 'core.startup', path],
+            cwd=settings.BASE_DIR,
+            env=dict(os.environ),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+        )
+        process_time = time.perf_counter() - started
+        if result.returncode:
+            raise CommandError(result.stderr.strip().splitlines()[-1])
+        run = json.loads(result.stdout.strip().splitlines()[-1])
+        run['process'] = process_time
+        run['modules'] = parse_importtime(result.stderr)
+        return run
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+
+from core.models import SlowQuery
+
+ORDERINGS = {
+    'total': '-total_time',
+    'max': '-max_time',
+    'count': '-count',
+}
+
+
+class Command(BaseCommand):
+    help = 'Показывает самые медленные запросы из журнала SlowQuery.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int, default=10,
+            help='Сколько запросов показать.',
+        )
+        parser.add_argument(
+            '--order', choices=ORDERINGS, default='total',
+            help='По суммарному времени, наибольшему времени или числу.',
+        )
+        parser.add_argument(
+            '--plan', action='store_true',
+            help='Показать план выполнения и стек.',
+        )
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Очистить журнал после вывода.',
+        )
+
+    def handle(self, *args, **options):
+        queries = SlowQuery.objects.order_by(
+            ORDERINGS[options['order']]
+        )[:options['limit']]
+        for query in queries:
+            self.stdout.write(self.style.WARNING(
+                f'{query.total_time:.0f} мс всего, {query.count} раз, '
+                f'в среднем {query.total_time / query.count:.1f} мс, '
+                f'максимум {query.max_time:.1f} мс — {query.view or "-"}'
+            ))
+            self.stdout.write(query.shape)
+            if options['plan']:
+                if query.plan:
+                    self.stdout.write('План:\n' + query.plan)
+                if query.stack:
+                    self.stdout.write('Стек:\n' + query.stack.rstrip())
+            self.stdout.write('')
+        if options['clear']:
+            deleted, _ = SlowQuery.objects.all().delete()
+            self.stdout.write(self.style.SUCCESS(
+                f'Удалено записей: {deleted}'
+            ))
@@ -0,0 +1,78 @@
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from core import warmup
+
+
+class Command(BaseCommand):
+    help = (
+        'Заранее отрисовывает самые посещаемые страницы, чтобы после '
+        'деплоя их отдавал кеш. Без --base-url греет кеши этого процесса '
+        '— имеет смысл для общего кеша (memcached, redis).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pages', type=int, default=5,
+            help='Сколько страниц главной прогреть.',
+        )
+        parser.add_argument(
+            '--groups', type=int, default=10,
+            help='Сколько самых активных групп прогреть.',
+        )
+        parser.add_argument(
+            '--profiles', type=int, default=10,
+            help='Сколько профилей с наибольшим числом подписчиков.',
+        )
+        parser.add_argument(
+            '--posts', type=int, default=20,
+            help='Сколько самых обсуждаемых постов прогреть.',
+        )
+        parser.add_argument(
+            '--threads', type=int,
+            default=getattr(settings, 'CACHE_WARMUP_THREADS', 4),
+            help='Сколько страниц запрашивать одновременно.',
+        )
+        parser.add_argument(
+            '--base-url',
+            help='Греть запущенный сервер по HTTP, например '
+                 'http://127.0.0.1:8000.',
+        )
+        parser.add_argument(
+            '--host',
+            help='Host запросов без --base-url: от него зависит ключ '
+                 'кеша страниц. По умолчанию CACHE_WARMUP_HOST или первый '
+                 'адрес из ALLOWED_HOSTS.',
+        )
+
+    def handle(self, *args, **options):
+        paths = warmup.get_paths(
+            pages=options['pages'],
+            groups=options['groups'],
+            profiles=options['profiles'],
+            posts=options['posts'],
+        )
+        if options['base_url']:
+            fetch = warmup.http_fetcher(options['base_url'])
+        else:
+            try:
+                host = options['host'] or warmup.get_host()
+            except ImproperlyConfigured as error:
+                raise CommandError(error)
+            fetch = warmup.local_fetcher(host=host)
+        started = time.perf_counter()
+        results = warmup.warm(paths, fetch, options['threads'])
+        failed = 0
+        for path, result, duration in results:
+            if result != 200:
+                failed += 1
+                self.stderr.write(f'{path}: {result}')
+            elif options['verbosity'] > 1:
+                self.stdout.write(f'{duration * 1000:8.1f} мс  {path}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Прогрето страниц: {len(results) - failed} из {len(results)} '
+            f'за {time.perf_counter() - started:.1f} с'
+        ))
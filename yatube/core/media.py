@@ -0,0 +1,176 @@
+"""Раздача загруженных файлов без отдельного веб-сервера.
+
+Поддерживает условные запросы (ETag, If-Modified-Since), докачку
+по Range и передачу файла фронт-прокси через X-Sendfile или
+X-Accel-Redirect (MEDIA_SENDFILE).
+"""
+import mimetypes
+import os
+import re
+import stat
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseNotModified,
+    StreamingHttpResponse,
+)
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+from django.views.static import was_modified_since
+
+from .middleware import IMMUTABLE_MAX_AGE
+
+# Имена, которые однозначно определяются содержимым: картинки постов
+# в хранилище по хешу и миниатюры sorl. Их можно кешировать навсегда.
+IMMUTABLE_MEDIA_RE = re.compile(
+    r'^(posts/[0-9a-f]{2}/[0-9a-f]{64}|cache/[0-9a-f]{2}/[0-9a-f]{2}/'
+    r'[0-9a-f]{32})\.\w+$'
+)
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def parse_range(header, size):
+    """Возвращает (start, end) включительно, None для запроса целиком
+    или ValueError для недостижимого диапазона."""
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        # Несколько диапазонов и прочие формы отдаём целиком
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        length = int(end)
+        if not length:
+            raise ValueError('Пустой диапазон')
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError('Диапазон за пределами файла')
+    return start, end
+
+
+def read_range(path, start, end):
+    with open(path, 'rb') as media_file:
+        media_file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = media_file.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def cache_control(path):
+    if IMMUTABLE_MEDIA_RE.match(path):
+        return f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    return f'public, max-age={getattr(settings, "MEDIA_MAX_AGE", 3600)}'
+
+
+def sendfile_response(path, full_path):
+    mode = getattr(settings, 'MEDIA_SENDFILE', None)
+    if not mode:
+        return None
+    response = HttpResponse()
+    if mode == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = (
+            settings.MEDIA_ACCEL_PREFIX.rstrip('/') + '/' + path
+        )
+    elif mode == 'x-sendfile':
+        response['X-Sendfile'] = full_path
+    else:
+        raise ValueError(f'Неизвестный MEDIA_SENDFILE: {mode}')
+    # Тип содержимого определит прокси
+    del response['Content-Type']
+    return response
+
+
+@require_safe
+def serve_media(request, path, document_root=None):
+    """Отдаёт файл из document_root (по умолчанию MEDIA_ROOT)."""
+    try:
+        full_path = safe_join(document_root or settings.MEDIA_ROOT, path)
+        stat_result = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404('Файл не найден')
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise Http404('Файл не найден')
+
+    size = stat_result.st_size
+    etag = f'"{int(stat_result.st_mtime):x}-{size:x}"'
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(stat_result.st_mtime),
+        'Cache-Control': cache_control(path),
+    }
+
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        not_modified = etag in if_none_match or if_none_match == '*'
+    else:
+        not_modified = not was_modified_since(
+            request.META.get('HTTP_IF_MODIFIED_SINCE'),
+            stat_result.st_mtime,
+            size,
+        )
+    if not_modified:
+        response = HttpResponseNotModified()
+    else:
+        response = (
+            # Фронт-прокси знает только, где лежит MEDIA_ROOT
+            document_root is None and sendfile_response(path, full_path)
+            or file_response(request, full_path, size, etag, stat_result)
+        )
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
+
+def file_response(request, full_path, size, etag, stat_result):
+    content_type = (
+        mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+    )
+    range_header = request.META.get('HTTP_RANGE')
+    if range_header and if_range_matches(request, etag, stat_result):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+        if byte_range is not None:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                read_range(full_path, start, end),
+                status=206,
+                content_type=content_type,
+            )
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Length'] = str(end - start + 1)
+            response['Accept-Ranges'] = 'bytes'
+            return response
+    response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def if_range_matches(request, etag, stat_result):
+    """Range применяется, только если If-Range совпадает с версией
+    файла (или If-Range не передан)."""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range is None:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag
+    modified = parse_http_date_safe(if_range)
+    return modified is not None and int(stat_result.st_mtime) <= modified
+
+
+def serve_sitemap(request, path='sitemap.xml'):
+    """Отдаёт файлы карты сайта из SITEMAP_ROOT."""
+    return serve_media(request, path, settings.SITEMAP_ROOT)
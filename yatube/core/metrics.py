@@ -0,0 +1,369 @@
+"""Метрики приложения в текстовом формате Prometheus.
+
+Счётчики и гистограммы живут в памяти процесса (registry). Если задан
+METRICS_DIR, процесс не чаще раза в METRICS_FLUSH_INTERVAL секунд
+сбрасывает свои значения в файл <pid>.json этого каталога, а /metrics
+складывает файлы всех процессов — так несколько обработчиков gunicorn
+или uwsgi отдают общие числа. Без METRICS_DIR видны только значения
+процесса, который ответил на запрос. Файлы завершившихся процессов
+/metrics переносит в общий файл dead.json и удаляет: каталог не растёт
+с каждым перезапуском обработчиков, а суммы счётчиков не уменьшаются.
+Обработчики очереди задач сбрасывают метрики так же (jobs.worker).
+
+Значения, которые дешевле посчитать в момент запроса (длина очереди
+задач), собирают функции из COLLECTORS.
+"""
+import bisect
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count
+
+from jobs.models import Job
+
+try:
+    import fcntl
+except ImportError:
+    # Без flock (Windows) файлы завершившихся процессов не переносятся
+    fcntl = None
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Значения завершившихся процессов
+DEAD_FILE = 'dead.json'
+
+
+class Registry:
+    """Значения метрик процесса: {(имя, метки): число}."""
+
+    def __init__(self):
+        self.metrics = {}
+        self.values = defaultdict(float)
+        self.lock = threading.Lock()
+        # Потоки процесса не должны сбрасывать файл и загружать
+        # сохранённые значения одновременно
+        self.flush_lock = threading.Lock()
+        self.flushed = 0
+        self.loaded = False
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def add(self, sample, labels, amount):
+        with self.lock:
+            self.values[(sample, labels)] += amount
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.values)
+
+    def clear(self):
+        with self.lock:
+            self.values.clear()
+
+    # Файлы процессов
+
+    def path(self, pid=None):
+        return os.path.join(
+            settings.METRICS_DIR, f'{pid or os.getpid()}.json'
+        )
+
+    def load_own(self):
+        """Продолжает с сохранённых значений, если pid уже встречался:
+        иначе счётчики общей суммы пошли бы назад."""
+        self.loaded = True
+        try:
+            saved = read_samples(self.path())
+        except (OSError, ValueError):
+            return
+        with self.lock:
+            for key, value in saved.items():
+                self.values[key] += value
+
+    def flush(self, force=False):
+        metrics_dir = getattr(settings, 'METRICS_DIR', None)
+        if not metrics_dir:
+            return
+        now = time.monotonic()
+        interval = getattr(settings, 'METRICS_FLUSH_INTERVAL', 5)
+        if not force and now - self.flushed < interval:
+            return
+        with self.flush_lock:
+            if not self.loaded:
+                self.load_own()
+            self.flushed = now
+            os.makedirs(metrics_dir, exist_ok=True)
+            write_samples(self.path(), self.snapshot())
+
+    def merge_dead(self, metrics_dir):
+        """Переносит значения завершившихся процессов в DEAD_FILE
+        и удаляет их файлы."""
+        if fcntl is None:
+            return
+        dead = [
+            name for name in os.listdir(metrics_dir)
+            if name.endswith('.json') and name[:-5].isdigit()
+            and not is_alive(int(name[:-5]))
+        ]
+        if not dead:
+            return
+        with open(os.path.join(metrics_dir, 'merge.lock'), 'w') as lock:
+            # Под блокировкой: два /metrics не перенесут один файл дважды
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            dead_path = os.path.join(metrics_dir, DEAD_FILE)
+            try:
+                total = defaultdict(float, read_samples(dead_path))
+            except (OSError, ValueError):
+                total = defaultdict(float)
+            merged = []
+            for name in dead:
+                path = os.path.join(metrics_dir, name)
+                try:
+                    samples = read_samples(path)
+                except (OSError, ValueError):
+                    # Файл уже перенёс другой процесс
+                    continue
+                for key, value in samples.items():
+                    total[key] += value
+                merged.append(path)
+            write_samples(dead_path, total)
+            for path in merged:
+                os.unlink(path)
+
+    def collect(self):
+        """Сумма значений всех процессов."""
+        metrics_dir = getattr(settings, 'METRICS_DIR', None)
+        if not metrics_dir:
+            return self.snapshot()
+        self.flush(force=True)
+        self.merge_dead(metrics_dir)
+        total = defaultdict(float)
+        for name in os.listdir(metrics_dir):
+            if not name.endswith('.json'):
+                continue
+            try:
+                samples = read_samples(os.path.join(metrics_dir, name))
+            except (OSError, ValueError):
+                # Файл удалили или подменяют прямо сейчас
+                continue
+            for key, value in samples.items():
+                total[key] += value
+        return total
+
+
+def read_samples(path):
+    with open(path, encoding='utf-8') as source:
+        return {
+            (sample, tuple(map(tuple, labels))): value
+            for sample, labels, value in json.load(source)
+        }
+
+
+def write_samples(path, values):
+    """Записывает значения атомарно: читатели видят старый файл или
+    новый целиком."""
+    samples = [
+        [sample, list(map(list, labels)), value]
+        for (sample, labels), value in values.items()
+    ]
+    descriptor, temp_path = tempfile.mkstemp(
+        dir=os.path.dirname(path), suffix='.tmp'
+    )
+    try:
+        with os.fdopen(descriptor, 'w', encoding='utf-8') as output:
+            json.dump(samples, output)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Процесс есть, но чужой
+        pass
+    return True
+
+
+registry = Registry()
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        registry.register(self)
+
+    def label_pairs(self, labels):
+        return tuple((name, str(labels[name])) for name in self.labelnames)
+
+    def samples(self, values):
+        """Строки экспозиции из значений этой метрики."""
+        for (sample, labels), value in sorted(values.items()):
+            yield sample, labels, value
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        registry.add(self.name, self.label_pairs(labels), amount)
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        pairs = self.label_pairs(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        bound = (
+            str(self.buckets[index]) if index < len(self.buckets) else '+Inf'
+        )
+        # Корзины храним без накопления: так их можно складывать между
+        # процессами; накопленные суммы считаются при выводе
+        registry.add(self.name + '_bucket', pairs + (('le', bound),), 1)
+        registry.add(self.name + '_sum', pairs, value)
+        registry.add(self.name + '_count', pairs, 1)
+
+    def samples(self, values):
+        bounds = [str(bucket) for bucket in self.buckets] + ['+Inf']
+        series = sorted({
+            labels for (sample, labels) in values
+            if sample == self.name + '_count'
+        })
+        bucket = self.name + '_bucket'
+        for labels in series:
+            cumulative = 0
+            for bound in bounds:
+                bucket_labels = labels + (('le', bound),)
+                cumulative += values.get((bucket, bucket_labels), 0)
+                yield bucket, bucket_labels, cumulative
+            for suffix in ('_sum', '_count'):
+                sample = self.name + suffix
+                yield sample, labels, values.get((sample, labels), 0)
+
+
+class Gauge(Metric):
+    """Значение на момент запроса; заполняется функцией из COLLECTORS."""
+    kind = 'gauge'
+
+
+class QueryCounter:
+    """Обёртка execute_wrapper, считающая запросы к базе."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+    def capture(self):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self))
+        return stack
+
+
+def escape_label(value):
+    return (value.replace('\\', r'\\').replace('\n', r'\n')
+            .replace('"', r'\"'))
+
+
+def format_value(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def exposition():
+    """Все метрики в текстовом формате Prometheus."""
+    values = registry.collect()
+    for collector in COLLECTORS:
+        values.update(collector())
+    by_metric = defaultdict(dict)
+    for (sample, labels), value in values.items():
+        for suffix in ('', '_bucket', '_sum', '_count'):
+            name = sample[:len(sample) - len(suffix)]
+            if sample.endswith(suffix) and name in registry.metrics:
+                by_metric[name][sample, labels] = value
+                break
+    lines = []
+    for name, metric in sorted(registry.metrics.items()):
+        lines.append(f'# HELP {name} {metric.documentation}')
+        lines.append(f'# TYPE {name} {metric.kind}')
+        for sample, labels, value in metric.samples(by_metric[name]):
+            if labels:
+                label_text = ','.join(
+                    f'{label}="{escape_label(text)}"'
+                    for label, text in labels
+                )
+                sample = f'{sample}{{{label_text}}}'
+            lines.append(f'{sample} {format_value(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+REQUEST_LATENCY = Histogram(
+    'yatube_request_duration_seconds',
+    'Время ответа по view',
+    ('view',),
+)
+REQUESTS = Counter(
+    'yatube_requests_total',
+    'Ответы по view, методу и статусу',
+    ('view', 'method', 'status'),
+)
+DB_QUERIES = Counter(
+    'yatube_db_queries_total',
+    'Запросы к базе по view',
+    ('view',),
+)
+FRAGMENT_CACHE = Counter(
+    'yatube_fragment_cache_total',
+    'Обращения к кешу фрагментов шаблонов',
+    ('fragment', 'result'),
+)
+THUMBNAIL_DURATION = Histogram(
+    'yatube_thumbnail_duration_seconds',
+    'Время создания миниатюры',
+)
+JOB_QUEUE = Gauge(
+    'yatube_jobs',
+    'Задачи в очереди по статусу',
+    ('status',),
+)
+
+
+def job_queue():
+    counts = dict.fromkeys((Job.QUEUED, Job.RUNNING), 0)
+    counts.update(
+        Job.objects.filter(status__in=counts).order_by('status')
+        .values_list('status').annotate(total=Count('pk'))
+    )
+    return {
+        (JOB_QUEUE.name, (('status', status),)): count
+        for status, count in counts.items()
+    }
+
+
+COLLECTORS = [job_queue]
@@ -0,0 +1,387 @@
+import hashlib
+import mimetypes
+import os
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed, SuspiciousFileOperation
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.urls import Resolver404, resolve
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+
+from . import metrics
+from .cache import get_page_cache, get_tag_tokens, is_shared
+from .compression import choose_encoding, compress, compress_stream
+from .profiling import check_token, get_token, profile_request
+from .slowqueries import SlowQueryLog
+from .storage import ENCODING_SUFFIXES
+
+# Год — максимум, который имеет смысл указывать в max-age.
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+
+
+class StaticFile:
+    """Файл из STATIC_ROOT вместе со своими сжатыми вариантами."""
+
+    def __init__(self, path, name, immutable):
+        stat = os.stat(path)
+        self.path = path
+        self.content_type = (
+            mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        )
+        self.last_modified = http_date(stat.st_mtime)
+        self.etag = f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+        self.variants = {
+            encoding: path + suffix
+            for encoding, suffix in ENCODING_SUFFIXES.items()
+            if os.path.isfile(path + suffix)
+        }
+        if immutable:
+            self.cache_control = (
+                f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+            )
+        else:
+            max_age = getattr(settings, 'STATIC_MAX_AGE', 60)
+            self.cache_control = f'public, max-age={max_age}'
+
+    def get_response(self, request):
+        encoding = choose_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''),
+            [coding for coding in ENCODING_SUFFIXES
+             if coding in self.variants],
+        )
+        etag = self.etag
+        if encoding:
+            etag = f'{etag[:-1]}-{encoding}"'
+
+        if etag in request.META.get('HTTP_IF_NONE_MATCH', ''):
+            response = HttpResponseNotModified()
+        else:
+            path = self.variants[encoding] if encoding else self.path
+            response = FileResponse(
+                open(path, 'rb'), content_type=self.content_type
+            )
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['ETag'] = etag
+        response['Last-Modified'] = self.last_modified
+        response['Cache-Control'] = self.cache_control
+        if self.variants:
+            patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+
+class StaticFilesMiddleware:
+    """Отдаёт собранную collectstatic статику из STATIC_ROOT.
+
+    Файлы с хешем в имени отдаются с `immutable` на год, для клиентов
+    с поддержкой сжатия — заранее сжатые `.br`/`.gz` варианты.
+    Информация о файлах запоминается, поскольку после деплоя
+    содержимое STATIC_ROOT не меняется.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefix = settings.STATIC_URL
+        self.root = getattr(settings, 'STATIC_ROOT', None)
+        self.files = {}
+
+    def __call__(self, request):
+        if (self.root
+                and request.method in ('GET', 'HEAD')
+                and request.path_info.startswith(self.prefix)):
+            static_file = self.find_file(
+                request.path_info[len(self.prefix):]
+            )
+            if static_file is not None:
+                return static_file.get_response(request)
+        return self.get_response(request)
+
+    def find_file(self, name):
+        if name in self.files:
+            return self.files[name]
+        try:
+            path = safe_join(self.root, name)
+        except SuspiciousFileOperation:
+            return None
+        if not name or not os.path.isfile(path):
+            return None
+        static_file = StaticFile(
+            path, name, self.is_immutable(name)
+        )
+        self.files[name] = static_file
+        return static_file
+
+    def is_immutable(self, name):
+        is_hashed = getattr(staticfiles_storage, 'is_hashed', None)
+        return bool(is_hashed and is_hashed(name))
+
+
+class CompressionMiddleware:
+    """Сжимает ответы brotli или gzip в зависимости от Accept-Encoding.
+
+    Работает на выходе из всей цепочки, поэтому фрагменты шаблонов
+    попадают в кеш несжатыми и переиспользуются для любых клиентов.
+    Настройки: COMPRESSION_MIN_SIZE — меньшие ответы не сжимаются,
+    COMPRESSION_CONTENT_TYPES — какие типы содержимого сжимать,
+    COMPRESSION_STREAMING — сжимать ли потоковые ответы.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', 512)
+        self.content_types = frozenset(
+            getattr(settings, 'COMPRESSION_CONTENT_TYPES', ('text/html',))
+        )
+        self.streaming = getattr(settings, 'COMPRESSION_STREAMING', True)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        return self.process_response(request, response)
+
+    def process_response(self, request, response):
+        if (response.status_code != 200
+                or response.has_header('Content-Encoding')
+                or not self.is_allowed_type(response)):
+            return response
+        if response.streaming:
+            if not self.streaming:
+                return response
+        elif len(response.content) < self.min_size:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = compress_stream(
+                response.streaming_content, encoding
+            )
+            del response['Content-Length']
+        else:
+            compressed = compress(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        # Сжатое тело побайтно отличается от исходного,
+        # поэтому сильный ETag становится слабым.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
+
+    def is_allowed_type(self, response):
+        content_type = response.get('Content-Type', '')
+        return content_type.split(';')[0].strip() in self.content_types
+
+
+class AnonymousPageCacheMiddleware:
+    """Кеш целых страниц для анонимных GET-запросов.
+
+    Стоит перед SessionMiddleware, поэтому попадание в кеш обходится
+    без сессии, аутентификации, запросов к базе и рендеринга.
+    Кешируются только view, отмеченные `core.cache.page_cache`;
+    запросы с cookie сессии или CSRF идут мимо кеша. Страницы
+    с фрагментами, взятыми из кеша фрагментов, не сохраняются
+    (core.cache.skip_page_cache).
+
+    Теги сбрасывают все процессы — веб-процессы и обработчики очереди,
+    поэтому кеш PAGE_CACHE_ALIAS должен быть общим: на кеше из
+    PROCESS_LOCAL_CACHES middleware выключена.
+    """
+
+    def __init__(self, get_response):
+        if not is_shared(getattr(settings, 'PAGE_CACHE_ALIAS', 'default')):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.timeout = getattr(settings, 'PAGE_CACHE_TIMEOUT', 300)
+        self.query_params = tuple(
+            getattr(settings, 'PAGE_CACHE_QUERY_PARAMS', ('page',))
+        )
+        self.skip_cookies = (
+            settings.SESSION_COOKIE_NAME, settings.CSRF_COOKIE_NAME
+        )
+
+    def __call__(self, request):
+        tags = self.get_page_tags(request)
+        if tags is None:
+            return self.get_response(request)
+
+        cache = get_page_cache()
+        key = self.make_key(request)
+        entry = cache.get(key)
+        if entry is not None and self.is_fresh(entry):
+            response = self.build_response(entry)
+            # Ответ из кеша тоже может оказаться у клиента — тогда 304
+            return get_conditional_response(
+                request,
+                etag=response.get('ETag'),
+                last_modified=parse_http_date_safe(
+                    response.get('Last-Modified', '')
+                ),
+                response=response,
+            )
+
+        # Токены берутся до рендеринга: если тег сбросят, пока страница
+        # рисуется, она сохранится под старым токеном и сразу устареет
+        tokens = get_tag_tokens(tags, create=True)
+        response = self.get_response(request)
+        response['X-Page-Cache'] = 'miss'
+        if (self.is_cacheable_response(request, response)
+                and not getattr(request, 'skip_page_cache', False)):
+            extra_tags = set(getattr(response, 'cache_tags', ())) - set(tags)
+            if extra_tags:
+                tokens.update(get_tag_tokens(extra_tags, create=True))
+            cache.set(key, {
+                'status': response.status_code,
+                'headers': list(response.items()),
+                'content': response.content,
+                'tags': tokens,
+            }, self.timeout)
+        return response
+
+    def get_page_tags(self, request):
+        if (request.method not in ('GET', 'HEAD')
+                or 'HTTP_AUTHORIZATION' in request.META
+                or any(name in request.COOKIES
+                       for name in self.skip_cookies)):
+            return None
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return None
+        tags = getattr(match.func, 'page_cache_tags', None)
+        if tags is None:
+            return None
+        return tags(**match.kwargs)
+
+    def make_key(self, request):
+        params = [
+            (name, request.GET.get(name, ''))
+            for name in self.query_params if name in request.GET
+        ]
+        url = f'{request.get_host()}{request.path}?{params}'
+        return 'page:' + hashlib.md5(url.encode()).hexdigest()
+
+    def is_fresh(self, entry):
+        tags = entry['tags']
+        return get_tag_tokens(tags) == tags
+
+    def is_cacheable_response(self, request, response):
+        return (request.method == 'GET'
+                and response.status_code == 200
+                and not response.streaming
+                and not response.cookies
+                and 'private' not in response.get('Cache-Control', '')
+                and 'no-store' not in response.get('Cache-Control', ''))
+
+    def build_response(self, entry):
+        response = HttpResponse(entry['content'], status=entry['status'])
+        for header, value in entry['headers']:
+            response[header] = value
+        response['X-Page-Cache'] = 'hit'
+        return response
+
+
+class ProfilingMiddleware:
+    """Профилирует запросы с токеном сотрудника (см. core.profiling).
+
+    Стоит первой, чтобы в профиль попала вся цепочка. Запросы без
+    токена проходят без дополнительной работы.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = get_token(request)
+        if token is None or not check_token(token, request):
+            return self.get_response(request)
+        return profile_request(request, self.get_response)
+
+
+class SlowQueryMiddleware:
+    """Записывает медленные запросы к базе (см. core.slowqueries).
+
+    Включается настройкой SLOW_QUERY_THRESHOLD — порогом в
+    миллисекундах. Запросы, выполненные при отдаче потокового ответа,
+    в журнал не попадают.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.threshold = getattr(settings, 'SLOW_QUERY_THRESHOLD', None)
+        if self.threshold is None:
+            raise MiddlewareNotUsed
+
+    def __call__(self, request):
+        log = SlowQueryLog(self.threshold)
+        with log.capture():
+            response = self.get_response(request)
+        if log.records:
+            log.save(view=self.get_view_name(request))
+        return response
+
+    def get_view_name(self, request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return request.path_info
+        func = match.func
+        return '{}.{}'.format(
+            func.__module__,
+            getattr(func, '__qualname__', type(func).__name__),
+        )
+
+
+class MetricsMiddleware:
+    """Время ответа, статусы и число запросов к базе по view
+    (см. core.metrics).
+
+    Стоит после StaticFilesMiddleware: статика в метрики не попадает.
+    Ответы из кеша страниц считаются по view, которой принадлежит адрес.
+    """
+    METHODS = frozenset(
+        ('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS')
+    )
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = metrics.QueryCounter()
+        started = perf_counter()
+        with queries.capture():
+            response = self.get_response(request)
+        duration = perf_counter() - started
+        view = self.get_view_label(request)
+        metrics.REQUEST_LATENCY.observe(duration, view=view)
+        metrics.REQUESTS.inc(
+            view=view,
+            # Произвольные методы раздули бы число серий
+            method=request.method if request.method in self.METHODS
+            else 'other',
+            status=response.status_code,
+        )
+        if queries.count:
+            metrics.DB_QUERIES.inc(queries.count, view=view)
+        metrics.registry.flush()
+        return response
+
+    def get_view_label(self, request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            try:
+                match = resolve(request.path_info)
+            except Resolver404:
+                return 'unmatched'
+        return match.view_name
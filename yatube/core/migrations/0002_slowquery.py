@@ -0,0 +1,36 @@
+# Generated by Django 2.2.16 on 2026-10-19 08:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=32, unique=True, verbose_name='Отпечаток')),
+                ('shape', models.TextField(verbose_name='Вид запроса')),
+                ('sql', models.TextField(verbose_name='Пример SQL')),
+                ('params', models.TextField(blank=True, verbose_name='Типы параметров примера')),
+                ('view', models.CharField(blank=True, max_length=200, verbose_name='View')),
+                ('stack', models.TextField(blank=True, verbose_name='Стек вызова')),
+                ('plan', models.TextField(blank=True, verbose_name='План выполнения')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Сколько раз')),
+                ('total_time', models.FloatField(default=0, verbose_name='Суммарное время, мс')),
+                ('max_time', models.FloatField(default=0, verbose_name='Наибольшее время, мс')),
+                ('first_seen', models.DateTimeField(auto_now_add=True, verbose_name='Впервые')),
+                ('last_seen', models.DateTimeField(auto_now=True, verbose_name='Последний раз')),
+            ],
+            options={
+                'verbose_name': 'Медленный запрос',
+                'verbose_name_plural': 'Медленные запросы',
+                'ordering': ['-total_time'],
+            },
+        ),
+    ]
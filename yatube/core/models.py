@@ -11,3 +11,47 @@ class CreatedModel(models.Model):
     class Meta:
         # Это абстрактная модель:
         abstract = True
+
+
+class MediaBlob(models.Model):
+    """Файл в хранилище с адресацией по содержимому и число ссылок
+    на него."""
+    name = models.CharField('Имя файла', max_length=255, unique=True)
+    refcount = models.PositiveIntegerField('Ссылок', default=0)
+    released = models.DateTimeField(
+        'Ссылок не осталось',
+        blank=True,
+        null=True,
+    )
+
+    class Meta:
+        verbose_name = 'Файл'
+        verbose_name_plural = 'Файлы'
+
+    def __str__(self):
+        return self.name
+
+
+class SlowQuery(models.Model):
+    """Медленный запрос к базе. Запросы одного вида — с точностью
+    до параметров — собираются в одну запись."""
+    fingerprint = models.CharField('Отпечаток', max_length=32, unique=True)
+    shape = models.TextField('Вид запроса')
+    sql = models.TextField('Пример SQL')
+    params = models.TextField('Типы параметров примера', blank=True)
+    view = models.CharField('View', max_length=200, blank=True)
+    stack = models.TextField('Стек вызова', blank=True)
+    plan = models.TextField('План выполнения', blank=True)
+    count = models.PositiveIntegerField('Сколько раз', default=0)
+    total_time = models.FloatField('Суммарное время, мс', default=0)
+    max_time = models.FloatField('Наибольшее время, мс', default=0)
+    first_seen = models.DateTimeField('Впервые', auto_now_add=True)
+    last_seen = models.DateTimeField('Последний раз', auto_now=True)
+
+    class Meta:
+        ordering = ['-total_time']
+        verbose_name = 'Медленный запрос'
+        verbose_name_plural = 'Медленные запросы'
+
+    def __str__(self):
+        return self.shape[:80]
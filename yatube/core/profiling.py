@@ -0,0 +1,172 @@
+"""Профилирование отдельных запросов на боевом сервере.
+
+Сотрудник получает на странице админки подписанный токен и добавляет
+его к запросу в заголовке X-Profile. Токен действует только вместе
+с сессией того же сотрудника: утёкшее значение без его cookie ничего
+не включает. В адресе токен не принимается — оттуда он попал бы
+в Referer, журналы сервера и историю браузера. Такой запрос
+выполняется под cProfile, а результат — .pstats и текстовая сводка —
+сохраняется в PROFILE_ROOT. Там хранятся только PROFILE_KEEP последних
+снимков, старые удаляются.
+"""
+import io
+import os
+import re
+import time
+from datetime import datetime
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+
+SALT = 'core.profiling'
+HEADER = 'HTTP_X_PROFILE'
+NAME_RE = re.compile(r'^[\w-]+\.(pstats|txt)$')
+# Сколько строк статистики попадает в текстовую сводку
+SUMMARY_LINES = 60
+
+
+def make_token(user):
+    """Токен, который включает профилирование для запросов user."""
+    return signing.TimestampSigner(salt=SALT).sign(str(user.pk))
+
+
+def check_token(token, request):
+    """Действующий токен активного сотрудника, вошедшего в этом запросе
+    под своей сессией."""
+    max_age = getattr(settings, 'PROFILE_TOKEN_MAX_AGE', 60 * 60)
+    try:
+        pk = signing.TimestampSigner(salt=SALT).unsign(
+            token, max_age=max_age
+        )
+    except signing.BadSignature:
+        return False
+    session = session_of(request)
+    if str(session.get(auth.SESSION_KEY)) != pk:
+        return False
+    user = get_user_model().objects.filter(
+        pk=pk, is_staff=True, is_active=True
+    ).first()
+    # Сессия, пережившая смену пароля, не годится, как и в django.auth
+    return user is not None and constant_time_compare(
+        session.get(auth.HASH_SESSION_KEY) or '',
+        user.get_session_auth_hash(),
+    )
+
+
+def session_of(request):
+    """Сессия запроса. Middleware стоит раньше SessionMiddleware,
+    поэтому сессия читается здесь, и только для запросов с токеном."""
+    engine = import_module(settings.SESSION_ENGINE)
+    return engine.SessionStore(
+        request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    )
+
+
+def get_token(request):
+    """Токен из заголовка X-Profile или None."""
+    return request.META.get(HEADER) or None
+
+
+def profile_root():
+    return getattr(settings, 'PROFILE_ROOT', None) or os.path.join(
+        settings.BASE_DIR, 'profiles'
+    )
+
+
+def profile_request(request, get_response):
+    """Выполняет запрос под cProfile и сохраняет снимок.
+
+    Возвращает ответ с именем снимка в заголовке X-Profile.
+    """
+    # Профилировщик нужен редко, не тратим на него время при старте
+    import cProfile
+
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    profiler.enable()
+    try:
+        response = get_response(request)
+    finally:
+        profiler.disable()
+    duration = time.perf_counter() - started
+    name = save(profiler, request, response, duration)
+    response['X-Profile'] = name
+    return response
+
+
+def save(profiler, request, response, duration):
+    """Пишет .pstats и сводку, удаляет лишние старые снимки."""
+    import pstats
+
+    root = profile_root()
+    os.makedirs(root, exist_ok=True)
+    slug = re.sub(r'[^\w]+', '-', request.path).strip('-')[:60] or 'root'
+    name = '{}-{}'.format(
+        timezone.now().strftime('%Y%m%d-%H%M%S-%f'), slug
+    )
+    profiler.dump_stats(os.path.join(root, name + '.pstats'))
+
+    summary = io.StringIO()
+    summary.write(
+        f'{request.method} {request.get_full_path()}\n'
+        f'Статус: {response.status_code}\n'
+        f'Время: {duration * 1000:.1f} мс\n\n'
+    )
+    stats = pstats.Stats(profiler, stream=summary)
+    stats.sort_stats('cumulative').print_stats(SUMMARY_LINES)
+    with open(os.path.join(root, name + '.txt'), 'w',
+              encoding='utf-8') as output:
+        output.write(summary.getvalue())
+
+    trim(root, getattr(settings, 'PROFILE_KEEP', 50))
+    return name
+
+
+def trim(root, keep):
+    """Оставляет keep последних снимков."""
+    names = sorted({
+        os.path.splitext(name)[0]
+        for name in os.listdir(root) if NAME_RE.match(name)
+    })
+    for name in names[:-keep or None]:
+        for suffix in ('.pstats', '.txt'):
+            try:
+                os.remove(os.path.join(root, name + suffix))
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles():
+    """Снимки от новых к старым: имя, время, размер .pstats и первые
+    строки сводки."""
+    root = profile_root()
+    if not os.path.isdir(root):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(root), reverse=True):
+        if not name.endswith('.pstats') or not NAME_RE.match(name):
+            continue
+        name = name[:-len('.pstats')]
+        path = os.path.join(root, name)
+        stat = os.stat(path + '.pstats')
+        try:
+            with open(path + '.txt', encoding='utf-8') as summary:
+                request_line = summary.readline().strip()
+                status = summary.readline().strip()
+                duration = summary.readline().strip()
+        except FileNotFoundError:
+            request_line = status = duration = ''
+        profiles.append({
+            'name': name,
+            'created': datetime.fromtimestamp(stat.st_mtime, timezone.utc),
+            'size': stat.st_size,
+            'request': request_line,
+            'status': status,
+            'duration': duration,
+        })
+    return profiles
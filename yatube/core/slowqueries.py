@@ -0,0 +1,191 @@
+"""Журнал медленных запросов к базе.
+
+SlowQueryMiddleware подключает SlowQueryLog ко всем соединениям на время
+запроса. Запросы дольше SLOW_QUERY_THRESHOLD миллисекунд запоминаются
+вместе с параметрами и стеком, а после ответа записываются в SlowQuery:
+запросы, отличающиеся только параметрами, складываются в одну запись.
+План выполнения (EXPLAIN) снимается один раз, для нового вида запроса.
+Значения параметров в базу не пишутся — в них бывают пароли, токены
+и личные данные, — только их типы и длины (params_shape).
+Сводку выводит manage.py slow_queries.
+"""
+import hashlib
+import logging
+import re
+import traceback
+from collections import defaultdict
+from contextlib import ExitStack
+from time import perf_counter
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, connections, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import SlowQuery
+
+logger = logging.getLogger(__name__)
+
+# Сколько последних кадров стека из кода проекта сохранять
+STACK_DEPTH = 12
+PARAMS_LENGTH = 1000
+# Сколько параметров описывать; у IN (...) их бывают тысячи
+PARAMS_SHOWN = 20
+
+LITERAL_RES = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), 'N'),
+    # IN (%s, %s, ...) с любым числом параметров — один вид запроса
+    (re.compile(r'\(\s*(?:%s|\?|N)(?:\s*,\s*(?:%s|\?|N))*\s*\)'), '(...)'),
+    (re.compile(r'\s+'), ' '),
+)
+
+
+def query_shape(sql):
+    """SQL без литералов и с одним (...) вместо списков параметров."""
+    for pattern, replacement in LITERAL_RES:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def fingerprint(shape):
+    return hashlib.md5(shape.encode()).hexdigest()
+
+
+def describe(value):
+    name = type(value).__name__
+    if isinstance(value, (str, bytes)):
+        return f'{name}[{len(value)}]'
+    return name
+
+
+def params_shape(params, many=False):
+    """Типы параметров запроса без значений: (int, str[12], NoneType)."""
+    if many:
+        # Параметры executemany могут быть итератором, уже прочитанным
+        return 'executemany'
+    if isinstance(params, dict):
+        items = [f'{key}: {describe(value)}' for key, value in params.items()]
+        brackets = '{}'
+    else:
+        items = [describe(value) for value in params or ()]
+        brackets = '()'
+    if len(items) > PARAMS_SHOWN:
+        items[PARAMS_SHOWN:] = [f'... всего {len(items)}']
+    return brackets[0] + ', '.join(items) + brackets[1]
+
+
+def project_stack():
+    """Кадры стека из кода проекта, без Django и самого журнала."""
+    frames = [
+        frame for frame in traceback.extract_stack()[:-2]
+        if frame.filename.startswith(str(settings.BASE_DIR))
+        and 'site-packages' not in frame.filename
+        and frame.filename != __file__
+    ]
+    return ''.join(traceback.format_list(frames[-STACK_DEPTH:]))
+
+
+def explain(alias, sql, params):
+    """План выполнения запроса или пустая строка для не-SELECT."""
+    if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+        return ''
+    connection = connections[alias]
+    if connection.vendor == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    else:
+        prefix = 'EXPLAIN '
+    try:
+        # Точка сохранения: упавший EXPLAIN не должен испортить транзакцию
+        with transaction.atomic(using=alias), connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            rows = cursor.fetchall()
+    except DatabaseError as error:
+        return f'EXPLAIN не удался: {error}'
+    if connection.vendor == 'sqlite':
+        # id, parent, notused, detail — интересна только детализация
+        return '\n'.join(str(row[-1]) for row in rows)
+    return '\n'.join(' '.join(map(str, row)) for row in rows)
+
+
+class SlowQueryLog:
+    """Обёртка execute_wrapper, запоминающая медленные запросы."""
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.records = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (perf_counter() - started) * 1000
+            if duration >= self.threshold:
+                self.records.append({
+                    'alias': context['connection'].alias,
+                    'sql': sql,
+                    'params': params,
+                    'many': many,
+                    'duration': duration,
+                    'stack': project_stack(),
+                })
+
+    def capture(self):
+        """Контекстный менеджер: журнал подключён ко всем соединениям."""
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self))
+        return stack
+
+    def save(self, view=''):
+        """Записывает накопленное в SlowQuery и очищает журнал."""
+        groups = defaultdict(list)
+        for record in self.records:
+            shape = query_shape(record['sql'])
+            groups[shape].append(record)
+            logger.warning(
+                'Медленный запрос (%.1f мс) в %s: %s',
+                record['duration'], view or '-', record['sql'],
+            )
+        self.records = []
+        for shape, records in groups.items():
+            save_group(shape, records, view)
+
+
+def save_group(shape, records, view):
+    key = fingerprint(shape)
+    durations = [record['duration'] for record in records]
+    changes = {
+        'count': F('count') + len(records),
+        'total_time': F('total_time') + sum(durations),
+        'max_time': Greatest(F('max_time'), max(durations)),
+        'last_seen': timezone.now(),
+    }
+    if SlowQuery.objects.filter(fingerprint=key).update(**changes):
+        return
+    # Новый вид запроса: пример — самый долгий из пришедших
+    example = max(records, key=lambda record: record['duration'])
+    params = example['params']
+    try:
+        with transaction.atomic():
+            SlowQuery.objects.create(
+                fingerprint=key,
+                shape=shape,
+                sql=example['sql'],
+                params=params_shape(params, example['many'])[
+                    :PARAMS_LENGTH
+                ],
+                view=view[:200],
+                stack=example['stack'],
+                plan='' if example['many'] else explain(
+                    example['alias'], example['sql'], params
+                ),
+                count=len(records),
+                total_time=sum(durations),
+                max_time=max(durations),
+            )
+    except IntegrityError:
+        # Ту же запись одновременно создал другой процесс
+        SlowQuery.objects.filter(fingerprint=key).update(**changes)
@@ -0,0 +1,28 @@
+"""Замер холодного старта: импорт WSGI-приложения и первый ответ.
+
+Запускается командой bench_startup в свежем интерпретаторе
+(python -X importtime -m core.startup <адрес>) и печатает замеры в JSON.
+"""
+import json
+import os
+import sys
+import time
+
+
+def main(path):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+    started = time.perf_counter()
+    from yatube.wsgi import application
+    booted = time.perf_counter()
+    from core.warmup import get_page
+    status = get_page(application, path)
+    finished = time.perf_counter()
+    print(json.dumps({
+        'boot': booted - started,
+        'first_response': finished - booted,
+        'status': status,
+    }))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1] if len(sys.argv) > 1 else '/')
@@ -0,0 +1,128 @@
+import hashlib
+import os
+import posixpath
+import tempfile
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+
+from .compression import available_encodings, compress, is_compressible
+
+ENCODING_SUFFIXES = {
+    'br': '.br',
+    'gzip': '.gz',
+}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Статика с хешем содержимого в имени и заранее сжатыми копиями.
+
+    При collectstatic для каждого хешированного файла рядом
+    записываются варианты `.gz` и `.br` (если установлен brotli),
+    которые потом отдаёт `core.middleware.StaticFilesMiddleware`.
+    """
+    manifest_strict = False
+    # Сжатая копия, которая не меньше оригинала хотя бы на 5%,
+    # не стоит лишнего файла на диске.
+    min_compression_ratio = 0.95
+
+    def stored_name(self, name):
+        # Пока collectstatic не запускали, ссылаемся на исходное имя,
+        # чтобы шаблоны рендерились в тестах и при разработке.
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for hashed_name in sorted(set(self.hashed_files.values())):
+            if not is_compressible(hashed_name):
+                continue
+            for compressed_name in self.compress_file(hashed_name):
+                yield hashed_name, compressed_name, True
+
+    def compress_file(self, name):
+        """Пишет сжатые варианты файла и возвращает их имена."""
+        with self.open(name) as original:
+            data = original.read()
+        written = []
+        for encoding in available_encodings():
+            compressed = compress(data, encoding, static=True)
+            if len(compressed) >= len(data) * self.min_compression_ratio:
+                continue
+            compressed_name = name + ENCODING_SUFFIXES[encoding]
+            if self.exists(compressed_name):
+                self.delete(compressed_name)
+            self._save(compressed_name, ContentFile(compressed))
+            written.append(compressed_name)
+        return written
+
+    def is_hashed(self, name):
+        """Имя содержит хеш содержимого — файл можно кешировать навсегда."""
+        return name in self.hashed_files.values()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранилище, где имя файла — SHA-256 его содержимого.
+
+    Одинаковые загрузки получают одно имя и хранятся один раз,
+    а значит и миниатюры sorl строятся для них один раз.
+    Удалять такие файлы можно только через `core.blobs.release`,
+    который учитывает число ссылок; каждая запись отмечается
+    в `core.blobs.touch`, чтобы сборщик не удалил файл, который как раз
+    загрузили снова.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = ContentFile(content, name)
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        digest = digest.hexdigest()
+        extension = os.path.splitext(name)[1].lower()
+        name = posixpath.join(
+            posixpath.dirname(name), digest[:2], digest + extension
+        )
+        return self._save(name, content)
+
+    def _save(self, name, content):
+        # blobs тянет модели, а хранилище создаётся при их загрузке
+        from . import blobs
+
+        # Сначала отметка, потом проверка файла — иначе сборщик мог бы
+        # удалить его между ними
+        blobs.touch(name)
+        full_path = self.path(name)
+        if os.path.exists(full_path):
+            return name
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        # Пишем во временный файл и атомарно переименовываем:
+        # параллельная загрузка того же файла запишет те же байты.
+        descriptor, temp_path = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(descriptor, 'wb') as temp_file:
+                content.seek(0)
+                for chunk in content.chunks():
+                    temp_file.write(chunk)
+            os.chmod(temp_path, self.file_permissions_mode or 0o644)
+            os.replace(temp_path, full_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return name
+
+    def get_available_name(self, name, max_length=None):
+        # Совпадение имён означает совпадение содержимого
+        return name
+
+
+content_addressed_storage = ContentAddressedStorage()
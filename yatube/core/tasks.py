@@ -0,0 +1,18 @@
+from django.db.models import Min
+
+from jobs.queue import enqueue, task
+from .blobs import COLLECT_TASK, collect, grace_period
+from .models import MediaBlob
+from .storage import content_addressed_storage
+
+
+@task(COLLECT_TASK)
+def collect_blobs():
+    """Удаляет файлы, на которые давно не осталось ссылок, и планирует
+    себя снова, если остались файлы с ещё не истёкшим сроком."""
+    collect(content_addressed_storage)
+    pending = MediaBlob.objects.filter(refcount=0).aggregate(
+        oldest=Min('released')
+    )['oldest']
+    if pending is not None:
+        enqueue(COLLECT_TASK, delay=grace_period(), dedupe_key=COLLECT_TASK)
@@ -0,0 +1,99 @@
+"""Тег {% cache %} с защитой от одновременного пересчёта.
+
+Синтаксис и ключи те же, что у встроенного тега из django.templatetags
+.cache, и под ключом лежит сам HTML, так что make_template_fragment_key
+по-прежнему находит фрагменты. Когда фрагмент устаревает, его
+перерисовывает один запрос, а остальные ещё до FRAGMENT_CACHE_STALE
+секунд отдают старую версию (core.cache.fetch_fresh). Попадания,
+промахи и отданные устаревшие версии считаются по имени фрагмента
+(core.metrics.FRAGMENT_CACHE).
+
+Страница, в которую фрагмент попал из кеша, а не отрисован заново,
+не кладётся в кеш страниц (core.cache.skip_page_cache): сброс тегов
+страницы фрагменты не задевает.
+"""
+from django.conf import settings
+from django.core.cache import InvalidCacheBackendError, caches
+from django.core.cache.utils import make_template_fragment_key
+from django.template import Library, TemplateSyntaxError, VariableDoesNotExist
+from django.templatetags.cache import CacheNode, do_cache
+
+from core.cache import fetch_fresh, skip_page_cache
+from core.metrics import FRAGMENT_CACHE
+
+register = Library()
+
+
+class FragmentCacheNode(CacheNode):
+    # Разбор таймаута и выбор кеша — так же, как в CacheNode.render
+
+    def resolve_expire_time(self, context):
+        try:
+            expire_time = self.expire_time_var.resolve(context)
+        except VariableDoesNotExist:
+            raise TemplateSyntaxError(
+                '"cache" tag got an unknown variable: %r'
+                % self.expire_time_var.var
+            )
+        if expire_time is None:
+            return None
+        try:
+            return int(expire_time)
+        except (ValueError, TypeError):
+            raise TemplateSyntaxError(
+                '"cache" tag got a non-integer timeout value: %r'
+                % expire_time
+            )
+
+    def resolve_cache(self, context):
+        if not self.cache_name:
+            try:
+                return caches['template_fragments']
+            except InvalidCacheBackendError:
+                return caches['default']
+        try:
+            cache_name = self.cache_name.resolve(context)
+        except VariableDoesNotExist:
+            raise TemplateSyntaxError(
+                '"cache" tag got an unknown variable: %r'
+                % self.cache_name.var
+            )
+        try:
+            return caches[cache_name]
+        except InvalidCacheBackendError:
+            raise TemplateSyntaxError(
+                'Invalid cache name specified for cache tag: %r' % cache_name
+            )
+
+    def render(self, context):
+        expire_time = self.resolve_expire_time(context)
+        fragment_cache = self.resolve_cache(context)
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        cache_key = make_template_fragment_key(self.fragment_name, vary_on)
+        rendered = []
+
+        def compute():
+            rendered.append(True)
+            return self.nodelist.render(context)
+
+        value, status = fetch_fresh(
+            fragment_cache, cache_key, compute,
+            expire_time,
+            stale=getattr(settings, 'FRAGMENT_CACHE_STALE', 60),
+            lock_timeout=getattr(settings, 'FRAGMENT_CACHE_LOCK_TIMEOUT', 10),
+            beta=getattr(settings, 'FRAGMENT_CACHE_BETA', 1.0),
+        )
+        FRAGMENT_CACHE.inc(fragment=self.fragment_name, result=status)
+        request = getattr(context, 'request', None)
+        if not rendered and request is not None:
+            skip_page_cache(request)
+        return value
+
+
+@register.tag('cache')
+def do_fragment_cache(parser, token):
+    node = do_cache(parser, token)
+    return FragmentCacheNode(
+        node.nodelist, node.expire_time_var, node.fragment_name,
+        node.vary_on, node.cache_name,
+    )
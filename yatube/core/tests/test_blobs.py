@@ -0,0 +1,128 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.blobs import collect
+from core.models import MediaBlob
+from core.storage import content_addressed_storage
+from posts.models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def upload(name='meme.gif', content=SMALL_GIF):
+    return SimpleUploadedFile(name, content, content_type='image/gif')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedStorageTests(TestCase):
+    """Хранение картинок по хешу содержимого со счётчиком ссылок."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='blob-author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, image):
+        return Post.objects.create(text='Мем', author=self.author, image=image)
+
+    def refcount(self, name):
+        return MediaBlob.objects.get(name=name).refcount
+
+    def collect_later(self):
+        return collect(
+            content_addressed_storage,
+            now=timezone.now() + timedelta(days=1),
+        )
+
+    def test_identical_uploads_stored_once(self):
+        """Одинаковые загрузки под разными именами — один файл."""
+        first = self.create_post(upload('first.gif'))
+        second = self.create_post(upload('second.GIF'))
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(first.image.name.startswith('posts/'))
+        self.assertTrue(first.image.name.endswith('.gif'))
+        directory = os.path.dirname(first.image.path)
+        self.assertEqual(len(os.listdir(directory)), 1)
+        self.assertEqual(self.refcount(first.image.name), 2)
+
+    def test_blob_removed_after_last_reference(self):
+        """Файл удаляется только когда на него не осталось ссылок."""
+        first = self.create_post(upload())
+        second = self.create_post(upload())
+        name, path = first.image.name, first.image.path
+
+        first.delete()
+        self.assertEqual(self.refcount(name), 1)
+        self.assertEqual(self.collect_later(), [])
+
+        post = Post.objects.get(pk=second.pk)
+        post.image = upload('other.gif', SMALL_GIF + b'\x00')
+        post.save()
+        self.assertEqual(self.refcount(name), 0)
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(self.collect_later(), [name])
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(MediaBlob.objects.filter(name=name).exists())
+
+    def test_reupload_during_grace_period_keeps_blob(self):
+        """Повторная загрузка до удаления сохраняет файл."""
+        name = self.create_post(upload()).image.name
+        Post.objects.filter(image=name).get().delete()
+        self.create_post(upload())
+        self.assertEqual(self.refcount(name), 1)
+        self.assertEqual(self.collect_later(), [])
+        self.assertTrue(content_addressed_storage.exists(name))
+
+    def test_reupload_after_expiry_not_collected(self):
+        """Загрузка того же файла продлевает срок, даже если он истёк."""
+        name = self.create_post(upload()).image.name
+        Post.objects.filter(image=name).get().delete()
+        MediaBlob.objects.filter(name=name).update(
+            released=timezone.now() - timedelta(days=2)
+        )
+        # Файл загружен, пост с ним ещё не сохранён
+        content_addressed_storage.save('posts/meme.gif', upload())
+        self.assertEqual(collect(content_addressed_storage), [])
+        self.assertTrue(content_addressed_storage.exists(name))
+
+    def test_reupload_after_collect_rewrites_file(self):
+        """Загрузка после удаления файла сборщиком пишет его заново."""
+        name = self.create_post(upload()).image.name
+        Post.objects.filter(image=name).get().delete()
+        self.assertEqual(self.collect_later(), [name])
+        post = self.create_post(upload())
+        self.assertEqual(post.image.name, name)
+        self.assertTrue(content_addressed_storage.exists(name))
+        self.assertEqual(self.refcount(name), 1)
+
+    def test_unused_upload_collected(self):
+        """Загрузка, на которую так и не сослались, удаляется."""
+        name = content_addressed_storage.save(
+            'posts/lost.gif', upload(content=SMALL_GIF + b'\x01')
+        )
+        self.assertEqual(self.collect_later(), [name])
+        self.assertFalse(content_addressed_storage.exists(name))
@@ -0,0 +1,86 @@
+import gzip
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from core import compression
+from core.middleware import CompressionMiddleware
+from core.tests.utils import ClearCachesMixin
+from posts.models import Post
+
+User = get_user_model()
+
+
+class CompressionMiddlewareTests(ClearCachesMixin, TestCase):
+    """Сжатие ответов."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='compress-author')
+        Post.objects.bulk_create(
+            Post(text='Повторяющийся текст поста', author=cls.author)
+            for _ in range(10)
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.factory = RequestFactory()
+
+    def get_middleware(self, response):
+        return CompressionMiddleware(lambda request: response)
+
+    def test_feed_compressed_with_gzip(self):
+        """Лента сжимается gzip и распаковывается в исходный HTML."""
+        plain = self.client.get(reverse('posts:index'))
+        response = self.client.get(
+            reverse('posts:index'), HTTP_ACCEPT_ENCODING='gzip'
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertLess(len(response.content), len(plain.content))
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+
+    @skipUnless(compression.brotli, 'brotli не установлен')
+    def test_brotli_preferred(self):
+        """При поддержке клиентом brotli выбирается он."""
+        response = self.client.get(
+            reverse('posts:index'), HTTP_ACCEPT_ENCODING='gzip, br'
+        )
+        self.assertEqual(response['Content-Encoding'], 'br')
+
+    def test_fragment_cache_stored_uncompressed(self):
+        """Фрагмент ленты в кеше хранится несжатым."""
+        self.client.get(reverse('posts:index'), HTTP_ACCEPT_ENCODING='gzip')
+        fragment = cache.get(make_template_fragment_key('index_article', [1]))
+        self.assertIn('<article', fragment)
+
+    def test_small_and_foreign_responses_untouched(self):
+        """Короткие ответы и типы вне списка не сжимаются."""
+        request = self.factory.get('/', HTTP_ACCEPT_ENCODING='gzip')
+        responses = (
+            HttpResponse('short'),
+            HttpResponse(b'x' * 4096, content_type='image/png'),
+        )
+        for response in responses:
+            with self.subTest(content_type=response['Content-Type']):
+                result = self.get_middleware(response)(request)
+                self.assertNotIn('Content-Encoding', result)
+
+    def test_streaming_response_compressed(self):
+        """Потоковые ответы сжимаются по кусочкам."""
+        chunks = [b'<p>chunk</p>' * 100 for _ in range(5)]
+        request = self.factory.get('/', HTTP_ACCEPT_ENCODING='gzip')
+        response = self.get_middleware(
+            StreamingHttpResponse(iter(chunks))
+        )(request)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(
+            gzip.decompress(b''.join(response.streaming_content)),
+            b''.join(chunks),
+        )
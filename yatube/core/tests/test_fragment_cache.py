@@ -0,0 +1,96 @@
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import caches
+from django.core.cache.utils import make_template_fragment_key
+from django.template import Context, Template
+from django.test import SimpleTestCase
+
+from core.cache import FRESH_SUFFIX, LOCK_SUFFIX, fetch_fresh
+
+
+class FetchFreshTests(SimpleTestCase):
+    """Пересчёт значений кеша без «набега»."""
+
+    def setUp(self):
+        self.cache = caches['default']
+        self.cache.clear()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return f'value {self.calls}'
+
+    def fetch(self, **options):
+        return fetch_fresh(self.cache, 'key', self.compute, 20, **options)
+
+    def test_miss_then_hit(self):
+        """Значение хранится под своим ключом как есть."""
+        self.assertEqual(self.fetch(), ('value 1', 'miss'))
+        self.assertEqual(self.fetch(beta=0), ('value 1', 'hit'))
+        self.assertEqual(self.cache.get('key'), 'value 1')
+
+    def test_stale_while_refreshing(self):
+        """Пока другой запрос пересчитывает, отдаётся старое значение."""
+        self.cache.set('key', 'old')
+        self.cache.add('key' + LOCK_SUFFIX, True)
+        self.assertEqual(self.fetch(), ('old', 'stale'))
+        self.assertEqual(self.calls, 0)
+        self.cache.delete('key' + LOCK_SUFFIX)
+        self.assertEqual(self.fetch(), ('value 1', 'stale'))
+        self.assertEqual(self.fetch(beta=0), ('value 1', 'hit'))
+
+    def test_early_expiration(self):
+        """Долгий прошлый пересчёт у конца срока запускает новый раньше."""
+        self.cache.set('key', 'old')
+        self.cache.set('key' + FRESH_SUFFIX, (time.time() + 1, 100))
+        with mock.patch('core.cache.random.random', return_value=0.5):
+            self.assertEqual(self.fetch(), ('value 1', 'early'))
+        self.assertEqual(
+            self.fetch(beta=0), ('value 1', 'hit')
+        )
+
+    def test_cold_waits_for_other(self):
+        """Без значения запрос ждёт того, кто считает, а не дождавшись —
+        считает сам."""
+        self.cache.add('key' + LOCK_SUFFIX, True)
+        self.assertEqual(self.fetch(wait=0), ('value 1', 'miss'))
+
+    def test_single_flight(self):
+        """Из многих одновременных запросов пересчитывает один."""
+        self.cache.set('key', 'old')
+
+        def slow():
+            time.sleep(0.1)
+            return self.compute()
+
+        results = []
+
+        def request():
+            results.append(fetch_fresh(self.cache, 'key', slow, 20)[0])
+
+        threads = [threading.Thread(target=request) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results.count('value 1'), 1)
+        self.assertEqual(results.count('old'), 7)
+
+    def test_template_tag_keys(self):
+        """Тег кладёт фрагмент под ключ make_template_fragment_key."""
+        template = Template(
+            '{% load fragment_cache %}'
+            '{% cache 20 article item %}<p>{{ item }}</p>{% endcache %}'
+        )
+        template.render(Context({'item': 'a'}))
+        self.assertEqual(
+            self.cache.get(make_template_fragment_key('article', ['a'])),
+            '<p>a</p>',
+        )
+        self.cache.delete(make_template_fragment_key('article', ['a']))
+        self.assertEqual(
+            template.render(Context({'item': 'a'})), '<p>a</p>'
+        )
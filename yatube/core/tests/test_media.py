@@ -0,0 +1,112 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+CONTENT = bytes(range(256)) * 4
+HASHED_NAME = 'posts/ab/' + 'ab' * 32 + '.gif'
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ServeMediaTests(TestCase):
+    """Раздача медиафайлов."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        for name in ('posts/plain.gif', HASHED_NAME):
+            path = os.path.join(TEMP_MEDIA_ROOT, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as media_file:
+                media_file.write(CONTENT)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def get(self, name='posts/plain.gif', **headers):
+        return self.client.get(settings.MEDIA_URL + name, **headers)
+
+    def test_full_file(self):
+        """Файл отдаётся целиком с заголовками кеширования."""
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+        self.assertEqual(response['Content-Type'], 'image/gif')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertNotIn('immutable', response['Cache-Control'])
+
+    def test_hashed_file_immutable(self):
+        """Файл с хешем в имени кешируется навсегда."""
+        response = self.get(HASHED_NAME)
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_conditional_requests(self):
+        """Совпадающие ETag или дата дают 304."""
+        response = self.get()
+        conditions = {
+            'HTTP_IF_NONE_MATCH': response['ETag'],
+            'HTTP_IF_MODIFIED_SINCE': response['Last-Modified'],
+        }
+        for header, value in conditions.items():
+            with self.subTest(header=header):
+                self.assertEqual(
+                    self.get(**{header: value}).status_code, 304
+                )
+
+    def test_ranges(self):
+        """Range отдаёт запрошенную часть файла."""
+        cases = {
+            'bytes=0-9': (0, 9),
+            'bytes=1000-': (1000, len(CONTENT) - 1),
+            'bytes=-24': (len(CONTENT) - 24, len(CONTENT) - 1),
+            'bytes=10-100000': (10, len(CONTENT) - 1),
+        }
+        for header, (start, end) in cases.items():
+            with self.subTest(range=header):
+                response = self.get(HTTP_RANGE=header)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(
+                    response['Content-Range'],
+                    f'bytes {start}-{end}/{len(CONTENT)}',
+                )
+                self.assertEqual(
+                    b''.join(response.streaming_content),
+                    CONTENT[start:end + 1],
+                )
+
+    def test_unsatisfiable_range(self):
+        """Диапазон за концом файла — 416."""
+        response = self.get(HTTP_RANGE='bytes=5000-6000')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(CONTENT)}')
+
+    def test_stale_if_range_returns_full_file(self):
+        """Если файл изменился, If-Range отменяет докачку."""
+        response = self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"old"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_and_outside_files(self):
+        """Несуществующие файлы и выход за MEDIA_ROOT — 404."""
+        for name in ('posts/missing.gif', '../manage.py', 'posts'):
+            with self.subTest(name=name):
+                self.assertEqual(self.get(name).status_code, 404)
+
+    def test_sendfile_modes(self):
+        """Передача файла фронт-прокси."""
+        path = os.path.join(TEMP_MEDIA_ROOT, 'posts', 'plain.gif')
+        cases = {
+            'x-accel-redirect': (
+                'X-Accel-Redirect', '/protected-media/posts/plain.gif'
+            ),
+            'x-sendfile': ('X-Sendfile', path),
+        }
+        for mode, (header, value) in cases.items():
+            with self.subTest(mode=mode), self.settings(MEDIA_SENDFILE=mode):
+                response = self.get()
+                self.assertEqual(response[header], value)
+                self.assertEqual(response.content, b'')
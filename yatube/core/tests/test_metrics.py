@@ -0,0 +1,155 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+from core.tests.utils import ClearCachesMixin
+from jobs.models import Job
+from jobs.worker import Worker
+
+User = get_user_model()
+
+TEMP_METRICS_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def sample_value(text, line_start):
+    for line in text.splitlines():
+        if line.startswith(line_start + ' '):
+            return float(line.rsplit(' ', 1)[1])
+    return None
+
+
+@override_settings(METRICS_TOKEN='secret')
+class MetricsTests(ClearCachesMixin, TestCase):
+    """Метрики Prometheus."""
+
+    def setUp(self):
+        super().setUp()
+        metrics.registry.clear()
+
+    def scrape(self):
+        response = self.client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        return response.content.decode()
+
+    def test_protected(self):
+        """Без токена и прав сотрудника метрики закрыты."""
+        url = reverse('metrics')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(
+            self.client.get(
+                url, HTTP_AUTHORIZATION='Bearer wrong'
+            ).status_code,
+            403,
+        )
+        staff = User.objects.create_user(username='ops', is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_requests_and_fragments(self):
+        """Время ответа, статусы, запросы к базе и кеш фрагментов."""
+        # Со входом, чтобы не попасть в кеш целых страниц
+        self.client.force_login(User.objects.create_user(username='reader'))
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        text = self.scrape()
+        self.assertEqual(sample_value(
+            text,
+            'yatube_requests_total'
+            '{view="posts:index",method="GET",status="200"}',
+        ), 2)
+        self.assertEqual(sample_value(
+            text,
+            'yatube_request_duration_seconds_bucket'
+            '{view="posts:index",le="+Inf"}',
+        ), 2)
+        self.assertGreater(sample_value(
+            text, 'yatube_db_queries_total{view="posts:index"}'
+        ), 0)
+        self.assertEqual(sample_value(
+            text,
+            'yatube_fragment_cache_total'
+            '{fragment="index_article",result="miss"}',
+        ), 1)
+        self.assertEqual(sample_value(
+            text,
+            'yatube_fragment_cache_total'
+            '{fragment="index_article",result="hit"}',
+        ), 1)
+
+    def test_job_queue(self):
+        """Длина очереди считается при каждом запросе метрик."""
+        Job.objects.create(task='core.collect_blobs')
+        text = self.scrape()
+        self.assertEqual(
+            sample_value(text, 'yatube_jobs{status="queued"}'), 1
+        )
+        self.assertEqual(
+            sample_value(text, 'yatube_jobs{status="running"}'), 0
+        )
+
+    @override_settings(METRICS_DIR=TEMP_METRICS_DIR)
+    def test_processes_are_summed(self):
+        """Значения из файлов других процессов складываются."""
+        self.addCleanup(shutil.rmtree, TEMP_METRICS_DIR, True)
+        os.makedirs(TEMP_METRICS_DIR, exist_ok=True)
+        with open(os.path.join(TEMP_METRICS_DIR, '1.json'), 'w') as other:
+            json.dump([[
+                'yatube_fragment_cache_total',
+                [['fragment', 'profile_article'], ['result', 'hit']],
+                5,
+            ]], other)
+        metrics.FRAGMENT_CACHE.inc(fragment='profile_article', result='hit')
+        text = self.scrape()
+        self.assertEqual(sample_value(
+            text,
+            'yatube_fragment_cache_total'
+            '{fragment="profile_article",result="hit"}',
+        ), 6)
+
+    @override_settings(METRICS_DIR=TEMP_METRICS_DIR)
+    def test_dead_processes_merged(self):
+        """Файл завершившегося процесса переносится в dead.json,
+        а его значения остаются в сумме."""
+        self.addCleanup(shutil.rmtree, TEMP_METRICS_DIR, True)
+        os.makedirs(TEMP_METRICS_DIR, exist_ok=True)
+        process = subprocess.Popen([sys.executable, '-c', ''])
+        process.wait()
+        dead_path = os.path.join(TEMP_METRICS_DIR, f'{process.pid}.json')
+        with open(dead_path, 'w') as dead:
+            json.dump([['yatube_requests_total', [
+                ['view', 'posts:index'], ['method', 'GET'], ['status', '200']
+            ], 3]], dead)
+        for _ in range(2):
+            text = self.scrape()
+            self.assertEqual(sample_value(
+                text,
+                'yatube_requests_total'
+                '{view="posts:index",method="GET",status="200"}',
+            ), 3)
+        self.assertFalse(os.path.exists(dead_path))
+        self.assertTrue(
+            os.path.exists(os.path.join(TEMP_METRICS_DIR, 'dead.json'))
+        )
+
+    @override_settings(METRICS_DIR=TEMP_METRICS_DIR)
+    def test_worker_flushes(self):
+        """Обработчик очереди сбрасывает метрики в METRICS_DIR."""
+        self.addCleanup(shutil.rmtree, TEMP_METRICS_DIR, True)
+        metrics.THUMBNAIL_DURATION.observe(0.2)
+        Worker(name='test-worker').run(drain=True)
+        samples = metrics.read_samples(metrics.registry.path())
+        self.assertEqual(
+            samples[('yatube_thumbnail_duration_seconds_count', ())], 1
+        )
@@ -0,0 +1,173 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.tests.utils import ClearCachesMixin, shared_caches
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+@shared_caches()
+class AnonymousPageCacheTests(ClearCachesMixin, TestCase):
+    """Кеш целых страниц для анонимов."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='page-cache-author')
+        cls.group = Group.objects.create(title='Кошки', slug='cats')
+        cls.other_group = Group.objects.create(title='Собаки', slug='dogs')
+        cls.post = Post.objects.create(
+            text='Пост про кошек', author=cls.author, group=cls.group
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.guest_client = Client()
+        self.urls = {
+            'index': reverse('posts:index'),
+            'group': reverse('posts:group_posts', args=('cats',)),
+            'other_group': reverse('posts:group_posts', args=('dogs',)),
+            'profile': reverse('posts:profile', args=(self.author,)),
+            'post': reverse('posts:post_detail', args=(self.post.pk,)),
+        }
+
+    def warm(self, *names):
+        for name in names:
+            self.guest_client.get(self.urls[name])
+
+    def cache_status(self, name):
+        return self.guest_client.get(self.urls[name])['X-Page-Cache']
+
+    def expire_fragment(self, name, *vary_on):
+        """Как будто у фрагмента шаблона истёк срок."""
+        cache.delete(make_template_fragment_key(name, vary_on))
+
+    def assert_index_shows(self, text, shown=True):
+        """После сброса тегов страница не отдаётся и не кешируется
+        с фрагментом из кеша; после перерисовки фрагмента она
+        кешируется уже с новым содержимым."""
+        assert_shown = self.assertContains if shown else self.assertNotContains
+        for _ in range(2):
+            response = self.guest_client.get(self.urls['index'])
+            self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.expire_fragment('index_article', 1)
+        response = self.guest_client.get(self.urls['index'])
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        assert_shown(response, text)
+        response = self.guest_client.get(self.urls['index'])
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        assert_shown(response, text)
+
+    def test_hit_skips_database(self):
+        """Повторный анонимный запрос отдаётся из кеша без запросов к БД."""
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                self.assertEqual(
+                    self.guest_client.get(url)['X-Page-Cache'], 'miss'
+                )
+                with self.assertNumQueries(0):
+                    response = self.guest_client.get(url)
+                self.assertEqual(response['X-Page-Cache'], 'hit')
+
+    def test_session_and_csrf_cookies_bypass_cache(self):
+        """С cookie сессии или CSRF страница рендерится заново."""
+        self.warm('index')
+        for cookie in (settings.SESSION_COOKIE_NAME,
+                       settings.CSRF_COOKIE_NAME):
+            with self.subTest(cookie=cookie):
+                client = Client()
+                client.cookies[cookie] = 'value'
+                response = client.get(self.urls['index'])
+                self.assertNotIn('X-Page-Cache', response)
+
+    def test_authorized_user_not_cached(self):
+        """Авторизованный пользователь всегда получает свою страницу."""
+        self.warm('index')
+        client = Client()
+        client.force_login(self.author)
+        response = client.get(self.urls['index'])
+        self.assertNotIn('X-Page-Cache', response)
+        self.assertContains(response, 'Новая запись')
+
+    def test_query_params_in_key(self):
+        """Номер страницы входит в ключ, посторонние параметры — нет."""
+        self.warm('index')
+        response = self.guest_client.get(self.urls['index'] + '?utm=mail')
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        response = self.guest_client.get(self.urls['index'] + '?page=2')
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+
+    def test_new_post_invalidates_only_related_pages(self):
+        """Новый пост сбрасывает ленту, группу и автора, но не чужую
+        группу."""
+        self.warm('index', 'group', 'other_group', 'profile')
+        Post.objects.create(
+            text='Ещё пост', author=self.author, group=self.group
+        )
+        expected = {
+            'index': 'miss',
+            'group': 'miss',
+            'profile': 'miss',
+            'other_group': 'hit',
+        }
+        for name, status in expected.items():
+            with self.subTest(page=name):
+                self.assertEqual(self.cache_status(name), status)
+
+    def test_moving_post_invalidates_old_group(self):
+        """Перенос поста в другую группу сбрасывает обе группы."""
+        self.warm('group', 'other_group')
+        post = Post.objects.get(pk=self.post.pk)
+        post.group = self.other_group
+        post.save()
+        self.assertEqual(self.cache_status('group'), 'miss')
+        self.assertEqual(self.cache_status('other_group'), 'miss')
+
+    def test_comment_invalidates_post_page(self):
+        """Комментарий сбрасывает только страницу поста."""
+        self.warm('post', 'index')
+        Comment.objects.create(
+            post=self.post, author=self.author, text='Комментарий'
+        )
+        self.assertEqual(self.cache_status('post'), 'miss')
+        self.assertEqual(self.cache_status('index'), 'hit')
+
+    def test_created_post_shown(self):
+        """Новый пост появляется в закешированной ленте."""
+        self.warm('index')
+        Post.objects.create(text='Свежий пост', author=self.author)
+        self.assert_index_shows('Свежий пост')
+
+    def test_edited_post_shown(self):
+        """Исправленный текст виден в ленте и на странице поста."""
+        self.warm('index', 'post')
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Исправленный пост'
+        post.save()
+        self.assert_index_shows('Исправленный пост')
+        for status in ('miss', 'hit'):
+            with self.subTest(status=status):
+                response = self.guest_client.get(self.urls['post'])
+                self.assertEqual(response['X-Page-Cache'], status)
+                self.assertContains(response, 'Исправленный пост')
+                self.assertNotContains(response, 'Пост про кошек')
+
+    def test_deleted_post_dropped(self):
+        """Удалённый пост пропадает из закешированной ленты."""
+        post = Post.objects.create(text='Удаляемый пост', author=self.author)
+        self.warm('index')
+        post.delete()
+        self.assert_index_shows('Удаляемый пост', shown=False)
+
+
+class LocalPageCacheTests(TestCase):
+    """На кеше одного процесса кеш страниц выключен."""
+
+    def test_locmem_disabled(self):
+        response = Client().get(reverse('posts:index'))
+        self.assertNotIn('X-Page-Cache', response)
@@ -0,0 +1,100 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import profiling
+
+User = get_user_model()
+
+TEMP_PROFILE_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(PROFILE_ROOT=TEMP_PROFILE_ROOT, PROFILE_KEEP=2)
+class ProfilingTests(TestCase):
+    """Профилирование запросов по токену сотрудника."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create_user(username='boss', is_staff=True)
+        cls.user = User.objects.create_user(username='reader')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_PROFILE_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        shutil.rmtree(TEMP_PROFILE_ROOT, ignore_errors=True)
+
+    def profile(self, token):
+        return self.client.get('/about/tech/', HTTP_X_PROFILE=token)
+
+    def test_profiled_request(self):
+        """Запрос с токеном сохраняет .pstats и сводку."""
+        self.client.force_login(self.staff)
+        response = self.profile(profiling.make_token(self.staff))
+        name = response['X-Profile']
+        with open(os.path.join(TEMP_PROFILE_ROOT, name + '.txt'),
+                  encoding='utf-8') as summary:
+            self.assertTrue(summary.readline().startswith('GET /about/tech/'))
+        self.assertTrue(
+            os.path.exists(os.path.join(TEMP_PROFILE_ROOT, name + '.pstats'))
+        )
+
+    def test_rejected_tokens(self):
+        """Без токена, с чужим, поддельным или утёкшим токеном, а также
+        с токеном в адресе профиля нет."""
+        token = profiling.make_token(self.staff)
+        cases = {
+            'нет токена': (self.staff, None, ''),
+            'не сотрудник': (
+                self.user, profiling.make_token(self.user), ''
+            ),
+            'подделка': (
+                self.staff, f'{self.staff.pk}:forged:signature', ''
+            ),
+            'чужая сессия': (self.user, token, ''),
+            'без сессии': (None, token, ''),
+            'в адресе': (self.staff, None, f'?_profile={token}'),
+        }
+        for case, (user, header, query) in cases.items():
+            with self.subTest(case=case):
+                self.client.logout()
+                if user:
+                    self.client.force_login(user)
+                extra = {'HTTP_X_PROFILE': header} if header else {}
+                response = self.client.get('/about/tech/' + query, **extra)
+                self.assertNotIn('X-Profile', response)
+        self.assertFalse(os.path.exists(TEMP_PROFILE_ROOT))
+
+    def test_ring_buffer(self):
+        """Хранятся только PROFILE_KEEP последних снимков."""
+        self.client.force_login(self.staff)
+        token = profiling.make_token(self.staff)
+        names = [self.profile(token)['X-Profile'] for _ in range(3)]
+        self.assertEqual(
+            [profile['name'] for profile in profiling.list_profiles()],
+            names[:0:-1],
+        )
+
+    def test_admin_page(self):
+        """Сотрудник видит список снимков и скачивает их."""
+        self.client.force_login(self.staff)
+        name = self.profile(profiling.make_token(self.staff))['X-Profile']
+        self.client.force_login(self.user)
+        self.assertEqual(
+            self.client.get(reverse('profiles')).status_code, 302
+        )
+        self.client.force_login(self.staff)
+        self.assertContains(self.client.get(reverse('profiles')), name)
+        response = self.client.get(
+            reverse('profile_download', args=(name + '.pstats',))
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('attachment', response['Content-Disposition'])
@@ -0,0 +1,69 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from core.models import SlowQuery
+from core.slowqueries import SlowQueryLog, params_shape, query_shape
+from core.tests.utils import ClearCachesMixin
+from posts.models import Post, User
+
+
+class SlowQueryTests(ClearCachesMixin, TestCase):
+    """Журнал медленных запросов."""
+
+    def test_query_shape(self):
+        """Литералы и списки параметров не различают виды запросов."""
+        self.assertEqual(
+            query_shape("SELECT * FROM t WHERE a = 'x' AND b IN (%s, %s)"),
+            query_shape("SELECT *  FROM t WHERE a = 'y' AND b IN (%s)"),
+        )
+
+    def test_dedupe_and_explain(self):
+        """Запросы одного вида — одна запись с планом выполнения."""
+        log = SlowQueryLog(threshold=0)
+        with log.capture():
+            for pk in (1, 2, 3):
+                list(Post.objects.filter(pk__in=range(pk)))
+        with self.assertLogs('core.slowqueries', 'WARNING'):
+            log.save(view='posts.views.index')
+        query = SlowQuery.objects.get()
+        self.assertEqual(query.count, 3)
+        self.assertEqual(query.view, 'posts.views.index')
+        self.assertIn('posts_post', query.plan)
+        self.assertIn('test_slowqueries.py', query.stack)
+
+    def test_params_not_stored(self):
+        """Значения параметров в журнал не попадают, только типы."""
+        log = SlowQueryLog(threshold=0)
+        with log.capture():
+            User.objects.filter(password='секрет-123').exists()
+        with self.assertLogs('core.slowqueries', 'WARNING'):
+            log.save()
+        query = SlowQuery.objects.get()
+        self.assertNotIn('секрет', query.params)
+        self.assertIn('str[10]', query.params)
+
+    def test_params_shape(self):
+        """Длинные списки параметров описываются кратко."""
+        self.assertEqual(
+            params_shape((1, 'ab', None, b'x')),
+            '(int, str[2], NoneType, bytes[1])',
+        )
+        self.assertEqual(params_shape({'a': 1.5}), '{a: float}')
+        self.assertTrue(
+            params_shape(range(25)).endswith('int, ... всего 25)')
+        )
+
+    @override_settings(SLOW_QUERY_THRESHOLD=0)
+    def test_middleware_and_command(self):
+        """Запросы страницы попадают в журнал, команда выводит сводку."""
+        with self.assertLogs('core.slowqueries', 'WARNING'):
+            self.client.get('/')
+        self.assertTrue(SlowQuery.objects.filter(
+            view='posts.views.index'
+        ).exists())
+        output = StringIO()
+        call_command('slow_queries', plan=True, clear=True, stdout=output)
+        self.assertIn('posts.views.index', output.getvalue())
+        self.assertFalse(SlowQuery.objects.exists())
@@ -0,0 +1,47 @@
+import subprocess
+import sys
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from core.management.commands.bench_startup import parse_importtime
+
+# Модули, которые не должны загружаться при старте процесса
+LAZY_MODULES = ('PIL.Image', 'sorl.thumbnail.images', 'cProfile', 'pstats')
+
+CHECK_SCRIPT = f'''
+import os, sys
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+import django
+django.setup()
+from django.core.handlers.wsgi import WSGIHandler
+WSGIHandler()
+print(' '.join(name for name in {LAZY_MODULES!r} if name in sys.modules))
+'''
+
+
+class StartupTests(SimpleTestCase):
+    """Холодный старт."""
+
+    def test_heavy_modules_are_lazy(self):
+        """Картинки, миниатюры и профилировщик грузятся при первом
+        использовании, а не при старте."""
+        result = subprocess.run(
+            [sys.executable, '-c', CHECK_SCRIPT],
+            cwd=settings.BASE_DIR,
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+            check=True,
+        )
+        self.assertEqual(result.stdout.strip(), '')
+
+    def test_parse_importtime(self):
+        stderr = (
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:       120 |        120 |   posts.models\n'
+            'import time:      1500 |       2000 | posts\n'
+        )
+        self.assertEqual(parse_importtime(stderr), {
+            'posts.models': (0.00012, 0.00012),
+            'posts': (0.0015, 0.002),
+        })
@@ -0,0 +1,105 @@
+import gzip
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.templatetags.static import static
+from django.test import TestCase, override_settings
+
+from core.compression import choose_encoding
+
+TEMP_STATIC_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SOURCE_DIR = os.path.join(TEMP_STATIC_DIR, 'source')
+COLLECTED_DIR = os.path.join(TEMP_STATIC_DIR, 'collected')
+CSS = b'.btn { color: red; }\n' * 200
+
+
+@override_settings(
+    STATICFILES_DIRS=(SOURCE_DIR,),
+    STATIC_ROOT=COLLECTED_DIR,
+)
+class StaticPipelineTests(TestCase):
+    """Хешированная и заранее сжатая статика."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        os.makedirs(os.path.join(SOURCE_DIR, 'css'))
+        with open(os.path.join(SOURCE_DIR, 'css', 'site.css'), 'wb') as f:
+            f.write(CSS)
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_STATIC_DIR, ignore_errors=True)
+
+    def setUp(self):
+        self.hashed_url = static('css/site.css')
+
+    def test_collectstatic_writes_hashed_and_compressed_files(self):
+        """collectstatic пишет файл с хешем и его .gz копию."""
+        hashed_name = staticfiles_storage.stored_name('css/site.css')
+        self.assertNotEqual(hashed_name, 'css/site.css')
+        self.assertEqual(self.hashed_url, settings.STATIC_URL + hashed_name)
+        with open(os.path.join(COLLECTED_DIR, hashed_name + '.gz'),
+                  'rb') as f:
+            self.assertEqual(gzip.decompress(f.read()), CSS)
+
+    def test_hashed_file_served_immutable_and_compressed(self):
+        """Хешированный файл отдаётся сжатым и с immutable."""
+        response = self.client.get(
+            self.hashed_url, HTTP_ACCEPT_ENCODING='gzip'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(
+            gzip.decompress(b''.join(response.streaming_content)), CSS
+        )
+
+    def test_plain_name_is_not_immutable(self):
+        """Файл без хеша не кешируется надолго и не сжимается без
+        Accept-Encoding."""
+        response = self.client.get(settings.STATIC_URL + 'css/site.css')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Content-Encoding', response)
+        self.assertNotIn('immutable', response['Cache-Control'])
+
+    def test_path_outside_root_not_served(self):
+        """Путь за пределы STATIC_ROOT не отдаётся и не роняет запрос."""
+        response = self.client.get(
+            settings.STATIC_URL + '..%2f..%2fmanage.py'
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_etag_revalidation(self):
+        """Повторный запрос с If-None-Match получает 304."""
+        response = self.client.get(
+            self.hashed_url, HTTP_ACCEPT_ENCODING='gzip'
+        )
+        response = self.client.get(
+            self.hashed_url,
+            HTTP_ACCEPT_ENCODING='gzip',
+            HTTP_IF_NONE_MATCH=response['ETag'],
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_choose_encoding(self):
+        """Выбор кодировки учитывает q-значения."""
+        cases = {
+            'gzip, deflate': 'gzip',
+            'br;q=0.5, gzip': 'gzip',
+            'br, gzip': 'br',
+            'identity': None,
+            'gzip;q=0': None,
+        }
+        for header, expected in cases.items():
+            with self.subTest(header=header):
+                self.assertEqual(
+                    choose_encoding(header, ('br', 'gzip')), expected
+                )
@@ -0,0 +1,113 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core import warmup
+from core.tests.utils import ClearCachesMixin, shared_caches
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class WarmupTests(ClearCachesMixin, TestCase):
+    """Прогрев кешей после деплоя."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='popular')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Горячая', slug='hot')
+        Group.objects.create(title='Пустая', slug='empty')
+        cls.post = Post.objects.create(
+            text='Обсуждаемый пост', author=cls.author, group=cls.group
+        )
+        Post.objects.create(text='Тихий пост', author=cls.reader)
+        Comment.objects.create(post=cls.post, author=cls.reader, text='!')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def test_paths(self):
+        """Главная, активные группы, профили и посты; второй страницы
+        главной при двух постах нет."""
+        self.assertEqual(warmup.get_paths(pages=2), [
+            reverse('posts:index'),
+            reverse('posts:group_posts', args=('hot',)),
+            reverse('posts:profile', args=('popular',)),
+            reverse('posts:post_detail', args=(self.post.pk,)),
+        ])
+
+    @override_settings(
+        CACHE_WARMUP_ON_BOOT=True,
+        CACHE_WARMUP_PATHS='core.tests.test_warmup.boot_paths',
+    )
+    def test_boot_hook(self):
+        """При старте процесса прогрев идёт в фоновом потоке."""
+        fetched = []
+
+        def application(environ, start_response):
+            fetched.append(environ['PATH_INFO'])
+            start_response('200 OK', [])
+            return [b'']
+
+        warmup.warm_on_boot(application).join()
+        self.assertEqual(sorted(fetched), ['/a/', '/b/'])
+
+
+def boot_paths():
+    return ['/a/', '/b/']
+
+
+@shared_caches()
+class WarmCommandTests(ClearCachesMixin, TransactionTestCase):
+    """Команда warm_caches. Страницы запрашиваются из потоков пула,
+    поэтому данные должны быть закоммичены."""
+
+    def setUp(self):
+        super().setUp()
+        author = User.objects.create_user(username='popular')
+        group = Group.objects.create(title='Горячая', slug='hot')
+        Post.objects.create(text='Пост', author=author, group=group)
+
+    def test_warm_fills_page_cache(self):
+        """После прогрева страницы отдаются из кеша."""
+        output = StringIO()
+        call_command('warm_caches', threads=2, host='testserver',
+                     stdout=output)
+        self.assertIn('Прогрето страниц: 2 из 2', output.getvalue())
+        for path in (reverse('posts:index'),
+                     reverse('posts:group_posts', args=('hot',))):
+            with self.subTest(path=path):
+                self.assertEqual(
+                    self.client.get(path)['X-Page-Cache'], 'hit'
+                )
+
+    def test_pages_not_mixed(self):
+        """Каждая страница ленты прогревается со своими постами."""
+        author = User.objects.get(username='popular')
+        for number in range(14):
+            Post.objects.create(text=f'Запись-{number:02}', author=author)
+        call_command('warm_caches', pages=2, threads=1, host='testserver',
+                     stdout=StringIO())
+        response = self.client.get(reverse('posts:index') + '?page=2')
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertContains(response, 'Запись-03')
+        self.assertNotContains(response, 'Запись-13')
+
+
+class WarmupHostTests(TestCase):
+    """Host запросов прогрева совпадает с Host посетителей."""
+
+    @override_settings(CACHE_WARMUP_HOST='yatube.example')
+    def test_setting(self):
+        self.assertEqual(warmup.get_host(), 'yatube.example')
+
+    @override_settings(CACHE_WARMUP_HOST=None,
+                       ALLOWED_HOSTS=['.example.com', 'www.example.com'])
+    def test_allowed_hosts(self):
+        """Шаблоны из ALLOWED_HOSTS пропускаются."""
+        self.assertEqual(warmup.get_host(), 'www.example.com')
+
+    @override_settings(CACHE_WARMUP_HOST=None, ALLOWED_HOSTS=['*'])
+    def test_no_host(self):
+        with self.assertRaises(CommandError):
+            call_command('warm_caches', stdout=StringIO())
@@ -0,0 +1,39 @@
+import tempfile
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import override_settings
+
+SHARED_CACHE_DIRS = {
+    alias: tempfile.mkdtemp() for alias in ('sessions', 'pages')
+}
+
+
+class ClearCachesMixin:
+    """Очищает все кеши из CACHES перед каждым тестом: страницы, сессии
+    и курсоры не переходят из теста в тест."""
+
+    def setUp(self):
+        super().setUp()
+        for alias in settings.CACHES:
+            caches[alias].clear()
+
+
+def shared_caches():
+    """Настройки с общими для процессов кешами sessions и pages
+    (файловыми): сессии cached_db, снимки пользователей и кеш страниц
+    работают как в бою."""
+    return override_settings(
+        CACHES={
+            **settings.CACHES,
+            **{
+                alias: {
+                    'BACKEND':
+                        'django.core.cache.backends.filebased.FileBasedCache',
+                    'LOCATION': location,
+                }
+                for alias, location in SHARED_CACHE_DIRS.items()
+            },
+        },
+        SESSION_ENGINE=settings.SESSION_ENGINES['cached_db'],
+    )
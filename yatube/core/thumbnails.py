@@ -0,0 +1,18 @@
+"""Бэкенд sorl-thumbnail, который замеряет создание миниатюр."""
+from time import perf_counter
+
+from sorl.thumbnail.base import ThumbnailBackend
+
+from .metrics import THUMBNAIL_DURATION
+
+
+class TimedThumbnailBackend(ThumbnailBackend):
+    def _create_thumbnail(self, source_image, geometry_string, options,
+                          thumbnail):
+        started = perf_counter()
+        try:
+            return super()._create_thumbnail(
+                source_image, geometry_string, options, thumbnail
+            )
+        finally:
+            THUMBNAIL_DURATION.observe(perf_counter() - started)
@@ -1,4 +1,14 @@
+import os
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.exceptions import PermissionDenied
+from django.http import FileResponse, Http404, HttpResponse
 from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.cache import never_cache
+
+from . import metrics, profiling
 
 
 def page_not_found(request, exception):
@@ -17,3 +27,41 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+@staff_member_required
+def profiles(request):
+    """Снимки профилирования и токен для новых."""
+    return render(request, 'admin/profiles.html', {
+        'title': 'Профили запросов',
+        'profiles': profiling.list_profiles(),
+        'token': profiling.make_token(request.user),
+    })
+
+
+@staff_member_required
+def profile_download(request, name):
+    if not profiling.NAME_RE.match(name):
+        raise Http404('Профиль не найден')
+    try:
+        profile = open(os.path.join(profiling.profile_root(), name), 'rb')
+    except FileNotFoundError:
+        raise Http404('Профиль не найден')
+    return FileResponse(
+        profile, as_attachment=True, filename=name,
+        content_type='application/octet-stream',
+    )
+
+
+@never_cache
+def prometheus_metrics(request):
+    """Метрики в формате Prometheus по токену METRICS_TOKEN или для
+    сотрудников."""
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    if not (token and constant_time_compare(authorization, f'Bearer {token}')
+            or request.user.is_staff):
+        raise PermissionDenied
+    return HttpResponse(
+        metrics.exposition(), content_type=metrics.CONTENT_TYPE
+    )
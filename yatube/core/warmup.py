@@ -0,0 +1,158 @@
+"""Прогрев кешей после деплоя.
+
+Страницы из CACHE_WARMUP_PATHS запрашиваются как анонимным посетителем,
+и ответы попадают в кеш страниц и кеш фрагментов так же, как при
+обычном трафике. Запросы идут пулом из нескольких потоков.
+
+Кеш locmem у каждого процесса свой (кеш страниц на нём выключен, но
+фрагменты кешируются), поэтому греть его надо в том же процессе,
+который будет отвечать, — для этого warm_on_boot запускается
+из wsgi.py (CACHE_WARMUP_ON_BOOT). Команда warm_caches греет общий кеш
+(memcached, redis) прямо из своего процесса или запущенный сервер
+по HTTP (--base-url). Ключ кеша страниц зависит от Host, поэтому
+запросы идут с Host настоящих посетителей (get_host).
+"""
+import io
+import logging
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+def get_page(application, path, host):
+    """GET-запрос к WSGI-приложению в этом процессе; возвращает код
+    ответа."""
+    path, _, query = path.partition('?')
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'HTTP_HOST': host,
+        'SERVER_NAME': host,
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': io.StringIO(),
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    statuses = []
+
+    def start_response(status, headers, exc_info=None):
+        statuses.append(status)
+
+    response = application(environ, start_response)
+    try:
+        for _ in response:
+            pass
+    finally:
+        if hasattr(response, 'close'):
+            response.close()
+    return int(statuses[0].split()[0])
+
+
+def http_fetcher(base_url, timeout=30):
+    """Запросы к запущенному серверу по HTTP."""
+    base_url = base_url.rstrip('/')
+
+    def fetch(path):
+        try:
+            with urllib.request.urlopen(base_url + path,
+                                        timeout=timeout) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as error:
+            return error.code
+    return fetch
+
+
+def local_fetcher(application=None, host=None):
+    """Запросы к приложению в этом процессе."""
+    if host is None:
+        host = get_host()
+    if application is None:
+        from django.core.handlers.wsgi import WSGIHandler
+        application = WSGIHandler()
+
+    def fetch(path):
+        try:
+            return get_page(application, path, host)
+        finally:
+            # У каждого потока пула своё соединение с базой
+            connections.close_all()
+    return fetch
+
+
+def get_host():
+    """CACHE_WARMUP_HOST или первый адрес из ALLOWED_HOSTS, не
+    являющийся шаблоном ('*', '.example.com')."""
+    host = getattr(settings, 'CACHE_WARMUP_HOST', None)
+    if host:
+        return host
+    for host in settings.ALLOWED_HOSTS:
+        if host != '*' and not host.startswith('.'):
+            return host
+    raise ImproperlyConfigured(
+        'Задайте CACHE_WARMUP_HOST: в ALLOWED_HOSTS нет конкретного адреса'
+    )
+
+
+def get_paths(**options):
+    """Адреса для прогрева из функции CACHE_WARMUP_PATHS."""
+    return list(import_string(settings.CACHE_WARMUP_PATHS)(**options))
+
+
+def warm(paths, fetch, threads=4):
+    """Запрашивает paths не более чем в threads потоков.
+
+    Возвращает список (адрес, код ответа или исключение, секунды)
+    в порядке paths.
+    """
+    def visit(path):
+        started = time.perf_counter()
+        try:
+            result = fetch(path)
+        except Exception as error:
+            result = error
+        return path, result, time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        return list(pool.map(visit, paths))
+
+
+def warm_on_boot(application):
+    """Прогревает кеши процесса в фоновом потоке, если включён
+    CACHE_WARMUP_ON_BOOT. Вызывается из wsgi.py."""
+    if not getattr(settings, 'CACHE_WARMUP_ON_BOOT', False):
+        return None
+
+    def run():
+        try:
+            results = warm(
+                get_paths(),
+                local_fetcher(application, get_host()),
+                getattr(settings, 'CACHE_WARMUP_THREADS', 4),
+            )
+        except Exception:
+            logger.exception('Прогрев кешей не удался')
+            return
+        failed = [path for path, result, _ in results if result != 200]
+        logger.info(
+            'Прогрев кешей: %s страниц, ошибок %s',
+            len(results), len(failed),
+        )
+    thread = threading.Thread(target=run, name='cache-warmup', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,51 @@
+from django.contrib import admin, messages
+from django.db import IntegrityError
+from django.utils import timezone
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'task',
+        'status',
+        'priority',
+        'attempts',
+        'progress_display',
+        'run_at',
+        'created',
+        'finished',
+    )
+    list_filter = ('status', 'task')
+    search_fields = ('task', 'dedupe_key')
+    readonly_fields = ('created', 'started', 'finished', 'locked_by',
+                       'locked_until', 'progress', 'total', 'last_error')
+    show_full_result_count = False
+    actions = ('retry_jobs',)
+
+    def progress_display(self, obj):
+        if obj.total:
+            return f'{obj.progress} из {obj.total}'
+        return obj.progress or '-'
+    progress_display.short_description = 'Прогресс'
+
+    def retry_jobs(self, request, queryset):
+        try:
+            updated = queryset.exclude(status=Job.RUNNING).update(
+                status=Job.QUEUED,
+                run_at=timezone.now(),
+                attempts=0,
+                progress=0,
+                last_error='',
+            )
+        except IntegrityError:
+            self.message_user(
+                request,
+                'Среди выбранных есть задачи, которые уже ждут в очереди',
+                messages.ERROR,
+            )
+            return
+        self.message_user(request, f'Возвращено в очередь: {updated}')
+    retry_jobs.short_description = 'Повторить выбранные задачи'
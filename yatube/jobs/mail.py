@@ -0,0 +1,17 @@
+from django.core.mail.backends.base import BaseEmailBackend
+
+from .tasks import send_email, serialize_message
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """Почтовый бэкенд, который не отправляет письма в запросе,
+    а ставит их отправку в очередь фоновых задач."""
+
+    def send_messages(self, email_messages):
+        messages = [
+            serialize_message(message) for message in email_messages
+            if message.recipients()
+        ]
+        if messages:
+            send_email.enqueue(messages=messages)
+        return len(messages)
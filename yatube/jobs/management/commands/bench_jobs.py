@@ -0,0 +1,54 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from jobs.management.commands.run_workers import run_threads
+from jobs.models import Job
+from jobs.queue import enqueue
+from jobs.tasks import bench
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет пропускную способность очереди: постановку задач '
+        'и их выполнение пулом потоков. Обработчики замера берут только '
+        'его задачи, настоящая очередь не трогается.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jobs', type=int, default=1000)
+        parser.add_argument(
+            '--threads', type=int, nargs='+', default=[1, 2, 4],
+            help='Размеры пула потоков для замера.',
+        )
+
+    def handle(self, *args, **options):
+        count = options['jobs']
+        started = timezone.now()
+        try:
+            for threads in options['threads']:
+                self.measure(count, threads)
+        finally:
+            Job.objects.filter(
+                task=bench.task_name, created__gte=started
+            ).delete()
+
+    def measure(self, count, threads):
+        start = time.perf_counter()
+        for number in range(count):
+            enqueue(bench, {'number': number})
+        enqueue_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        processed = run_threads(
+            threads, poll_interval=0, drain=True,
+            stop_event=threading.Event(), tasks=(bench.task_name,),
+        )
+        run_time = time.perf_counter() - start
+        self.stdout.write(
+            f'потоков: {threads:>2}  '
+            f'постановка: {count / enqueue_time:8.0f} задач/с  '
+            f'выполнение: {processed / run_time:8.0f} задач/с'
+        )
@@ -0,0 +1,100 @@
+import multiprocessing
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs.worker import Worker
+
+
+def run_threads(threads, poll_interval, drain, stop_event, tasks=None):
+    """Запускает пул потоков-обработчиков и ждёт их завершения.
+    tasks — как у Worker."""
+    results = []
+
+    def target(number):
+        worker = Worker(tasks=tasks)
+        try:
+            results.append(worker.run(stop_event, poll_interval, drain))
+        finally:
+            connections.close_all()
+
+    pool = [
+        threading.Thread(
+            target=target, args=(number,), name=f'worker-{number}'
+        )
+        for number in range(threads)
+    ]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return sum(results)
+
+
+def run_process(threads, poll_interval, drain):
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *args: stop_event.set())
+    signal.signal(signal.SIGINT, lambda *args: stop_event.set())
+    run_threads(threads, poll_interval, drain, stop_event)
+
+
+class Command(BaseCommand):
+    help = 'Запускает обработчики очереди фоновых задач.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads', type=int, default=2,
+            help='Потоков-обработчиков в каждом процессе.',
+        )
+        parser.add_argument(
+            '--processes', type=int, default=1,
+            help='Число процессов. Больше одного — отдельные процессы.',
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=1.0,
+            help='Пауза между опросами пустой очереди в секундах.',
+        )
+        parser.add_argument(
+            '--drain', action='store_true',
+            help='Выйти, когда очередь опустеет.',
+        )
+
+    def handle(self, *args, **options):
+        threads = options['threads']
+        processes = options['processes']
+        poll_interval = options['poll_interval']
+        drain = options['drain']
+        self.stdout.write(
+            f'Обработчики: {processes} процесс(ов) по {threads} поток(а)'
+        )
+        if processes <= 1:
+            stop_event = threading.Event()
+            signal.signal(signal.SIGTERM, lambda *args: stop_event.set())
+            try:
+                processed = run_threads(
+                    threads, poll_interval, drain, stop_event
+                )
+            except KeyboardInterrupt:
+                stop_event.set()
+                return
+            self.stdout.write(f'Выполнено задач: {processed}')
+            return
+
+        # Соединения с базой нельзя делить между процессами
+        connections.close_all()
+        pool = [
+            multiprocessing.Process(
+                target=run_process, args=(threads, poll_interval, drain)
+            )
+            for _ in range(processes)
+        ]
+        for process in pool:
+            process.start()
+        try:
+            for process in pool:
+                process.join()
+        except KeyboardInterrupt:
+            for process in pool:
+                process.terminate()
@@ -0,0 +1,83 @@
+import json
+
+from django.db import models
+from django.utils import timezone
+
+from core.models import CreatedModel
+
+
+class Job(CreatedModel):
+    """Фоновая задача в очереди, хранящейся в базе."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    task = models.CharField('Задача', max_length=200)
+    payload = models.TextField('Аргументы (JSON)', default='{}')
+    priority = models.SmallIntegerField(
+        'Приоритет',
+        default=0,
+        help_text='Задачи с большим приоритетом выполняются раньше',
+    )
+    status = models.CharField(
+        'Статус',
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=QUEUED,
+    )
+    dedupe_key = models.CharField(
+        'Ключ дедупликации',
+        max_length=200,
+        blank=True,
+        null=True,
+    )
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveSmallIntegerField(
+        'Максимум попыток',
+        default=5,
+    )
+    run_at = models.DateTimeField('Запустить не раньше', default=timezone.now)
+    locked_by = models.CharField('Обработчик', max_length=100, blank=True)
+    locked_until = models.DateTimeField(
+        'Блокировка до',
+        blank=True,
+        null=True,
+    )
+    started = models.DateTimeField('Начало', blank=True, null=True)
+    finished = models.DateTimeField('Окончание', blank=True, null=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    progress = models.PositiveIntegerField('Обработано', default=0)
+    total = models.PositiveIntegerField('Всего', blank=True, null=True)
+
+    class Meta:
+        ordering = ['-created']
+        indexes = [
+            # Выборка следующей задачи для обработчика
+            models.Index(
+                fields=['status', '-priority', 'run_at'],
+                name='job_claim_idx',
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedupe_key'],
+                condition=models.Q(status='queued'),
+                name='unique_queued_dedupe_key',
+            ),
+        ]
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+
+    def __str__(self):
+        return f'{self.task} #{self.pk}'
+
+    @property
+    def kwargs(self):
+        return json.loads(self.payload)
@@ -0,0 +1,130 @@
+"""Регистрация задач и постановка их в очередь."""
+import json
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Job
+
+_registry = {}
+_current = threading.local()
+
+
+class UnknownTask(KeyError):
+    pass
+
+
+def task(name=None, priority=0, max_attempts=5):
+    """Регистрирует функцию как фоновую задачу.
+
+    Аргументы задачи передаются именованными и должны сериализоваться
+    в JSON. Декорированная функция остаётся обычной функцией и получает
+    метод `enqueue(**kwargs)`.
+    """
+    def decorator(func):
+        func.task_name = name or f'{func.__module__}.{func.__name__}'
+        func.priority = priority
+        func.max_attempts = max_attempts
+        func.enqueue = (
+            lambda dedupe_key=None, **kwargs:
+            enqueue(func, kwargs, dedupe_key=dedupe_key)
+        )
+        _registry[func.task_name] = func
+        return func
+    return decorator
+
+
+def get_task(name):
+    try:
+        return _registry[name]
+    except KeyError:
+        raise UnknownTask(name) from None
+
+
+def enqueue(func, kwargs=None, priority=None, delay=None, dedupe_key=None,
+            max_attempts=None):
+    """Ставит задачу в очередь и возвращает Job.
+
+    Если задан dedupe_key и в очереди уже ждёт задача с таким ключом,
+    новая не создаётся — возвращается ожидающая.
+    При JOBS_EAGER задача выполняется сразу и возвращается None.
+    """
+    if isinstance(func, str):
+        func = get_task(func)
+    kwargs = kwargs or {}
+    if getattr(settings, 'JOBS_EAGER', False):
+        func(**kwargs)
+        return None
+
+    job = Job(
+        task=func.task_name,
+        payload=json.dumps(kwargs),
+        priority=func.priority if priority is None else priority,
+        max_attempts=(
+            func.max_attempts if max_attempts is None else max_attempts
+        ),
+        dedupe_key=dedupe_key,
+    )
+    if delay:
+        job.run_at = timezone.now() + timedelta(seconds=delay)
+    if dedupe_key is None:
+        job.save()
+        return job
+    try:
+        with transaction.atomic():
+            job.save()
+    except IntegrityError:
+        existing = Job.objects.filter(
+            dedupe_key=dedupe_key, status=Job.QUEUED
+        ).first()
+        if existing is None:
+            # Ожидающую задачу успели взять в работу — ставим новую
+            return enqueue(func, kwargs, priority, delay, dedupe_key,
+                           max_attempts)
+        return existing
+    return job
+
+
+def enqueue_on_commit(func, kwargs=None, **options):
+    """Ставит задачу в очередь после успешного коммита транзакции."""
+    transaction.on_commit(lambda: enqueue(func, kwargs, **options))
+
+
+@contextmanager
+def running(job, lock_timeout):
+    """Отмечает задачу как выполняемую в текущем потоке; lock_timeout —
+    на сколько секунд продлевать её блокировку."""
+    _current.job_id = job.pk
+    _current.lock_timeout = lock_timeout
+    try:
+        yield
+    finally:
+        _current.job_id = None
+
+
+def update_running(**fields):
+    """Обновляет выполняемую задачу и продлевает её блокировку.
+
+    Вне обработчика очереди (например, при JOBS_EAGER или в команде)
+    ничего не делает.
+    """
+    job_id = getattr(_current, 'job_id', None)
+    if job_id is None:
+        return
+    locked_until = timezone.now() + timedelta(seconds=_current.lock_timeout)
+    Job.objects.filter(pk=job_id, status=Job.RUNNING).update(
+        locked_until=locked_until, **fields
+    )
+
+
+def report_progress(done, total=None):
+    """Сохраняет прогресс выполняемой задачи и продлевает её
+    блокировку."""
+    fields = {'progress': done}
+    if total is not None:
+        fields['total'] = total
+    update_running(**fields)
@@ -0,0 +1,88 @@
+from base64 import b64decode, b64encode
+from email.mime.base import MIMEBase
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+
+from .queue import task
+
+
+@task('jobs.noop', max_attempts=1)
+def noop(**kwargs):
+    """Пустая задача для проверки очереди."""
+
+
+@task('jobs.bench', max_attempts=1)
+def bench(**kwargs):
+    """Пустая задача для замера пропускной способности (bench_jobs)."""
+
+
+@task('jobs.send_email', max_attempts=8)
+def send_email(messages):
+    """Отправляет письма настоящим бэкендом JOBS_EMAIL_BACKEND."""
+    connection = get_connection(settings.JOBS_EMAIL_BACKEND)
+    connection.send_messages([
+        deserialize_message(message, connection) for message in messages
+    ])
+
+
+def serialize_message(message):
+    """Письмо в виде, пригодном для JSON в аргументах задачи.
+
+    Вложения-файлы сохраняются (двоичное содержимое — в base64), а
+    готовые MIME-части (MIMEBase) сериализовать нельзя — для них
+    ValueError, чтобы письмо не ушло без вложения молча.
+    """
+    return {
+        'subject': message.subject,
+        'body': message.body,
+        'from_email': message.from_email,
+        'to': list(message.to),
+        'cc': list(message.cc),
+        'bcc': list(message.bcc),
+        'reply_to': list(message.reply_to),
+        'headers': message.extra_headers,
+        'content_subtype': message.content_subtype,
+        'alternatives': [
+            list(alternative)
+            for alternative in getattr(message, 'alternatives', [])
+        ],
+        'attachments': [
+            serialize_attachment(attachment)
+            for attachment in message.attachments
+        ],
+    }
+
+
+def serialize_attachment(attachment):
+    if isinstance(attachment, MIMEBase):
+        raise ValueError(
+            'Вложения MIMEBase нельзя отправить через очередь'
+        )
+    filename, content, mimetype = attachment
+    if isinstance(content, bytes):
+        return [filename, b64encode(content).decode(), mimetype, True]
+    return [filename, content, mimetype, False]
+
+
+def deserialize_message(data, connection=None):
+    message = EmailMultiAlternatives(
+        subject=data['subject'],
+        body=data['body'],
+        from_email=data['from_email'],
+        to=data['to'],
+        cc=data['cc'],
+        bcc=data['bcc'],
+        reply_to=data['reply_to'],
+        headers=data['headers'],
+        connection=connection,
+    )
+    # Письма, поставленные в очередь до появления этих полей
+    message.content_subtype = data.get('content_subtype', 'plain')
+    for content, mimetype in data['alternatives']:
+        message.attach_alternative(content, mimetype)
+    for filename, content, mimetype, encoded in data.get('attachments', []):
+        if encoded:
+            content = b64decode(content)
+        message.attach(filename, content, mimetype)
+    return message
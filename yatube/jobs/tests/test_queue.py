@@ -0,0 +1,201 @@
+from datetime import timedelta
+
+from django.core import mail
+from email.mime.text import MIMEText
+
+from django.core.mail import EmailMessage, get_connection, send_mail
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from jobs.models import Job
+from jobs.queue import enqueue, report_progress, task
+from jobs.tasks import serialize_message
+from jobs.worker import Worker
+
+calls = []
+
+
+@task('tests.record')
+def record(value):
+    calls.append(value)
+
+
+@task('tests.progress')
+def progress():
+    report_progress(1, 2)
+    calls.append(Job.objects.get(task='tests.progress').locked_until)
+
+
+@task('tests.explode', max_attempts=2)
+def explode():
+    raise RuntimeError('Бум')
+
+
+class QueueTests(TestCase):
+    """Постановка задач в очередь и их выполнение."""
+
+    def setUp(self):
+        calls.clear()
+        self.worker = Worker(name='test-worker')
+
+    def test_enqueue_and_run(self):
+        """Задача выполняется с переданными аргументами."""
+        job = record.enqueue(value='готово')
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertTrue(self.worker.run_once())
+        self.assertFalse(self.worker.run_once())
+        self.assertEqual(calls, ['готово'])
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.attempts, 1)
+
+    def test_dedupe_key(self):
+        """Задача с тем же ключом не дублируется, пока ждёт в очереди."""
+        first = record.enqueue(value=1, dedupe_key='same')
+        second = record.enqueue(value=2, dedupe_key='same')
+        self.assertEqual(first.pk, second.pk)
+        self.worker.run_once()
+        third = record.enqueue(value=3, dedupe_key='same')
+        self.assertNotEqual(first.pk, third.pk)
+
+    def test_priority_order(self):
+        """Задачи с большим приоритетом выполняются первыми."""
+        enqueue(record, {'value': 'low'}, priority=-5)
+        enqueue(record, {'value': 'normal'})
+        enqueue(record, {'value': 'high'}, priority=5)
+        while self.worker.run_once():
+            pass
+        self.assertEqual(calls, ['high', 'normal', 'low'])
+
+    def test_delayed_job_waits(self):
+        """Отложенная задача не берётся раньше времени."""
+        enqueue(record, {'value': 'later'}, delay=60)
+        self.assertFalse(self.worker.run_once())
+
+    def test_retry_with_backoff_then_fail(self):
+        """Упавшая задача повторяется с задержкой, затем помечается
+        ошибкой."""
+        job = explode.enqueue()
+        with self.assertLogs('jobs.worker', 'WARNING'):
+            self.worker.run_once()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('Бум', job.last_error)
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.assertLogs('jobs.worker', 'WARNING'):
+            self.worker.run_once()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_stale_job_requeued(self):
+        """Задача умершего обработчика возвращается в очередь."""
+        job = record.enqueue(value='stale')
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.RUNNING,
+            locked_until=timezone.now() - timedelta(seconds=1),
+        )
+        self.assertEqual(self.worker.requeue_stale(), 1)
+        self.worker.run_once()
+        self.assertEqual(calls, ['stale'])
+
+    def test_stale_job_out_of_attempts_failed(self):
+        """Зависшая задача без оставшихся попыток не повторяется."""
+        job = explode.enqueue()
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.RUNNING,
+            attempts=2,
+            locked_until=timezone.now() - timedelta(seconds=1),
+        )
+        self.assertEqual(self.worker.requeue_stale(), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+
+    def test_stale_duplicates_not_requeued(self):
+        """Из зависших задач с одним dedupe_key в очередь возвращается
+        одна, остальные и дубликаты ожидающей помечаются упавшими."""
+        expired = timezone.now() - timedelta(seconds=1)
+        for key in ('pair', 'pair', 'queued'):
+            job = record.enqueue(value=key, dedupe_key=key)
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.RUNNING, locked_until=expired
+            )
+        record.enqueue(value='queued', dedupe_key='queued')
+        self.assertEqual(self.worker.requeue_stale(), 1)
+        self.assertEqual(self.worker.requeue_stale(), 0)
+        self.assertFalse(Job.objects.filter(status=Job.RUNNING).exists())
+        self.assertEqual(
+            Job.objects.filter(status=Job.QUEUED).count(), 2
+        )
+        self.assertEqual(
+            Job.objects.filter(status=Job.FAILED).count(), 2
+        )
+
+    def test_progress_extends_lock(self):
+        """report_progress продлевает блокировку задачи."""
+        job = progress.enqueue()
+        self.worker.lock_timeout = 3600
+        claimed = self.worker.claim()
+        now = timezone.now()
+        Job.objects.filter(pk=job.pk).update(locked_until=now)
+        self.worker.run_job(claimed)
+        self.assertGreater(calls[0], now + timedelta(minutes=30))
+        job.refresh_from_db()
+        self.assertEqual((job.progress, job.total), (1, 2))
+
+    def test_worker_takes_own_tasks(self):
+        """Обработчик с tasks не трогает остальные задачи."""
+        other = record.enqueue(value='чужая')
+        worker = Worker(name='bench-worker', tasks=('tests.progress',))
+        self.assertFalse(worker.run_once())
+        other.refresh_from_db()
+        self.assertEqual(other.status, Job.QUEUED)
+
+    @override_settings(JOBS_EAGER=True)
+    def test_eager_mode(self):
+        """В режиме JOBS_EAGER задача выполняется сразу."""
+        self.assertIsNone(record.enqueue(value='сразу'))
+        self.assertEqual(calls, ['сразу'])
+        self.assertFalse(Job.objects.exists())
+
+    @override_settings(
+        JOBS_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'
+    )
+    def test_email_sent_by_worker(self):
+        """Письмо уходит не в запросе, а из обработчика очереди."""
+        send_mail(
+            'Тема', 'Текст', 'from@yatube.ru', ['to@yatube.ru'],
+            connection=get_connection('jobs.mail.QueuedEmailBackend'),
+        )
+        self.assertEqual(len(mail.outbox), 0)
+        self.worker.run_once()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, 'Тема')
+        self.assertEqual(mail.outbox[0].to, ['to@yatube.ru'])
+
+    @override_settings(
+        JOBS_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'
+    )
+    def test_email_attachments_queued(self):
+        """Вложения и альтернативы доходят до настоящего бэкенда."""
+        message = EmailMessage(
+            'Тема', 'Текст', 'from@yatube.ru', ['to@yatube.ru'],
+            connection=get_connection('jobs.mail.QueuedEmailBackend'),
+        )
+        message.attach('data.bin', b'\x00\xff', 'application/octet-stream')
+        message.attach('note.txt', 'Заметка', 'text/plain')
+        message.send()
+        self.worker.run_once()
+        self.assertEqual(mail.outbox[0].attachments, [
+            ('data.bin', b'\x00\xff', 'application/octet-stream'),
+            ('note.txt', 'Заметка', 'text/plain'),
+        ])
+
+    def test_mime_attachment_rejected(self):
+        """Готовую MIME-часть в очередь не поставить."""
+        message = EmailMessage('Тема', 'Текст', to=['to@yatube.ru'])
+        message.attach(MIMEText('Заметка'))
+        with self.assertRaises(ValueError):
+            serialize_message(message)
@@ -0,0 +1,209 @@
+"""Обработчик очереди: берёт задачи из базы и выполняет их."""
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import (
+    DatabaseError, IntegrityError, close_old_connections, transaction,
+)
+from django.db.models import F
+from django.utils import timezone
+
+from core import metrics
+from .models import Job
+from .queue import UnknownTask, get_task, running
+
+logger = logging.getLogger(__name__)
+
+# Задержка перед повтором: 10 с, 20 с, 40 с... но не больше часа
+BACKOFF_BASE = 10
+BACKOFF_MAX = 60 * 60
+
+
+def backoff(attempts):
+    """Экспоненциальная задержка с небольшим случайным разбросом,
+    чтобы повторы упавших вместе задач не шли одной волной."""
+    delay = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+    return delay * random.uniform(0.8, 1.2)
+
+
+class Worker:
+    """Выбирает задачи по приоритету и времени запуска.
+
+    Захват задачи — атомарный UPDATE по статусу, поэтому несколько
+    обработчиков в разных потоках и процессах не возьмут одну задачу
+    дважды. Задачи, чей обработчик умер, возвращаются в очередь после
+    окончания блокировки; report_progress продлевает блокировку, так что
+    долгая задача, сообщающая о ходе работы, зависшей не считается.
+
+    tasks — имена задач, которые берёт обработчик; по умолчанию любые.
+    """
+
+    def __init__(self, name=None, batch_size=10, tasks=None):
+        self.name = name or (
+            f'{socket.gethostname()}:{os.getpid()}:'
+            f'{threading.current_thread().name}'
+        )
+        self.batch_size = batch_size
+        self.tasks = tasks
+        self.lock_timeout = getattr(settings, 'JOBS_LOCK_TIMEOUT', 300)
+
+    def jobs(self):
+        """Задачи, которые видит этот обработчик."""
+        if self.tasks is None:
+            return Job.objects.all()
+        return Job.objects.filter(task__in=self.tasks)
+
+    def claim(self):
+        """Берёт в работу следующую задачу или возвращает None."""
+        now = timezone.now()
+        candidates = self.jobs().filter(
+            status=Job.QUEUED, run_at__lte=now,
+        ).order_by('-priority', 'run_at', 'pk').values_list(
+            'pk', flat=True
+        )[:self.batch_size]
+        for pk in candidates:
+            claimed = Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+                status=Job.RUNNING,
+                locked_by=self.name,
+                locked_until=now + timedelta(seconds=self.lock_timeout),
+                started=now,
+                attempts=F('attempts') + 1,
+            )
+            if claimed:
+                return Job.objects.get(pk=pk)
+        return None
+
+    def run_job(self, job):
+        try:
+            with running(job, self.lock_timeout):
+                get_task(job.task)(**job.kwargs)
+        except Exception as error:
+            self.fail(job, error)
+        else:
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.DONE,
+                finished=timezone.now(),
+                locked_until=None,
+                last_error='',
+            )
+
+    def fail(self, job, error):
+        message = ''.join(traceback.format_exception(
+            type(error), error, error.__traceback__
+        ))
+        retry = (
+            job.attempts < job.max_attempts
+            and not isinstance(error, UnknownTask)
+        )
+        logger.warning(
+            'Задача %s упала (попытка %s из %s)',
+            job, job.attempts, job.max_attempts, exc_info=error,
+        )
+        now = timezone.now()
+        if retry:
+            try:
+                with transaction.atomic():
+                    Job.objects.filter(pk=job.pk).update(
+                        status=Job.QUEUED,
+                        run_at=now + timedelta(seconds=backoff(job.attempts)),
+                        locked_until=None,
+                        last_error=message,
+                    )
+                return
+            except IntegrityError:
+                # В очереди уже ждёт такая же задача — повтор не нужен
+                pass
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.FAILED,
+            finished=now,
+            locked_until=None,
+            last_error=message,
+        )
+
+    def requeue_stale(self):
+        """Возвращает в очередь задачи с истёкшей блокировкой.
+
+        Задачи, исчерпавшие попытки, не повторяются, а помечаются
+        упавшими: иначе задача, которая роняет обработчик, крутилась бы
+        в очереди бесконечно. Задачи возвращаются по одной: если такая
+        же задача (dedupe_key) уже ждёт в очереди или только что
+        вернулась в неё, зависшая тоже помечается упавшей.
+        Возвращает число задач, вернувшихся в очередь.
+        """
+        now = timezone.now()
+        stale = self.jobs().filter(
+            status=Job.RUNNING, locked_until__lt=now
+        )
+        stale.filter(attempts__gte=F('max_attempts')).update(
+            status=Job.FAILED,
+            finished=now,
+            locked_until=None,
+            last_error='Обработчик не ответил, попытки исчерпаны',
+        )
+        requeued = 0
+        for pk in stale.values_list('pk', flat=True):
+            job = stale.filter(pk=pk)
+            try:
+                with transaction.atomic():
+                    requeued += job.update(
+                        status=Job.QUEUED, locked_until=None
+                    )
+            except IntegrityError:
+                job.update(
+                    status=Job.FAILED,
+                    finished=now,
+                    locked_until=None,
+                    last_error='Обработчик не ответил, в очереди есть '
+                               'дубликат',
+                )
+        return requeued
+
+    def run_once(self):
+        """Выполняет одну задачу. Возвращает False, если очередь пуста."""
+        job = self.claim()
+        if job is None:
+            return False
+        self.run_job(job)
+        return True
+
+    def run(self, stop_event=None, poll_interval=1.0, drain=False):
+        """Основной цикл обработчика.
+
+        drain=True — выйти, как только очередь опустеет.
+        """
+        stop_event = stop_event or threading.Event()
+        next_requeue = 0
+        processed = 0
+        try:
+            while not stop_event.is_set():
+                close_old_connections()
+                # Метрики задач (например, миниатюр) попадают в /metrics
+                # только через METRICS_DIR
+                metrics.registry.flush()
+                try:
+                    if time.monotonic() >= next_requeue:
+                        self.requeue_stale()
+                        next_requeue = (
+                            time.monotonic() + self.lock_timeout / 2
+                        )
+                    if self.run_once():
+                        processed += 1
+                        continue
+                except DatabaseError:
+                    # Например, SQLite занят другим писателем — подождём
+                    logger.exception(
+                        'Ошибка базы в обработчике %s', self.name
+                    )
+                if drain:
+                    break
+                stop_event.wait(poll_interval)
+        finally:
+            metrics.registry.flush(force=True)
+        return processed
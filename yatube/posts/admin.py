@@ -1,16 +1,48 @@
+from django import forms
 from django.contrib import admin
 
-from .models import Post, Group
+from core.admin import (
+    BackgroundActionsMixin, BoundedCountPaginator, LargeTableAdmin,
+    SoftDeleteAdminMixin,
+)
 
+from . import tasks
+from .bulk import enqueue_chunks
+from .deletion import soft_delete_group
+from .models import Comment, Follow, Group, Post
 
-class GroupAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'description', 'title', 'slug')
+
+class MoveToGroupForm(forms.Form):
+    group = forms.ModelChoiceField(
+        Group.objects.filter(deleted__isnull=True),
+        required=False,
+        empty_label='Без группы',
+        label='Группа',
+    )
+
+
+class GroupAdmin(SoftDeleteAdminMixin, admin.ModelAdmin):
+    list_display = ('pk', 'description', 'title', 'slug', 'deleted')
     search_fields = ('description', 'title')
     list_filter = ('slug',)
     empty_value_display = "-пусто-"
+    # Автодополнение листает группы по страницам
+    ordering = ('title',)
+    actions = ('delete_in_background',)
+    soft_delete_function = soft_delete_group
+
+    def get_search_results(self, request, queryset, search_term):
+        queryset, use_distinct = super().get_search_results(
+            request, queryset, search_term
+        )
+        # Автодополнение группы поста: в удалённую группу не переносят
+        match = request.resolver_match
+        if match and match.url_name.endswith('_autocomplete'):
+            queryset = queryset.filter(deleted__isnull=True)
+        return queryset, use_distinct
 
 
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(BackgroundActionsMixin, LargeTableAdmin):
     list_display = (
         'pk',
         'text',
@@ -18,9 +50,89 @@ class PostAdmin(admin.ModelAdmin):
         'author',
         'group',
     )
-    list_editable = ('group',)
-    search_fields = ('text',)
+    # Выпадающий список всех групп в каждой строке не нужен: группу
+    # меняют в форме поста, там её ищут через автодополнение
+    list_select_related = ('author', 'group')
+    raw_id_fields = ('author',)
+    autocomplete_fields = ('group',)
+    # Текст ищется только за последние дни (LargeTableAdmin), автор —
+    # по началу имени, по индексу уникальности
+    search_fields = ('text', '^author__username')
+    # Периоды фильтра и date_hierarchy — диапазоны по post_pub_date_idx
     list_filter = ('pub_date',)
+    date_hierarchy = 'pub_date'
+    empty_value_display = '-пусто-'
+    actions = ('move_to_group', 'delete_in_background')
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'group':
+            kwargs['queryset'] = Group.objects.filter(deleted__isnull=True)
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def move_to_group(self, request, queryset):
+        data = request.POST if 'apply' in request.POST else None
+        form = MoveToGroupForm(data)
+        if not form.is_valid():
+            return self.confirm_action(
+                request, queryset, 'Перенос постов в группу', form
+            )
+        group = form.cleaned_data['group']
+        jobs = enqueue_chunks(
+            tasks.move_posts, queryset, 'post_ids',
+            group_id=group.pk if group else None,
+        )
+        self.report_jobs(request, jobs)
+    move_to_group.short_description = 'Перенести в группу'
+    move_to_group.allowed_permissions = ('change',)
+
+    def delete_in_background(self, request, queryset):
+        if 'apply' not in request.POST:
+            return self.confirm_action(request, queryset, 'Удаление постов')
+        jobs = enqueue_chunks(tasks.delete_posts, queryset, 'post_ids')
+        self.report_jobs(request, jobs)
+    delete_in_background.short_description = 'Удалить выбранные посты'
+    delete_in_background.allowed_permissions = ('delete',)
+
+
+class CommentAdmin(BackgroundActionsMixin, LargeTableAdmin):
+    list_display = (
+        'pk',
+        'text',
+        'created',
+        'author',
+        'post_link',
+    )
+    list_select_related = ('author',)
+    raw_id_fields = ('post', 'author')
+    search_fields = ('text', '^author__username')
+    date_hierarchy = 'created'
+    empty_value_display = '-пусто-'
+    actions = ('delete_in_background',)
+
+    def post_link(self, obj):
+        # Номер поста, чтобы не загружать сами посты ради их текста
+        return obj.post_id
+    post_link.short_description = 'Пост'
+    post_link.admin_order_field = 'post'
+
+    def delete_in_background(self, request, queryset):
+        if 'apply' not in request.POST:
+            return self.confirm_action(
+                request, queryset, 'Удаление комментариев'
+            )
+        jobs = enqueue_chunks(tasks.delete_comments, queryset, 'comment_ids')
+        self.report_jobs(request, jobs)
+    delete_in_background.short_description = 'Удалить выбранные комментарии'
+    delete_in_background.allowed_permissions = ('delete',)
+
+
+class FollowAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'user', 'author')
+    list_select_related = ('user', 'author')
+    raw_id_fields = ('user', 'author')
+    search_fields = ('=user__username', '=author__username')
+    paginator = BoundedCountPaginator
+    show_full_result_count = False
     empty_value_display = '-пусто-'
 
 
@@ -28,3 +140,5 @@ class PostAdmin(admin.ModelAdmin):
 # класс PostAdmin
 admin.site.register(Group, GroupAdmin)
 admin.site.register(Post, PostAdmin)
+admin.site.register(Comment, CommentAdmin)
+admin.site.register(Follow, FollowAdmin)
@@ -0,0 +1,160 @@
+"""Массовые операции над постами, комментариями и подписками.
+
+Строки обрабатываются порциями по первичному ключу, каждая порция —
+в своей короткой транзакции. Объекты в память не загружаются и сигналы
+по каждому объекту не отправляются, поэтому всё, что делают сигналы
+(сброс кеша страниц, счётчики ссылок на картинки, пометки карты сайта),
+делается здесь сразу для всей порции.
+
+Обычный QuerySet.delete() у моделей с обработчиками post_delete
+загружает каждый объект, поэтому строки удаляются _raw_delete. Это
+договорённость с posts.signals: обработчики там описаны вместе с ней,
+а test_bulk.test_delete_handlers_known сверяет их список.
+"""
+from collections import Counter
+
+from django.db import transaction
+
+from core import blobs
+from core.cache import invalidate_tags
+from jobs.queue import enqueue
+from . import follows
+from .models import Comment, Follow, Post, SitemapShard
+from .sitemaps import mark_dirty, mark_posts_dirty
+
+CHUNK_SIZE = 500
+# Сколько первичных ключей передавать в одну фоновую задачу
+JOB_CHUNK_SIZE = 5000
+
+
+def pk_chunks(queryset, chunk_size=CHUNK_SIZE):
+    """Первичные ключи queryset порциями по возрастанию.
+
+    Следующая порция выбирается по pk > последнего, а не через OFFSET,
+    так что удалённые и изменённые строки не сбивают обход.
+    """
+    queryset = queryset.order_by('pk')
+    last_pk = None
+    while True:
+        chunk = queryset if last_pk is None else queryset.filter(
+            pk__gt=last_pk
+        )
+        pks = list(chunk.values_list('pk', flat=True)[:chunk_size])
+        if not pks:
+            return
+        yield pks
+        last_pk = pks[-1]
+
+
+def process_in_chunks(queryset, handle, chunk_size=CHUNK_SIZE,
+                      progress=None):
+    """Вызывает handle(pks) для каждой порции в отдельной транзакции.
+
+    handle возвращает число обработанных строк и теги страниц, которые
+    надо сбросить после коммита. progress(done, total) сообщает,
+    сколько уже сделано. Возвращает число обработанных строк.
+    """
+    total = queryset.count() if progress else None
+    done = 0
+    for pks in pk_chunks(queryset, chunk_size):
+        with transaction.atomic():
+            count, tags = handle(pks)
+        invalidate_tags(*tags)
+        done += count
+        if progress:
+            progress(done, total)
+    return done
+
+
+# Поля постов, которые нужны для сброса кеша и карты сайта
+POST_FIELDS = ('pk', 'author__username', 'group__slug', 'author_id',
+               'group_id')
+
+
+def forget_posts(rows):
+    """Помечает файлы карты сайта с постами rows (см. POST_FIELDS)
+    и возвращает теги страниц, на которых они видны."""
+    mark_posts_dirty(
+        (pk, author_id, group_id) for pk, _, _, author_id, group_id in rows
+    )
+    tags = {'feed'}
+    for pk, username, slug, _, _ in rows:
+        tags.add(f'post:{pk}')
+        tags.add(f'author:{username}')
+        if slug:
+            tags.add(f'group:{slug}')
+    return tags
+
+
+def move_posts(queryset, group, **options):
+    """Переносит посты в группу group (None — убрать из группы)."""
+    def handle(pks):
+        posts = Post.objects.filter(pk__in=pks)
+        rows = list(posts.values_list(*POST_FIELDS))
+        tags = forget_posts(rows)
+        if group is not None:
+            tags.add(f'group:{group.slug}')
+            mark_dirty({SitemapShard.GROUPS: [group.pk]})
+        return posts.update(group=group), tags
+    return process_in_chunks(queryset, handle, **options)
+
+
+def delete_posts(queryset, **options):
+    """Удаляет посты без загрузки объектов."""
+    def handle(pks):
+        posts = Post.objects.filter(pk__in=pks)
+        rows = list(posts.values_list(*POST_FIELDS, 'image'))
+        # То же, что сделал бы on_delete=SET_NULL у Comment.post
+        Comment.objects.filter(post__in=pks).update(post=None)
+        # У Post есть обработчики post_delete, поэтому обычный delete()
+        # загрузил бы каждый объект; их работу делаем ниже сами
+        deleted = posts._raw_delete(posts.db)
+        images = Counter(image for *_, image in rows if image)
+        for name, count in images.items():
+            blobs.release(name, count)
+        return deleted, forget_posts([row[:-1] for row in rows])
+    return process_in_chunks(queryset, handle, **options)
+
+
+def delete_comments(queryset, **options):
+    """Удаляет комментарии без загрузки объектов."""
+    def handle(pks):
+        comments = Comment.objects.filter(pk__in=pks)
+        post_ids = set(
+            comments.exclude(post=None).values_list('post_id', flat=True)
+        )
+        deleted = comments._raw_delete(comments.db)
+        return deleted, {f'post:{post_id}' for post_id in post_ids}
+    return process_in_chunks(queryset, handle, **options)
+
+
+def delete_follows(queryset, **options):
+    """Удаляет подписки без загрузки объектов; счётчики затронутых
+    пользователей пересчитываются один раз на порцию."""
+    def handle(pks):
+        subscriptions = Follow.objects.filter(pk__in=pks)
+        rows = list(subscriptions.values_list(
+            'user_id', 'user__username', 'author_id', 'author__username'
+        ))
+        deleted = subscriptions._raw_delete(subscriptions.db)
+        user_ids = set()
+        tags = set()
+        for user_id, username, author_id, author_name in rows:
+            user_ids.update((user_id, author_id))
+            tags.update((f'author:{username}', f'author:{author_name}'))
+        follows.recount(user_ids)
+        return deleted, tags
+    return process_in_chunks(queryset, handle, **options)
+
+
+def enqueue_chunks(task, queryset, key, chunk_size=JOB_CHUNK_SIZE,
+                   **kwargs):
+    """Ставит task в очередь для каждой порции первичных ключей.
+
+    Ключи передаются в аргументе key. Возвращает число задач.
+    """
+    jobs = 0
+    for pks in pk_chunks(queryset, chunk_size):
+        enqueue(task, {key: pks, **kwargs})
+        jobs += 1
+    return jobs
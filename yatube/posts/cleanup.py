@@ -0,0 +1,176 @@
+"""Поиск и удаление данных, на которые ничего не ссылается.
+
+- комментарии, чей пост удалён (Comment.post обнуляется при удалении);
+- файлы картинок, которых нет ни в постах, ни в учёте ссылок
+  (core.blobs) — например, оставшиеся от замены картинки до появления
+  хранилища по хешу;
+- записи хранилища ключей sorl, чьих файлов уже нет;
+- файлы миниатюр, о которых sorl ничего не знает.
+
+Всё обходится порциями; каждая функция возвращает Counter с числом
+найденных строк и файлов и их размером в байтах. При dry_run=True
+ничего не удаляется.
+"""
+import os
+import time
+from collections import Counter
+from itertools import islice
+
+from sorl.thumbnail import default, delete as delete_with_thumbnails
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix, del_prefix
+from sorl.thumbnail.models import KVStore
+
+from core.models import MediaBlob
+from . import bulk
+from .models import Comment, Post
+
+IMAGES_DIR = Post._meta.get_field('image').upload_to.rstrip('/')
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def iter_files(storage, directory, min_age):
+    """Файлы каталога хранилища старше min_age секунд: (имя, размер)."""
+    root = storage.path(directory)
+    deadline = time.time() - min_age
+    for path, _, files in os.walk(root):
+        for filename in sorted(files):
+            full_path = os.path.join(path, filename)
+            stat = os.stat(full_path)
+            if stat.st_mtime > deadline:
+                # Файл могли только что загрузить, а ссылку ещё не записать
+                continue
+            name = os.path.relpath(full_path, storage.location)
+            yield name.replace(os.sep, '/'), stat.st_size
+
+
+def thumbnails_of(image_file):
+    """Миниатюры картинки, известные sorl."""
+    kvstore = default.kvstore
+    keys = kvstore._get(image_file.key, identity='thumbnails') or []
+    return [
+        thumbnail for thumbnail in map(kvstore._get, keys)
+        if thumbnail is not None
+    ]
+
+
+def file_size(image_file):
+    try:
+        return image_file.storage.size(image_file.name)
+    except OSError:
+        return 0
+
+
+def orphan_comments(batch_size, dry_run=False):
+    comments = Comment.objects.filter(post__isnull=True)
+    if dry_run:
+        return Counter(comments=comments.count())
+    return Counter(
+        comments=bulk.delete_comments(comments, chunk_size=batch_size)
+    )
+
+
+def unreferenced_images(storage, batch_size, min_age, dry_run=False):
+    """Файлы картинок постов без ссылок из постов и без учёта ссылок.
+
+    Файлы из MediaBlob не трогаем: их удалит core.collect_blobs после
+    срока ожидания.
+    """
+    report = Counter()
+    files = iter_files(storage, IMAGES_DIR, min_age)
+    for batch in batched(files, batch_size):
+        names = [name for name, _ in batch]
+        referenced = set(Post.objects.filter(image__in=names).values_list(
+            'image', flat=True
+        ))
+        referenced.update(MediaBlob.objects.filter(
+            name__in=names
+        ).values_list('name', flat=True))
+        for name, size in batch:
+            if name in referenced:
+                continue
+            image_file = ImageFile(name, storage)
+            thumbnails = thumbnails_of(image_file)
+            report['files'] += 1 + len(thumbnails)
+            report['bytes'] += size + sum(map(file_size, thumbnails))
+            if not dry_run:
+                # Удаляет и файл, и миниатюры, и их записи в sorl
+                delete_with_thumbnails(image_file)
+    return report
+
+
+def iter_kvstore_keys(identity, batch_size):
+    """Ключи хранилища sorl без префиксов, порциями."""
+    prefix = add_prefix('', identity)
+    rows = KVStore.objects.filter(key__startswith=prefix).order_by('key')
+    last_key = None
+    while True:
+        batch = rows if last_key is None else rows.filter(key__gt=last_key)
+        keys = list(batch.values_list('key', flat=True)[:batch_size])
+        if not keys:
+            return
+        yield [del_prefix(key) for key in keys]
+        last_key = keys[-1]
+
+
+def stale_kvstore(batch_size, dry_run=False):
+    """Записи sorl о файлах, которых нет, и списки миниатюр без
+    исходной картинки."""
+    kvstore = default.kvstore
+    report = Counter()
+    for keys in iter_kvstore_keys('image', batch_size):
+        values = KVStore.objects.filter(
+            key__in=[add_prefix(key) for key in keys]
+        ).values_list('value', flat=True)
+        for value in values:
+            image_file = deserialize_image_file(value)
+            if image_file.exists():
+                continue
+            report['kvstore'] += 1
+            if not dry_run:
+                kvstore.delete(image_file)
+    for keys in iter_kvstore_keys('thumbnails', batch_size):
+        sources = set(map(del_prefix, KVStore.objects.filter(
+            key__in=[add_prefix(key) for key in keys]
+        ).values_list('key', flat=True)))
+        for key in keys:
+            if key in sources:
+                continue
+            report['kvstore'] += 1
+            if not dry_run:
+                kvstore._delete(key, identity='thumbnails')
+    return report
+
+
+def orphan_thumbnails(batch_size, min_age, dry_run=False):
+    """Файлы миниатюр, которых нет в хранилище ключей sorl."""
+    storage = default.storage
+    report = Counter()
+    prefix = thumbnail_settings.THUMBNAIL_PREFIX.rstrip('/')
+    if not storage.exists(prefix):
+        return report
+    for batch in batched(iter_files(storage, prefix, min_age), batch_size):
+        keys = {
+            add_prefix(ImageFile(name, storage).key): (name, size)
+            for name, size in batch
+        }
+        known = set(KVStore.objects.filter(
+            key__in=list(keys)
+        ).values_list('key', flat=True))
+        for key, (name, size) in keys.items():
+            if key in known:
+                continue
+            report['files'] += 1
+            report['bytes'] += size
+            if not dry_run:
+                storage.delete(name)
+    return report
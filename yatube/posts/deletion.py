@@ -0,0 +1,123 @@
+"""Удаление пользователей и групп в два шага.
+
+Сначала объект помечается удалённым: пользователь деактивируется,
+а его имя и адрес группы заменяются на deleted:<id>, так что страницы
+пропадают сразу и имя можно занять заново. Двоеточие не пропускают
+ни валидатор имён пользователей, ни SlugField, поэтому надгробие не
+совпадёт с настоящим именем или адресом.
+
+До очистки посты удалённого автора скрыты везде, где показываются
+посты (posts.queries.visible): главная, группы, страница поста, ленты
+RSS и подписок. Так же скрыты его комментарии и строки в списках
+подписчиков и подписок. Это правило для всех неактивных пользователей, а не
+только удалённых: заблокированный в админке автор пропадает так же,
+вместе с профилем. Посты удалённой группы остаются на месте, у них
+только не выводится ссылка на группу. Затем фоновая задача удаляет
+зависимые строки порциями (см. posts.bulk) и только в конце саму строку.
+Так удаление не держит одну длинную транзакцию на запись.
+"""
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.cache import invalidate_tags
+from jobs.queue import enqueue
+from . import bulk
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+TOMBSTONE = 'deleted:{}'
+
+
+def soft_delete_user(user):
+    username = user.username
+    # Посты автора пропадают и со страниц групп
+    slugs = Group.objects.filter(
+        posts__author=user, deleted__isnull=True
+    ).values_list('slug', flat=True).distinct()
+    group_tags = [f'group:{slug}' for slug in slugs]
+    # Его комментарии и строки в списках подписок других пользователей
+    comment_tags = [
+        f'post:{pk}' for pk in Comment.objects.filter(
+            author=user
+        ).values_list('post_id', flat=True).distinct()
+    ]
+    follow_tags = [
+        f'author:{name}' for name in User.objects.filter(
+            Q(following__user=user) | Q(follower__author=user)
+        ).values_list('username', flat=True).distinct()
+    ]
+    with transaction.atomic():
+        user.username = TOMBSTONE.format(user.pk)
+        user.is_active = False
+        user.set_unusable_password()
+        user.save()
+        # Задача пишется в той же транзакции, что и пометка
+        enqueue(
+            'posts.purge_user', {'user_id': user.pk},
+            dedupe_key=f'purge_user:{user.pk}',
+        )
+    invalidate_tags(
+        'feed', f'author:{username}', *group_tags, *comment_tags,
+        *follow_tags,
+    )
+
+
+def soft_delete_group(group):
+    slug = group.slug
+    with transaction.atomic():
+        group.slug = TOMBSTONE.format(group.pk)
+        group.deleted = timezone.now()
+        group.save()
+        enqueue(
+            'posts.purge_group', {'group_id': group.pk},
+            dedupe_key=f'purge_group:{group.pk}',
+        )
+    invalidate_tags(f'group:{slug}')
+
+
+def run_steps(steps, progress=None):
+    """Выполняет шаги (функция, queryset) с общим прогрессом."""
+    total = sum(queryset.count() for _, queryset in steps)
+    done = 0
+    for step, queryset in steps:
+        def step_progress(count, step_total, offset=done):
+            progress(offset + count, total)
+        done += step(queryset, progress=step_progress if progress else None)
+    return done
+
+
+def purge_user(user_id, progress=None):
+    """Удаляет комментарии, посты и подписки пользователя, затем его
+    самого. Если пользователя успели восстановить, ничего не делает."""
+    tombstone = User.objects.filter(
+        pk=user_id, username=TOMBSTONE.format(user_id), is_active=False
+    )
+    if not tombstone.exists():
+        return 0
+    done = run_steps([
+        (bulk.delete_comments, Comment.objects.filter(author_id=user_id)),
+        (bulk.delete_posts, Post.objects.filter(author_id=user_id)),
+        (bulk.delete_follows, Follow.objects.filter(
+            Q(user_id=user_id) | Q(author_id=user_id)
+        )),
+    ], progress)
+    User.objects.filter(pk=user_id).delete()
+    return done
+
+
+def purge_group(group_id, progress=None):
+    """Убирает посты из группы, затем удаляет её саму."""
+    group = Group.objects.filter(pk=group_id, deleted__isnull=False).first()
+    if group is None:
+        return 0
+    done = run_steps([
+        (partial(bulk.move_posts, group=None),
+         Post.objects.filter(group_id=group_id)),
+    ], progress)
+    group.delete()
+    return done
@@ -0,0 +1,147 @@
+"""Потоковая выгрузка данных пользователя.
+
+Посты, комментарии и подписки читаются из базы порциями через
+.iterator(), а ответ отдаётся по мере чтения, поэтому память не растёт
+с размером аккаунта. В zip-архив картинки копируются кусками, а сам
+архив пишется в объект без перемотки и отдаётся по частям.
+"""
+import csv
+import json
+import os
+import time
+import zipfile
+
+from .models import Comment, Follow, Post
+
+CHUNK_SIZE = 2000
+FILE_CHUNK_SIZE = 64 * 1024
+
+# Формат: (тип содержимого, расширение файла)
+EXPORT_FORMATS = {
+    'jsonl': ('application/x-ndjson; charset=utf-8', 'jsonl'),
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'zip': ('application/zip', 'zip'),
+}
+CSV_FIELDS = ('type', 'id', 'created', 'post', 'group', 'username',
+              'image', 'text')
+
+
+def iter_records(user):
+    """Записи пользователя: посты, комментарии, подписки и подписчики."""
+    posts = Post.objects.filter(author=user).order_by('pk').values_list(
+        'pk', 'pub_date', 'group__slug', 'image', 'text'
+    )
+    for pk, created, slug, image, text in posts.iterator(
+            chunk_size=CHUNK_SIZE):
+        yield {
+            'type': 'post',
+            'id': pk,
+            'created': created.isoformat(),
+            'group': slug,
+            'image': image or None,
+            'text': text,
+        }
+    comments = Comment.objects.filter(author=user).order_by('pk').values_list(
+        'pk', 'created', 'post_id', 'text'
+    )
+    for pk, created, post_id, text in comments.iterator(chunk_size=CHUNK_SIZE):
+        yield {
+            'type': 'comment',
+            'id': pk,
+            'created': created.isoformat(),
+            'post': post_id,
+            'text': text,
+        }
+    edges = (
+        ('following', Follow.objects.filter(user=user), 'author__username'),
+        ('follower', Follow.objects.filter(author=user), 'user__username'),
+    )
+    for kind, follows, username_field in edges:
+        rows = follows.order_by('pk').values_list('pk', username_field)
+        for pk, username in rows.iterator(chunk_size=CHUNK_SIZE):
+            yield {'type': kind, 'id': pk, 'username': username}
+
+
+def jsonl_lines(records):
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False) + '\n'
+
+
+class Echo:
+    """Файлоподобный объект, который возвращает записанное."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(records):
+    writer = csv.DictWriter(Echo(), CSV_FIELDS)
+    yield writer.writerow(dict(zip(CSV_FIELDS, CSV_FIELDS)))
+    for record in records:
+        yield writer.writerow(record)
+
+
+class StreamBuffer:
+    """Накапливает записанное до следующей выдачи.
+
+    У объекта нет seek() и tell(), поэтому zipfile пишет архив
+    последовательно, с размерами файлов после их содержимого.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        self.size = 0
+        return data
+
+
+def zip_stream(user):
+    """Архив с data.jsonl и картинками постов пользователя."""
+    storage = Post._meta.get_field('image').storage
+    buffer = StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        with archive.open('data.jsonl', 'w', force_zip64=True) as entry:
+            for line in jsonl_lines(iter_records(user)):
+                entry.write(line.encode())
+                if buffer.size >= FILE_CHUNK_SIZE:
+                    yield buffer.pop()
+        images = Post.objects.filter(author=user).exclude(
+            image=''
+        ).order_by().values_list('image', flat=True).distinct()
+        for name in images.iterator(chunk_size=CHUNK_SIZE):
+            try:
+                source = storage.open(name)
+            except FileNotFoundError:
+                continue
+            info = zipfile.ZipInfo(
+                'images/' + os.path.basename(name), time.localtime()[:6]
+            )
+            # Картинки уже сжаты
+            info.compress_type = zipfile.ZIP_STORED
+            with source, archive.open(info, 'w', force_zip64=True) as entry:
+                for chunk in iter(lambda: source.read(FILE_CHUNK_SIZE), b''):
+                    entry.write(chunk)
+                    yield buffer.pop()
+    yield buffer.pop()
+
+
+def stream_export(user, export_format):
+    """Выгрузка в формате export_format: строки (jsonl, csv) или байты
+    (zip)."""
+    if export_format == 'zip':
+        return zip_stream(user)
+    if export_format == 'csv':
+        return csv_lines(iter_records(user))
+    return jsonl_lines(iter_records(user))
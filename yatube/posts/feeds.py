@@ -0,0 +1,151 @@
+"""Ленты RSS и Atom: все посты, посты группы и посты автора.
+
+Готовые ленты кешируются для анонимных читателей по тем же тегам, что
+и HTML-страницы (core.cache), поэтому сбрасываются при изменении постов
+в своей ленте. На условные запросы отвечаем 304: Last-Modified — время
+самого нового поста, ETag — токены тегов, которые меняются и при правке
+или удалении поста.
+"""
+import hashlib
+
+from django.contrib.auth import get_user_model
+from django.contrib.syndication.views import Feed
+from django.db.models import Max
+from django.shortcuts import get_object_or_404
+from django.urls import reverse, reverse_lazy
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.text import Truncator
+from django.views.decorators.http import condition
+
+from core.cache import get_tag_tokens, page_cache
+from .models import Group, Post
+from .queries import visible
+
+User = get_user_model()
+
+FEED_LENGTH = 20
+
+
+class LatestPostsFeed(Feed):
+    title = 'Yatube: новые посты'
+    link = reverse_lazy('posts:index')
+    description = 'Последние посты всех авторов'
+
+    def items(self):
+        return visible(
+            Post.objects.select_related('author', 'group')
+        )[:FEED_LENGTH]
+
+    def item_title(self, item):
+        return Truncator(item.text).chars(60)
+
+    def item_description(self, item):
+        return item.text
+
+    def item_link(self, item):
+        return reverse('posts:post_detail', args=(item.pk,))
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+    def item_author_name(self, item):
+        return item.author.username
+
+
+class GroupPostsFeed(LatestPostsFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug, deleted__isnull=True)
+
+    def title(self, group):
+        return f'Yatube: {group.title}'
+
+    def link(self, group):
+        return reverse('posts:group_posts', args=(group.slug,))
+
+    def description(self, group):
+        return group.description or f'Посты группы {group.title}'
+
+    def items(self, group):
+        return visible(
+            group.posts.select_related('author', 'group')
+        )[:FEED_LENGTH]
+
+
+class AuthorPostsFeed(LatestPostsFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username, is_active=True)
+
+    def title(self, author):
+        return f'Yatube: посты {author.username}'
+
+    def link(self, author):
+        return reverse('posts:profile', args=(author.username,))
+
+    def description(self, author):
+        return f'Последние посты пользователя {author.username}'
+
+    def items(self, author):
+        return author.posts.select_related('author', 'group')[:FEED_LENGTH]
+
+
+class LatestPostsAtomFeed(LatestPostsFeed):
+    feed_type = Atom1Feed
+
+
+class GroupPostsAtomFeed(GroupPostsFeed):
+    feed_type = Atom1Feed
+
+
+class AuthorPostsAtomFeed(AuthorPostsFeed):
+    feed_type = Atom1Feed
+
+
+def feed_view(feed, tags, posts):
+    """View ленты с кешем для анонимов и условным GET.
+
+    tags и posts получают именованные аргументы из URL и возвращают
+    теги ленты и queryset её постов.
+    """
+    def last_modified(request, **kwargs):
+        return posts(**kwargs).aggregate(newest=Max('pub_date'))['newest']
+
+    def etag(request, **kwargs):
+        tokens = get_tag_tokens(tags(**kwargs), create=True)
+        return hashlib.md5(
+            repr(sorted(tokens.items())).encode()
+        ).hexdigest()
+
+    view = condition(etag_func=etag, last_modified_func=last_modified)(feed)
+    return page_cache(tags)(view)
+
+
+def latest_posts():
+    return visible(Post.objects.all())
+
+
+def group_posts(slug):
+    return visible(Post.objects.filter(group__slug=slug))
+
+
+def author_posts(username):
+    return Post.objects.filter(author__username=username)
+
+
+def feed_tags():
+    return ('feed',)
+
+
+def group_tags(slug):
+    return (f'group:{slug}',)
+
+
+def author_tags(username):
+    return (f'author:{username}',)
+
+
+latest_rss = feed_view(LatestPostsFeed(), feed_tags, latest_posts)
+latest_atom = feed_view(LatestPostsAtomFeed(), feed_tags, latest_posts)
+group_rss = feed_view(GroupPostsFeed(), group_tags, group_posts)
+group_atom = feed_view(GroupPostsAtomFeed(), group_tags, group_posts)
+author_rss = feed_view(AuthorPostsFeed(), author_tags, author_posts)
+author_atom = feed_view(AuthorPostsAtomFeed(), author_tags, author_posts)
@@ -0,0 +1,103 @@
+"""Подписки и счётчики FollowCounts.
+
+Счётчики меняют сигналы Follow (posts.signals) в той же транзакции,
+что и подписку, прибавлением F('поле') + 1 в базе: два одновременных
+запроса не затрут изменения друг друга. Подписку создаёт follow(),
+а не get_or_create — повтор упирается в unique_follow и ничего
+не меняет, так что одну подписку нельзя посчитать дважды. unfollow()
+блокирует строку подписки: из двух одновременных отписок удаляет
+и вычитает только одна.
+
+Массовое удаление подписок (posts.bulk.delete_follows) идёт в обход
+сигналов и пересчитывает счётчики затронутых пользователей само,
+одним recount() на порцию. Подписки, созданные или удалённые в обход
+сигналов иначе (bulk_create, update, SQL), счётчики не увидят — их
+поправит manage.py recount_follows.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from .models import Follow, FollowCounts
+
+
+def follow(user, author):
+    """Подписывает user на author; False, если подписка уже была."""
+    try:
+        with transaction.atomic():
+            Follow.objects.create(user=user, author=author)
+    except IntegrityError:
+        return False
+    return True
+
+
+def unfollow(user, author):
+    """Отписывает user от author; False, если подписки не было."""
+    with transaction.atomic():
+        # Без select_related: на PostgreSQL соединение заблокировало бы
+        # и строки пользователей, а FOR UPDATE OF MySQL не понимает
+        subscription = Follow.objects.select_for_update().filter(
+            user=user, author=author
+        ).first()
+        if subscription is None:
+            return False
+        # Сигналам нужны имена для сброса кеша — не читаем их заново
+        subscription.user = user
+        subscription.author = author
+        subscription.delete()
+    return True
+
+
+def change_counts(user_id, field, amount):
+    """Прибавляет amount к счётчику field пользователя.
+
+    Счётчик не уходит ниже нуля, даже если успел разойтись с Follow.
+    """
+    changes = {field: Greatest(F(field) + amount, 0)}
+    if FollowCounts.objects.filter(user_id=user_id).update(**changes):
+        return
+    if amount < 0:
+        # Строки нет — её создаст следующая подписка, пересчитав всё
+        return
+    try:
+        with transaction.atomic():
+            FollowCounts.objects.create(
+                user_id=user_id, **count_follows(user_id)
+            )
+    except IntegrityError:
+        # Ту же строку одновременно создал другой запрос
+        FollowCounts.objects.filter(user_id=user_id).update(**changes)
+
+
+def count_follows(user_id):
+    """Счётчики пользователя, посчитанные по Follow заново."""
+    return {
+        'followers': Follow.objects.filter(author_id=user_id).count(),
+        'following': Follow.objects.filter(user_id=user_id).count(),
+    }
+
+
+def recount(user_ids=None):
+    """Пересчитывает по Follow счётчики пользователей user_ids, по
+    умолчанию всех; возвращает число записанных строк."""
+    rows = FollowCounts.objects.all()
+    if user_ids is not None:
+        rows = rows.filter(user_id__in=user_ids)
+    counts = {}
+    for field, key in (('author', 'followers'), ('user', 'following')):
+        follows = Follow.objects.all()
+        if user_ids is not None:
+            follows = follows.filter(**{f'{field}__in': user_ids})
+        totals = follows.values_list(field).annotate(
+            total=Count('pk')
+        ).order_by()
+        for user_id, total in totals.iterator():
+            counts.setdefault(user_id, {})[key] = total
+    with transaction.atomic():
+        rows.delete()
+        FollowCounts.objects.bulk_create(
+            (FollowCounts(user_id=user_id, **values)
+             for user_id, values in counts.items()),
+            batch_size=500,
+        )
+    return len(counts)
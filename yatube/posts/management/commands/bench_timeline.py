@@ -0,0 +1,134 @@
+import random
+import time
+from datetime import timedelta
+from statistics import median
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+from posts import timeline
+from posts.models import Follow, Post
+from posts.views import POST_QUANTITY
+
+User = get_user_model()
+
+ENGINES = ('join', 'merge')
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает движки ленты подписок на синтетических данных: '
+        'время и число запросов для первых страниц. Данные создаются '
+        'в транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--authors', type=int, default=300,
+            help='На сколько авторов подписан читатель.',
+        )
+        parser.add_argument(
+            '--posts', type=int, default=50,
+            help='Сколько постов у каждого автора.',
+        )
+        parser.add_argument(
+            '--pages', type=int, default=3,
+            help='Сколько страниц ленты листать подряд.',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Сколько раз повторять; выводятся медианы.',
+        )
+
+    def handle(self, *args, **options):
+        # Слияние замеряется при любом числе подписок
+        with override_settings(TIMELINE_MERGE_MIN_AUTHORS=0), \
+                transaction.atomic():
+            reader = self.create_data(options['authors'], options['posts'])
+            results = {
+                engine: self.run(reader, engine, options)
+                for engine in ENGINES
+            }
+            timeline.reset(reader)
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'Подписок {options["authors"]}, постов у автора '
+            f'{options["posts"]}'
+        ))
+        for engine in ENGINES:
+            self.stdout.write(f'  {engine}')
+            for number, (seconds, queries) in enumerate(results[engine], 1):
+                self.stdout.write(
+                    f'    страница {number}: {seconds * 1000:8.1f} мс, '
+                    f'запросов {queries}'
+                )
+
+    def create_data(self, authors, posts):
+        suffix = random.randrange(10 ** 9)
+        reader = User.objects.create_user(username=f'bench-reader-{suffix}')
+        User.objects.bulk_create(
+            User(username=f'bench-author-{suffix}-{number}')
+            for number in range(authors)
+        )
+        author_ids = list(User.objects.filter(
+            username__startswith=f'bench-author-{suffix}-'
+        ).values_list('pk', flat=True))
+        Follow.objects.bulk_create(
+            Follow(user=reader, author_id=author_id)
+            for author_id in author_ids
+        )
+        Post.objects.bulk_create(
+            (
+                Post(text='Тестовый пост', author_id=author_id)
+                for author_id in author_ids
+                for _ in range(posts)
+            ),
+            batch_size=500,
+        )
+        # pub_date с auto_now_add при создании всегда «сейчас», поэтому
+        # даты проставляются вторым проходом. Авторы пишут с разной
+        # частотой, посты перемешаны во времени
+        now = timezone.now()
+        rows = list(Post.objects.filter(
+            author_id__in=author_ids
+        ).only('pk').order_by('pk'))
+        for number, post in enumerate(rows):
+            post.pub_date = now - timedelta(
+                minutes=random.expovariate(1 / 60) * (number % posts)
+            )
+        Post.objects.bulk_update(rows, ['pub_date'], batch_size=500)
+        return reader
+
+    def run(self, reader, engine, options):
+        runs = []
+        for _ in range(options['repeat']):
+            timeline.reset(reader)
+            pages = []
+            for number in range(1, options['pages'] + 1):
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    page = timeline.follow_page(
+                        reader, number, POST_QUANTITY, engine
+                    )
+                    posts = [post.pk for post in page]
+                    seconds = time.perf_counter() - started
+                pages.append((seconds, len(queries), posts))
+            runs.append(pages)
+        self.check_same_posts(engine, runs[-1])
+        return [
+            (
+                median(run[number][0] for run in runs),
+                runs[-1][number][1],
+            )
+            for number in range(options['pages'])
+        ]
+
+    def check_same_posts(self, engine, pages):
+        if engine == ENGINES[0]:
+            self.expected = [posts for _, _, posts in pages]
+        elif self.expected != [posts for _, _, posts in pages]:
+            raise CommandError(f'Движок {engine} вернул другие посты')
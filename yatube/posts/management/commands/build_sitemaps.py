@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from posts import sitemaps
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересобирает файлы карты сайта, в которых что-то изменилось, '
+        'и индекс sitemap.xml. Рассчитана на запуск по расписанию.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Пересобрать все файлы.',
+        )
+
+    def handle(self, *args, **options):
+        rebuilt = sitemaps.build(full=options['full'])
+        if options['verbosity'] > 1:
+            for name in rebuilt:
+                self.stdout.write(name)
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересобрано файлов карты сайта: {len(rebuilt)}'
+        ))
@@ -0,0 +1,107 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import bulk, tasks
+from posts.models import Comment, Group, Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит посты между группами или удаляет посты и комментарии '
+        'небольшими порциями. С --background ставит задачи в очередь.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'operation', choices=('move', 'delete', 'delete-comments'),
+        )
+        parser.add_argument(
+            '--author', help='Только записи этого пользователя.',
+        )
+        parser.add_argument(
+            '--group', help='Только посты этой группы (slug).',
+        )
+        parser.add_argument(
+            '--to-group',
+            help='Куда перенести посты (slug); без него — убрать из группы.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=bulk.CHUNK_SIZE,
+            help='Сколько строк обрабатывать за одну транзакцию.',
+        )
+        parser.add_argument(
+            '--background', action='store_true',
+            help='Не выполнять сразу, а поставить задачи в очередь.',
+        )
+
+    def get_group(self, slug):
+        try:
+            return Group.objects.get(slug=slug)
+        except Group.DoesNotExist:
+            raise CommandError(f'Группа {slug} не найдена')
+
+    def get_queryset(self, operation, options):
+        if not (options['author'] or options['group']):
+            raise CommandError('Укажите --author или --group')
+        if operation == 'delete-comments':
+            if options['group'] or options['to_group']:
+                raise CommandError(
+                    'Для комментариев доступен только фильтр --author'
+                )
+            queryset = Comment.objects.all()
+        else:
+            queryset = Post.objects.all()
+            if options['group']:
+                queryset = queryset.filter(
+                    group=self.get_group(options['group'])
+                )
+        if options['author']:
+            queryset = queryset.filter(author__username=options['author'])
+        return queryset
+
+    def handle(self, *args, **options):
+        operation = options['operation']
+        queryset = self.get_queryset(operation, options)
+        group = None
+        if operation == 'move' and options['to_group']:
+            group = self.get_group(options['to_group'])
+
+        if options['background']:
+            self.enqueue(operation, queryset, group)
+            return
+
+        def progress(done, total):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{done} из {total}...')
+
+        chunk_options = {
+            'chunk_size': options['chunk_size'],
+            'progress': progress,
+        }
+        if operation == 'move':
+            done = bulk.move_posts(queryset, group, **chunk_options)
+            message = f'Перенесено постов: {done}'
+        elif operation == 'delete':
+            done = bulk.delete_posts(queryset, **chunk_options)
+            message = f'Удалено постов: {done}'
+        else:
+            done = bulk.delete_comments(queryset, **chunk_options)
+            message = f'Удалено комментариев: {done}'
+        self.stdout.write(self.style.SUCCESS(message))
+
+    def enqueue(self, operation, queryset, group):
+        if operation == 'move':
+            jobs = bulk.enqueue_chunks(
+                tasks.move_posts, queryset, 'post_ids',
+                group_id=group.pk if group else None,
+            )
+        elif operation == 'delete':
+            jobs = bulk.enqueue_chunks(
+                tasks.delete_posts, queryset, 'post_ids'
+            )
+        else:
+            jobs = bulk.enqueue_chunks(
+                tasks.delete_comments, queryset, 'comment_ids'
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f'Поставлено в очередь задач: {jobs}')
+        )
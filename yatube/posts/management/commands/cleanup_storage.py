@@ -0,0 +1,66 @@
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.template.defaultfilters import filesizeformat
+
+from core.storage import content_addressed_storage
+from posts import cleanup
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет комментарии удалённых постов, файлы картинок без ссылок '
+        'и устаревшие записи и файлы миниатюр sorl. Рассчитана на запуск '
+        'по расписанию.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только посчитать, ничего не удаляя.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько строк или файлов проверять за раз.',
+        )
+        parser.add_argument(
+            '--min-age', type=int,
+            default=getattr(settings, 'BLOB_GRACE_PERIOD', 60 * 60),
+            help='Не трогать файлы моложе стольких секунд.',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        batch_size = options['batch_size']
+        min_age = options['min_age']
+        steps = (
+            ('Комментарии без поста', lambda: cleanup.orphan_comments(
+                batch_size, dry_run
+            )),
+            ('Картинки без ссылок', lambda: cleanup.unreferenced_images(
+                content_addressed_storage, batch_size, min_age, dry_run
+            )),
+            ('Записи sorl без файлов', lambda: cleanup.stale_kvstore(
+                batch_size, dry_run
+            )),
+            ('Миниатюры без записей', lambda: cleanup.orphan_thumbnails(
+                batch_size, min_age, dry_run
+            )),
+        )
+        total = Counter()
+        for title, step in steps:
+            report = step()
+            total.update(report)
+            self.stdout.write(f'{title}: {self.format(report)}')
+        verb = 'Можно освободить' if dry_run else 'Освобождено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb}: {self.format(total)}'
+        ))
+
+    def format(self, report):
+        rows = report['comments'] + report['kvstore']
+        return (
+            f'строк {rows}, файлов {report["files"]} '
+            f'({filesizeformat(report["bytes"])})'
+        )
@@ -0,0 +1,42 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.export import EXPORT_FORMATS, stream_export
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает посты, комментарии и подписки пользователя в JSONL, '
+        'CSV или zip-архив с картинками.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument(
+            '--format', choices=tuple(EXPORT_FORMATS), default='jsonl',
+        )
+        parser.add_argument(
+            '--output', default='-',
+            help='Файл для выгрузки; по умолчанию — стандартный вывод.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(
+                f'Пользователь {options["username"]} не найден'
+            )
+        if options['output'] == '-':
+            self.write(user, options['format'], sys.stdout.buffer)
+            return
+        with open(options['output'], 'wb') as output:
+            self.write(user, options['format'], output)
+
+    def write(self, user, export_format, output):
+        for chunk in stream_export(user, export_format):
+            output.write(chunk.encode() if isinstance(chunk, str) else chunk)
@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import recommendations
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рекомендации «кого почитать» по совместным '
+        'подпискам и группам. Рассчитана на запуск по расписанию.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top', type=int, default=recommendations.TOP_K,
+            help='Сколько рекомендаций хранить для пользователя.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=recommendations.BATCH_SIZE,
+            help='Сколько пользователей считать и записывать за раз.',
+        )
+        parser.add_argument(
+            '--group-weight', type=float,
+            default=recommendations.GROUP_WEIGHT,
+            help='Вес близости по группам; 0 — только совместные подписки.',
+        )
+
+    def handle(self, *args, **options):
+        def progress(done, total):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{done} из {total}...')
+
+        started = time.perf_counter()
+        written = recommendations.rebuild(
+            top=options['top'],
+            batch_size=options['batch_size'],
+            group_weight=options['group_weight'],
+            progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Записано рекомендаций: {written} '
+            f'за {time.perf_counter() - started:.1f} с'
+        ))
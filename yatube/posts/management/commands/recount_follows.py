@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts import follows
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счётчики подписчиков и подписок по таблице '
+        'подписок.'
+    )
+
+    def handle(self, *args, **options):
+        users = follows.recount()
+        self.stdout.write(
+            self.style.SUCCESS(f'Пересчитаны счётчики пользователей: {users}')
+        )
@@ -0,0 +1,39 @@
+# Generated by Django 2.2.16 on 2026-10-19 08:21
+
+import core.storage
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_image_references(apps, schema_editor):
+    """Заводит счётчики ссылок для уже загруженных картинок."""
+    Post = apps.get_model('posts', 'Post')
+    MediaBlob = apps.get_model('core', 'MediaBlob')
+    references = Post.objects.exclude(image='').values('image').annotate(
+        refcount=Count('pk')
+    ).order_by()
+    MediaBlob.objects.bulk_create(
+        (MediaBlob(name=row['image'], refcount=row['refcount'])
+         for row in references.iterator()),
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        ('posts', '0008_auto_20220827_1106'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, storage=core.storage.ContentAddressedStorage(), upload_to='posts/', verbose_name='Картинка'),
+        ),
+        migrations.RunPython(
+            count_image_references, migrations.RunPython.noop
+        ),
+    ]
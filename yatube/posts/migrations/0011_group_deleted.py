@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-19 08:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_admin_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='deleted',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Группа удалена и ждёт фоновой очистки', null=True, verbose_name='Удалена'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 2.2.16 on 2026-10-19 08:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_group_deleted'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SitemapShard',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('section', models.CharField(choices=[('posts', 'Посты'), ('profiles', 'Авторы'), ('groups', 'Группы')], max_length=10, verbose_name='Раздел')),
+                ('number', models.PositiveIntegerField(verbose_name='Номер')),
+                ('dirty', models.BooleanField(default=True, verbose_name='Нужно пересобрать')),
+                ('url_count', models.PositiveIntegerField(default=0, verbose_name='Адресов')),
+                ('lastmod', models.DateTimeField(null=True, verbose_name='Последнее изменение')),
+                ('generated', models.DateTimeField(null=True, verbose_name='Собран')),
+            ],
+            options={
+                'verbose_name': 'Часть карты сайта',
+                'verbose_name_plural': 'Части карты сайта',
+                'ordering': ['section', 'number'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='sitemapshard',
+            constraint=models.UniqueConstraint(fields=('section', 'number'), name='unique_sitemap_shard'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 2.2.16 on 2026-10-19 08:56
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def count_follows(apps, schema_editor):
+    """Заводит счётчики для уже существующих подписок."""
+    Follow = apps.get_model('posts', 'Follow')
+    FollowCounts = apps.get_model('posts', 'FollowCounts')
+    counts = {}
+    for field, key in (('author', 'followers'), ('user', 'following')):
+        rows = Follow.objects.values_list(field).annotate(
+            total=Count('pk')
+        ).order_by()
+        for user_id, total in rows.iterator():
+            counts.setdefault(user_id, {})[key] = total
+    FollowCounts.objects.bulk_create(
+        (FollowCounts(user_id=user_id, **values)
+         for user_id, values in counts.items()),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0012_sitemapshard'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FollowCounts',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='follow_counts', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('followers', models.PositiveIntegerField(default=0, verbose_name='Подписчиков')),
+                ('following', models.PositiveIntegerField(default=0, verbose_name='Подписок')),
+            ],
+            options={
+                'verbose_name': 'Счётчики подписок',
+                'verbose_name_plural': 'Счётчики подписок',
+            },
+        ),
+        migrations.RunPython(count_follows, migrations.RunPython.noop),
+    ]
@@ -2,6 +2,7 @@ from django.db import models
 from django.contrib.auth import get_user_model
 
 from core.models import CreatedModel
+from core.storage import content_addressed_storage
 
 User = get_user_model()
 
@@ -13,6 +14,13 @@ class Group(models.Model):
         max_length=200,
         blank=True
     )
+    deleted = models.DateTimeField(
+        'Удалена',
+        blank=True,
+        null=True,
+        editable=False,
+        help_text='Группа удалена и ждёт фоновой очистки',
+    )
 
     def __str__(self):
         return self.title
@@ -42,15 +50,34 @@ class Post(CreatedModel):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=content_addressed_storage,
         blank=True
     )
 
     class Meta:
         ordering = ['-pub_date', ]
+        indexes = [
+            models.Index(fields=['-pub_date'], name='post_pub_date_idx'),
+            models.Index(
+                fields=['author', '-pub_date'],
+                name='post_author_pub_date_idx',
+            ),
+            models.Index(
+                fields=['group', '-pub_date'],
+                name='post_group_pub_date_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Значения из базы нужны сигналам, чтобы понять, что изменилось
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -76,6 +103,15 @@ class Comment(models.Model):
         auto_now_add=True
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['post', 'created'],
+                name='comment_post_created_idx',
+            ),
+            models.Index(fields=['created'], name='comment_created_idx'),
+        ]
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -100,3 +136,98 @@ class Follow(models.Model):
         ]
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
+
+
+class FollowCounts(models.Model):
+    """Число подписчиков и подписок пользователя.
+
+    Счётчики меняются вместе с Follow (posts.follows), поэтому профилю
+    не нужен COUNT по подпискам. Строки нет, пока у пользователя нет
+    ни подписчиков, ни подписок.
+    """
+    user = models.OneToOneField(
+        User,
+        primary_key=True,
+        related_name='follow_counts',
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь',
+    )
+    followers = models.PositiveIntegerField('Подписчиков', default=0)
+    following = models.PositiveIntegerField('Подписок', default=0)
+
+    class Meta:
+        verbose_name = 'Счётчики подписок'
+        verbose_name_plural = 'Счётчики подписок'
+
+
+class SitemapShard(models.Model):
+    """Файл карты сайта: до SHARD_SIZE адресов одного раздела.
+
+    В файл с номером n попадают объекты с pk от n * SHARD_SIZE
+    до (n + 1) * SHARD_SIZE - 1, поэтому при изменении объекта сразу
+    понятно, какой файл пересобрать (см. posts.sitemaps).
+    """
+    POSTS = 'posts'
+    PROFILES = 'profiles'
+    GROUPS = 'groups'
+    SECTION_CHOICES = (
+        (POSTS, 'Посты'),
+        (PROFILES, 'Авторы'),
+        (GROUPS, 'Группы'),
+    )
+
+    section = models.CharField(
+        'Раздел', max_length=10, choices=SECTION_CHOICES
+    )
+    number = models.PositiveIntegerField('Номер')
+    dirty = models.BooleanField('Нужно пересобрать', default=True)
+    url_count = models.PositiveIntegerField('Адресов', default=0)
+    lastmod = models.DateTimeField('Последнее изменение', null=True)
+    generated = models.DateTimeField('Собран', null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['section', 'number'],
+                name='unique_sitemap_shard',
+            ),
+        ]
+        ordering = ['section', 'number']
+        verbose_name = 'Часть карты сайта'
+        verbose_name_plural = 'Части карты сайта'
+
+    def __str__(self):
+        return f'{self.section}-{self.number}.xml'
+
+
+class FollowSuggestion(models.Model):
+    """Кого почитать: author в списке рекомендаций user на месте rank.
+
+    Таблицу целиком пересобирает manage.py recommend_follows
+    (posts.recommendations).
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follow_suggestions',
+        verbose_name='Пользователь',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор',
+    )
+    rank = models.PositiveSmallIntegerField('Место')
+    score = models.FloatField('Оценка')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'rank'],
+                name='unique_follow_suggestion_rank',
+            ),
+        ]
+        ordering = ['user', 'rank']
+        verbose_name = 'Рекомендация подписки'
+        verbose_name_plural = 'Рекомендации подписок'
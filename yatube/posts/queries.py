@@ -0,0 +1,35 @@
+"""Общие подзапросы для страниц с постами."""
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Post
+
+
+def count_of(queryset, field, outer='pk'):
+    """Подзапрос с числом строк queryset, у которых field совпадает
+    с полем outer внешней строки."""
+    counts = queryset.filter(**{field: OuterRef(outer)}).order_by().values(
+        field
+    ).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def visible(posts):
+    """Посты или комментарии, которые можно показывать: без записей
+    удалённых и заблокированных авторов (см. posts.deletion)."""
+    return posts.filter(author__is_active=True)
+
+
+def with_author_posts_count(posts):
+    """Посты с числом постов их авторов для карточек (article.html)."""
+    return posts.annotate(
+        author_posts_count=count_of(Post.objects.all(), 'author', 'author')
+    )
+
+
+def with_follow_counts(users):
+    """Пользователи с числом подписчиков и подписок из FollowCounts."""
+    return users.annotate(
+        followers_count=Coalesce(F('follow_counts__followers'), 0),
+        following_count=Coalesce(F('follow_counts__following'), 0),
+    )
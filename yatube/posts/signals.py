@@ -0,0 +1,137 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core import blobs
+from core.cache import invalidate_tags
+from jobs.queue import enqueue_on_commit
+from . import follows
+from .models import Comment, Follow, Group, Post, SitemapShard
+from .sitemaps import mark_dirty, mark_posts_dirty
+from .tasks import make_thumbnails
+
+User = get_user_model()
+
+
+def group_tags(post):
+    """Теги текущей и прежней (если пост перенесли) группы поста."""
+    loaded_group_id = getattr(post, '_loaded_values', {}).get(
+        'group_id', post.group_id
+    )
+    group_ids = {post.group_id, loaded_group_id} - {None}
+    if group_ids == {post.group_id} and Post.group.is_cached(post):
+        slugs = [post.group.slug]
+    else:
+        slugs = Group.objects.filter(pk__in=group_ids).values_list(
+            'slug', flat=True
+        ) if group_ids else []
+    return [f'group:{slug}' for slug in slugs]
+
+
+# Посты и комментарии массово удаляют posts.bulk.delete_posts
+# и delete_comments через QuerySet._raw_delete, в обход обработчиков
+# post_delete ниже: их работа делается там сразу для порции. Новый
+# обработчик post_delete у Post или Comment нужно повторить и в posts.bulk
+# (об этом напомнит test_bulk.test_delete_handlers_known).
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_pages(sender, instance, **kwargs):
+    """Сбрасывает страницы ленты, группы, автора и самого поста."""
+    invalidate_tags(
+        'feed',
+        f'post:{instance.pk}',
+        f'author:{instance.author.username}',
+        *group_tags(instance),
+    )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def mark_post_sitemaps(sender, instance, **kwargs):
+    loaded_group_id = getattr(instance, '_loaded_values', {}).get(
+        'group_id'
+    )
+    mark_posts_dirty([
+        (instance.pk, instance.author_id, instance.group_id),
+        (instance.pk, instance.author_id, loaded_group_id),
+    ])
+
+
+@receiver(post_save, sender=Post)
+def track_image(sender, instance, created, **kwargs):
+    """Ведёт счётчик ссылок на картинку и готовит миниатюры новой."""
+    image = instance.image.name or ''
+    loaded_image = getattr(instance, '_loaded_values', {}).get('image') or ''
+    if image == loaded_image and not created:
+        return
+    blobs.acquire(image)
+    blobs.release(loaded_image)
+    # Запоминаем новое значение: повторный save() не должен
+    # учесть ту же картинку ещё раз
+    instance._loaded_values = {
+        **getattr(instance, '_loaded_values', {}), 'image': image
+    }
+    if image:
+        enqueue_on_commit(
+            make_thumbnails,
+            {'post_id': instance.pk},
+            dedupe_key=f'thumbnails:{instance.pk}',
+        )
+
+
+@receiver(post_delete, sender=Post)
+def release_image(sender, instance, **kwargs):
+    loaded_image = getattr(instance, '_loaded_values', {}).get(
+        'image', instance.image.name
+    )
+    blobs.release(loaded_image)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_pages(sender, instance, **kwargs):
+    if instance.post_id is not None:
+        invalidate_tags(f'post:{instance.post_id}')
+
+
+# Массовое удаление подписок (posts.bulk.delete_follows) идёт в обход
+# обработчиков ниже и само пересчитывает счётчики и сбрасывает страницы
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, **kwargs):
+    if created:
+        follows.change_counts(instance.user_id, 'following', 1)
+        follows.change_counts(instance.author_id, 'followers', 1)
+        invalidate_follow_pages(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def uncount_follow(sender, instance, **kwargs):
+    follows.change_counts(instance.user_id, 'following', -1)
+    follows.change_counts(instance.author_id, 'followers', -1)
+    invalidate_follow_pages(instance)
+
+
+def invalidate_follow_pages(follow):
+    # Счётчики подписок есть на страницах обоих пользователей
+    invalidate_tags(
+        f'author:{follow.user.username}',
+        f'author:{follow.author.username}',
+    )
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_pages(sender, instance, **kwargs):
+    # Ссылки на группу есть в карточках ленты
+    invalidate_tags('feed', f'group:{instance.slug}')
+    mark_dirty({SitemapShard.GROUPS: [instance.pk]})
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_author_pages(sender, instance, update_fields=None, **kwargs):
+    # Вход в систему обновляет только last_login — на страницах его нет
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    invalidate_tags(f'author:{instance.username}')
+    mark_dirty({SitemapShard.PROFILES: [instance.pk]})
@@ -0,0 +1,231 @@
+"""Карта сайта для поисковиков, разбитая на файлы.
+
+Команда build_sitemaps пишет в SITEMAP_ROOT индекс sitemap.xml и файлы
+<раздел>-<номер>.xml. В файл n раздела попадают объекты с pk от
+n * SHARD_SIZE до (n + 1) * SHARD_SIZE - 1, так что в нём не больше
+50 000 адресов — предела протокола sitemaps. Объекты читаются порциями
+по pk, без OFFSET.
+
+Изменения постов, авторов и групп помечают свои файлы грязными
+(mark_dirty), и команда пересобирает только их.
+"""
+import os
+import tempfile
+from collections import defaultdict
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Max, Q
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Group, Post, SitemapShard
+
+User = get_user_model()
+
+SHARD_SIZE = 50000
+BATCH_SIZE = 5000
+INDEX_NAME = 'sitemap.xml'
+XMLNS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+
+def shard_number(pk):
+    return pk // SHARD_SIZE
+
+
+def mark_dirty(changes):
+    """Помечает файлы для пересборки. changes — {раздел: [pk, ...]}."""
+    shards = {
+        (section, shard_number(pk))
+        for section, pks in changes.items() for pk in pks if pk is not None
+    }
+    if not shards:
+        return
+    SitemapShard.objects.bulk_create(
+        [SitemapShard(section=section, number=number)
+         for section, number in shards],
+        ignore_conflicts=True,
+    )
+    condition = Q()
+    for section, number in shards:
+        condition |= Q(section=section, number=number)
+    SitemapShard.objects.filter(condition, dirty=False).update(dirty=True)
+
+
+def mark_posts_dirty(rows):
+    """rows — (pk, author_id, group_id) изменённых постов."""
+    changes = defaultdict(list)
+    for pk, author_id, group_id in rows:
+        changes[SitemapShard.POSTS].append(pk)
+        changes[SitemapShard.PROFILES].append(author_id)
+        changes[SitemapShard.GROUPS].append(group_id)
+    mark_dirty(changes)
+
+
+def keyset(queryset, batch_size=BATCH_SIZE):
+    """Строки values_list, начинающиеся с pk, порциями по pk."""
+    last_pk = None
+    while True:
+        batch = queryset if last_pk is None else queryset.filter(
+            pk__gt=last_pk
+        )
+        rows = list(batch[:batch_size])
+        if not rows:
+            return
+        yield from rows
+        last_pk = rows[-1][0]
+
+
+def post_entries(start, stop):
+    posts = Post.objects.filter(pk__gte=start, pk__lt=stop).order_by(
+        'pk'
+    ).values_list('pk', 'pub_date')
+    for pk, pub_date in keyset(posts):
+        yield reverse('posts:post_detail', args=(pk,)), pub_date
+
+
+def profile_entries(start, stop):
+    # Профили без постов поисковикам не нужны
+    users = User.objects.filter(
+        pk__gte=start, pk__lt=stop, is_active=True
+    ).annotate(
+        lastmod=Max('posts__pub_date')
+    ).filter(lastmod__isnull=False).order_by('pk').values_list(
+        'pk', 'username', 'lastmod'
+    )
+    for _, username, lastmod in keyset(users):
+        yield reverse('posts:profile', args=(username,)), lastmod
+
+
+def group_entries(start, stop):
+    groups = Group.objects.filter(
+        pk__gte=start, pk__lt=stop, deleted__isnull=True
+    ).annotate(
+        lastmod=Max('posts__pub_date')
+    ).order_by('pk').values_list('pk', 'slug', 'lastmod')
+    for _, slug, lastmod in keyset(groups):
+        yield reverse('posts:group_posts', args=(slug,)), lastmod
+
+
+# Раздел: (модель, функция адресов файла)
+SECTIONS = {
+    SitemapShard.POSTS: (Post, post_entries),
+    SitemapShard.PROFILES: (User, profile_entries),
+    SitemapShard.GROUPS: (Group, group_entries),
+}
+
+
+def w3c_date(value):
+    return value.replace(microsecond=0).isoformat()
+
+
+def write_atomic(path, lines):
+    """Пишет файл целиком во временный и подменяет им старый, чтобы
+    поисковик не получил недописанный файл."""
+    descriptor, temp_path = tempfile.mkstemp(
+        dir=os.path.dirname(path), suffix='.tmp'
+    )
+    try:
+        with os.fdopen(descriptor, 'w', encoding='utf-8') as output:
+            output.writelines(lines)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def urlset_lines(entries, base_url, stats):
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield f'<urlset xmlns="{XMLNS}">\n'
+    for location, lastmod in entries:
+        stats['count'] += 1
+        if lastmod and (stats['lastmod'] is None
+                        or lastmod > stats['lastmod']):
+            stats['lastmod'] = lastmod
+        line = f'<url><loc>{escape(base_url + location)}</loc>'
+        if lastmod:
+            line += f'<lastmod>{w3c_date(lastmod)}</lastmod>'
+        yield line + '</url>\n'
+    yield '</urlset>\n'
+
+
+def build_shard(shard, root, base_url):
+    """Пересобирает файл; возвращает число адресов в нём."""
+    model, entries = SECTIONS[shard.section]
+    start = shard.number * SHARD_SIZE
+    stats = {'count': 0, 'lastmod': None}
+    path = os.path.join(root, str(shard))
+    write_atomic(path, urlset_lines(
+        entries(start, start + SHARD_SIZE), base_url, stats
+    ))
+    if not stats['count']:
+        os.remove(path)
+    SitemapShard.objects.filter(pk=shard.pk).update(
+        url_count=stats['count'],
+        lastmod=stats['lastmod'],
+        generated=timezone.now(),
+    )
+    return stats['count']
+
+
+def index_lines(base_url):
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield f'<sitemapindex xmlns="{XMLNS}">\n'
+    shards = SitemapShard.objects.filter(url_count__gt=0)
+    for shard in shards.iterator():
+        location = base_url + reverse(
+            'sitemap_shard', kwargs={'path': str(shard)}
+        )
+        line = f'<sitemap><loc>{escape(location)}</loc>'
+        if shard.lastmod:
+            line += f'<lastmod>{w3c_date(shard.lastmod)}</lastmod>'
+        yield line + '</sitemap>\n'
+    yield '</sitemapindex>\n'
+
+
+def add_missing_shards():
+    """Заводит записи для файлов, которых ещё нет, например при первом
+    запуске на уже заполненной базе."""
+    changes = {}
+    for section, (model, _) in SECTIONS.items():
+        max_pk = model.objects.aggregate(max_pk=Max('pk'))['max_pk']
+        if max_pk is None:
+            continue
+        known = set(SitemapShard.objects.filter(
+            section=section
+        ).values_list('number', flat=True))
+        changes[section] = [
+            number * SHARD_SIZE
+            for number in range(shard_number(max_pk) + 1)
+            if number not in known
+        ]
+    mark_dirty(changes)
+
+
+def build(full=False, root=None, base_url=None):
+    """Пересобирает грязные файлы (с full=True — все) и индекс.
+
+    Возвращает имена пересобранных файлов.
+    """
+    root = root or settings.SITEMAP_ROOT
+    base_url = (base_url or settings.SITEMAP_BASE_URL).rstrip('/')
+    os.makedirs(root, exist_ok=True)
+    add_missing_shards()
+    if full:
+        SitemapShard.objects.update(dirty=True)
+    rebuilt = []
+    for shard in SitemapShard.objects.filter(dirty=True):
+        # Снимаем пометку до сборки: изменения, пришедшие во время неё,
+        # пометят файл снова и он соберётся при следующем запуске
+        if not SitemapShard.objects.filter(
+            pk=shard.pk, dirty=True
+        ).update(dirty=False):
+            continue
+        build_shard(shard, root, base_url)
+        rebuilt.append(str(shard))
+    index_path = os.path.join(root, INDEX_NAME)
+    if rebuilt or not os.path.exists(index_path):
+        write_atomic(index_path, index_lines(base_url))
+    return rebuilt
@@ -0,0 +1,61 @@
+from jobs.queue import report_progress, task
+from . import bulk, deletion
+from .models import Comment, Group, Post
+
+# Миниатюры, которые показывают шаблоны (см. includes/article.html)
+THUMBNAILS = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+
+
+@task('posts.make_thumbnails', priority=-1)
+def make_thumbnails(post_id):
+    """Заранее готовит миниатюры картинки поста, чтобы их не строил
+    первый запрос страницы."""
+    # sorl и Pillow нужны только здесь — не грузим их при старте
+    # обработчиков очереди
+    from sorl.thumbnail import get_thumbnail
+
+    post = Post.objects.filter(pk=post_id).only('image').first()
+    if post is None or not post.image:
+        return
+    for geometry, options in THUMBNAILS:
+        get_thumbnail(post.image, geometry, **options)
+
+
+@task('posts.move_posts', priority=-1)
+def move_posts(post_ids, group_id=None):
+    group = None
+    if group_id is not None:
+        group = Group.objects.filter(pk=group_id).first()
+        if group is None:
+            # Группу успели удалить — переносить некуда
+            return
+    bulk.move_posts(
+        Post.objects.filter(pk__in=post_ids), group,
+        progress=report_progress,
+    )
+
+
+@task('posts.delete_posts', priority=-1)
+def delete_posts(post_ids):
+    bulk.delete_posts(
+        Post.objects.filter(pk__in=post_ids), progress=report_progress
+    )
+
+
+@task('posts.delete_comments', priority=-1)
+def delete_comments(comment_ids):
+    bulk.delete_comments(
+        Comment.objects.filter(pk__in=comment_ids), progress=report_progress
+    )
+
+
+@task('posts.purge_user', priority=-1)
+def purge_user(user_id):
+    deletion.purge_user(user_id, progress=report_progress)
+
+
+@task('posts.purge_group', priority=-1)
+def purge_group(group_id):
+    deletion.purge_group(group_id, progress=report_progress)
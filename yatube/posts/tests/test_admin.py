@@ -0,0 +1,91 @@
+from datetime import timedelta
+from http import HTTPStatus
+
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class AdminChangelistTests(TestCase):
+    """Списки в админке не считают таблицу целиком и не тянут тексты."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@yatube.ru', 'password'
+        )
+        cls.author = User.objects.create_user(username='admin-author')
+        group = Group.objects.create(title='Группа', slug='admin-group')
+        cls.post = Post.objects.create(
+            text='Очень длинный текст поста ' * 20,
+            author=cls.author,
+            group=group,
+        )
+        Comment.objects.create(
+            post=cls.post, author=cls.author, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.admin, author=cls.author)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_changelists_open(self):
+        """Списки всех моделей открываются."""
+        for model in (Post, Comment, Follow, Group):
+            url = reverse(f'admin:posts_{model._meta.model_name}_changelist')
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_post_changelist_truncates_text(self):
+        """В списке постов — укороченный текст без полного чтения поля."""
+        url = reverse('admin:posts_post_changelist')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertContains(response, '…')
+        self.assertNotContains(response, self.post.text)
+        sql = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('COUNT(*) AS "__count" FROM "posts_post"', sql)
+        self.assertNotIn('"posts_post"."text" FROM', sql)
+
+    def test_change_form_has_full_text(self):
+        """В форме редактирования текст поста полный."""
+        url = reverse('admin:posts_post_change', args=(self.post.pk,))
+        self.assertContains(self.client.get(url), self.post.text.strip())
+
+    def test_text_search_limited_to_recent(self):
+        """Текст ищется только среди недавних строк, если период не
+        выбран; автор — по началу имени."""
+        url = reverse('admin:posts_comment_changelist')
+        response = self.client.get(url, {'q': 'Комментарий'})
+        self.assertEqual(response.context['cl'].result_count, 1)
+        old = timezone.now() - timedelta(days=60)
+        Post.objects.filter(pk=self.post.pk).update(pub_date=old)
+        Comment.objects.update(created=old)
+        for model, field in ((Post, 'pub_date'), (Comment, 'created')):
+            url = reverse(f'admin:posts_{model._meta.model_name}_changelist')
+            with self.subTest(model=model.__name__):
+                for params, found in (
+                    ({'q': 'текст поста'}, 0),
+                    ({'q': 'Комментарий'}, 0),
+                    ({'q': 'admin-au'}, 0),
+                    ({'q': 'текст поста', f'{field}__year': old.year},
+                     int(model is Post)),
+                    ({'q': 'Комментарий', f'{field}__year': old.year},
+                     int(model is Comment)),
+                ):
+                    response = self.client.get(url, params)
+                    self.assertEqual(
+                        response.context['cl'].result_count, found, params
+                    )
+                    # Об ограничении поиска админ узнаёт из сообщения
+                    limited = any(
+                        'за последние 30 дней' in str(message)
+                        for message in response.context['messages']
+                    )
+                    self.assertEqual(limited, len(params) == 1, params)
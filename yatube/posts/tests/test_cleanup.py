@@ -0,0 +1,78 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from sorl.thumbnail import get_thumbnail
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.models import KVStore
+
+from core.storage import content_addressed_storage
+from posts.models import Comment, Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class CleanupStorageTests(TestCase):
+    """Очистка комментариев, файлов и записей sorl без ссылок."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        author = User.objects.create_user(username='cleaner')
+        self.post = Post.objects.create(
+            text='С картинкой', author=author,
+            image=SimpleUploadedFile('kept.gif', SMALL_GIF),
+        )
+        Comment.objects.create(post=self.post, author=author, text='Живой')
+        Comment.objects.create(post=None, author=author, text='Сирота')
+        # Файл, оставшийся от старой картинки, и его миниатюра
+        self.orphan = 'posts/image_old.gif'
+        with open(content_addressed_storage.path(self.orphan), 'wb') as file:
+            file.write(SMALL_GIF)
+        get_thumbnail(ImageFile(self.orphan, content_addressed_storage), '8')
+        # Миниатюра, чей файл удалили в обход sorl
+        thumbnail = get_thumbnail(self.post.image, '4')
+        thumbnail.storage.delete(thumbnail.name)
+
+    def cleanup(self, *args):
+        out = StringIO()
+        call_command('cleanup_storage', '--min-age=0', *args, stdout=out)
+        return out.getvalue()
+
+    def test_dry_run_changes_nothing(self):
+        """Пробный запуск только считает."""
+        output = self.cleanup('--dry-run')
+        self.assertIn('Можно освободить', output)
+        self.assertEqual(Comment.objects.count(), 2)
+        self.assertTrue(content_addressed_storage.exists(self.orphan))
+
+    def test_cleanup(self):
+        """Удаляются только данные без ссылок."""
+        keys_before = KVStore.objects.count()
+        output = self.cleanup()
+        self.assertIn('Комментарии без поста: строк 1', output)
+        self.assertIn('Записи sorl без файлов: строк 1', output)
+        self.assertEqual(Comment.objects.get().text, 'Живой')
+        self.assertFalse(content_addressed_storage.exists(self.orphan))
+        self.assertTrue(content_addressed_storage.exists(self.post.image.name))
+        self.assertLess(KVStore.objects.count(), keys_before)
+
+        # Повторный запуск ничего не находит
+        self.assertIn('Освобождено: строк 0, файлов 0', self.cleanup())
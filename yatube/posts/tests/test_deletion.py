@@ -0,0 +1,140 @@
+from django.contrib import admin
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from core.admin import SoftDeleteAdminMixin
+
+from jobs.models import Job
+from jobs.worker import Worker
+from posts.admin import MoveToGroupForm
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class SoftDeleteTests(TestCase):
+    """Пометка об удалении сразу, очистка — фоновой задачей."""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            'boss', 'boss@yatube.ru', 'password'
+        )
+        self.author = User.objects.create_user(username='leaving')
+        self.reader = User.objects.create_user(username='staying')
+        self.group = Group.objects.create(title='Группа', slug='closing')
+        for number in range(3):
+            post = Post.objects.create(
+                text=f'Пост {number}', author=self.author, group=self.group
+            )
+        Comment.objects.create(post=post, author=self.author, text='Свой')
+        Comment.objects.create(post=post, author=self.reader, text='Чужой')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.author, author=self.reader)
+        self.client.force_login(self.admin)
+
+    def run_jobs(self):
+        worker = Worker(name='test-worker')
+        while worker.run_once():
+            pass
+
+    def delete_in_admin(self, obj):
+        opts = obj._meta
+        url = reverse(
+            f'admin:{opts.app_label}_{opts.model_name}_delete',
+            args=(obj.pk,),
+        )
+        response = self.client.get(url)
+        self.assertContains(response, str(obj))
+        self.client.post(url, {'post': 'yes'})
+
+    def test_user_deleted_in_background(self):
+        """Пользователь исчезает сразу, его записи — после очистки."""
+        self.delete_in_admin(self.author)
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.username, f'deleted:{self.author.pk}')
+        self.assertFalse(self.author.is_active)
+        self.assertEqual(
+            self.client.get('/profile/leaving/').status_code, 404
+        )
+        self.assertEqual(Post.objects.count(), 3)
+        # До очистки посты уже не показываются
+        self.assertNotContains(self.client.get('/'), 'Пост 0')
+        post = Post.objects.first()
+        self.assertEqual(
+            self.client.get(f'/posts/{post.pk}/').status_code, 404
+        )
+
+        job = Job.objects.get(task='posts.purge_user')
+        self.run_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual((job.progress, job.total), (6, 6))
+        self.assertFalse(User.objects.filter(pk=self.author.pk).exists())
+        self.assertFalse(Post.objects.exists())
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(
+            list(Comment.objects.values_list('text', 'post')),
+            [('Чужой', None)],
+        )
+
+    def test_comments_and_follow_lists_hidden(self):
+        """До очистки комментарии удалённого не видны, а в списках
+        подписок нет строк deleted:<id>."""
+        post = Post.objects.create(text='Пост читателя', author=self.reader)
+        Comment.objects.create(
+            post=post, author=self.author, text='Прощальный'
+        )
+        self.delete_in_admin(self.author)
+        self.assertNotContains(
+            self.client.get(f'/posts/{post.pk}/'), 'Прощальный'
+        )
+        for kind in ('followers', 'following'):
+            with self.subTest(kind=kind):
+                response = self.client.get(
+                    reverse(f'posts:{kind}', args=('staying',))
+                )
+                self.assertEqual(response.context['people'], [])
+                self.assertNotContains(response, 'deleted:')
+
+    def test_deleted_group_not_offered(self):
+        """В удалённую группу посты не переносят."""
+        self.delete_in_admin(self.group)
+        response = self.client.get(
+            reverse('admin:posts_group_autocomplete'), {'term': ''}
+        )
+        self.assertEqual(response.json()['results'], [])
+        choices = MoveToGroupForm().fields['group'].queryset
+        self.assertNotIn(self.group, choices)
+
+    def test_group_deleted_in_background(self):
+        """Группа исчезает сразу, посты остаются без группы."""
+        self.delete_in_admin(self.group)
+        self.assertEqual(
+            self.client.get('/group/closing/').status_code, 404
+        )
+        # Посты на месте, но без ссылки на удалённую группу
+        post = Post.objects.first()
+        response = self.client.get(f'/posts/{post.pk}/')
+        self.assertContains(response, post.text)
+        self.assertNotContains(response, 'Группа:')
+        self.run_jobs()
+        self.assertFalse(Group.objects.exists())
+        self.assertEqual(Post.objects.filter(group=None).count(), 3)
+
+    def test_restored_user_not_purged(self):
+        """Если пользователя восстановили до очистки, его не удаляют."""
+        self.delete_in_admin(self.author)
+        User.objects.filter(pk=self.author.pk).update(
+            username='leaving', is_active=True
+        )
+        self.run_jobs()
+        self.assertEqual(Post.objects.count(), 3)
+
+
+class SoftDeleteAdminCheckTests(SimpleTestCase):
+
+    def test_soft_delete_function_required(self):
+        """Без soft_delete_function админка не проходит проверку."""
+        class BrokenAdmin(SoftDeleteAdminMixin, admin.ModelAdmin):
+            pass
+
+        errors = BrokenAdmin(Group, admin.site).check()
+        self.assertEqual([error.id for error in errors], ['core.E001'])
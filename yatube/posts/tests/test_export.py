@@ -0,0 +1,104 @@
+import csv
+import io
+import json
+import shutil
+import tempfile
+import zipfile
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ExportTests(TestCase):
+    """Потоковая выгрузка данных пользователя."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='exporter')
+        cls.friend = User.objects.create_user(username='friend')
+        cls.post = Post.objects.create(
+            text='Мой пост', author=cls.user,
+            image=SimpleUploadedFile('pic.gif', SMALL_GIF),
+        )
+        Post.objects.create(text='Чужой пост', author=cls.friend)
+        Comment.objects.create(post=cls.post, author=cls.user, text='Ответ')
+        Follow.objects.create(user=cls.user, author=cls.friend)
+        Follow.objects.create(user=cls.friend, author=cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def export(self, export_format):
+        response = self.client.get(
+            reverse('posts:export_data'), {'format': export_format}
+        )
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment', response['Content-Disposition'])
+        return b''.join(response.streaming_content)
+
+    def test_jsonl(self):
+        """JSONL содержит только свои записи и обе стороны подписок."""
+        records = [
+            json.loads(line)
+            for line in self.export('jsonl').decode().splitlines()
+        ]
+        self.assertEqual(
+            [(record['type'], record.get('text') or record.get('username'))
+             for record in records],
+            [('post', 'Мой пост'), ('comment', 'Ответ'),
+             ('following', 'friend'), ('follower', 'friend')],
+        )
+
+    def test_csv(self):
+        """CSV с заголовком и строкой на каждую запись."""
+        rows = list(csv.DictReader(io.StringIO(self.export('csv').decode())))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[0]['image'], self.post.image.name)
+
+    def test_zip(self):
+        """В архиве данные и картинки постов."""
+        archive = zipfile.ZipFile(io.BytesIO(self.export('zip')))
+        self.assertIsNone(archive.testzip())
+        image = 'images/' + self.post.image.name.rsplit('/', 1)[-1]
+        self.assertEqual(archive.read(image), SMALL_GIF)
+        self.assertEqual(
+            len(archive.read('data.jsonl').decode().splitlines()), 4
+        )
+
+    def test_unknown_format_and_guest(self):
+        """Неизвестный формат — 404, гость отправляется на вход."""
+        url = reverse('posts:export_data')
+        self.assertEqual(
+            self.client.get(url, {'format': 'xml'}).status_code, 404
+        )
+        self.client.logout()
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+    def test_command(self):
+        """Команда пишет ту же выгрузку в файл."""
+        with tempfile.NamedTemporaryFile(suffix='.jsonl') as output:
+            call_command('export_user', 'exporter', output=output.name)
+            self.assertEqual(len(output.read().splitlines()), 4)
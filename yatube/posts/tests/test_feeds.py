@@ -0,0 +1,69 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from core.tests.utils import ClearCachesMixin, shared_caches
+from posts.models import Group, Post, User
+
+
+@shared_caches()
+class FeedTests(ClearCachesMixin, TestCase):
+    """Ленты RSS и Atom."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='feeder')
+        cls.group = Group.objects.create(title='Ленты', slug='feeds')
+        cls.post = Post.objects.create(
+            text='Пост для ленты', author=cls.author, group=cls.group
+        )
+
+    def test_feeds(self):
+        """Все ленты отдают посты своей области."""
+        urls = {
+            reverse('posts:feed_rss'): 'application/rss+xml',
+            reverse('posts:feed_atom'): 'application/atom+xml',
+            reverse('posts:group_feed_rss', args=('feeds',)):
+                'application/rss+xml',
+            reverse('posts:group_feed_atom', args=('feeds',)):
+                'application/atom+xml',
+            reverse('posts:profile_feed_rss', args=('feeder',)):
+                'application/rss+xml',
+            reverse('posts:profile_feed_atom', args=('feeder',)):
+                'application/atom+xml',
+        }
+        for url, content_type in urls.items():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertTrue(response['Content-Type'].startswith(
+                    content_type
+                ))
+                self.assertContains(response, 'Пост для ленты')
+                self.assertIn('Last-Modified', response)
+
+    def test_missing_scope(self):
+        """Лента несуществующей группы — 404."""
+        url = reverse('posts:group_feed_rss', args=('nope',))
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_conditional_get(self):
+        """Неизменившаяся лента отдаётся как 304, в том числе из кеша."""
+        url = reverse('posts:group_feed_atom', args=('feeds',))
+        first = self.client.get(url)
+        self.assertEqual(first['X-Page-Cache'], 'miss')
+        for header, value in (('HTTP_IF_NONE_MATCH', first['ETag']),
+                              ('HTTP_IF_MODIFIED_SINCE',
+                               first['Last-Modified'])):
+            with self.subTest(header=header):
+                response = self.client.get(url, **{header: value})
+                self.assertEqual(response.status_code, 304)
+
+    def test_edit_invalidates_feed(self):
+        """Правка поста меняет ETag и содержимое ленты."""
+        url = reverse('posts:profile_feed_rss', args=('feeder',))
+        etag = self.client.get(url)['ETag']
+        self.post.text = 'Исправленный пост'
+        self.post.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Исправленный пост')
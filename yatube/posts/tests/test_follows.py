@@ -0,0 +1,117 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from core.tests.utils import ClearCachesMixin
+from posts import bulk, follows
+from posts.models import Follow, FollowCounts
+
+User = get_user_model()
+
+
+class FollowCountsTests(ClearCachesMixin, TestCase):
+    """Счётчики подписчиков и подписок."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.readers = [
+            User.objects.create_user(username=f'reader{number}')
+            for number in range(5)
+        ]
+
+    def counts(self, user):
+        counts = FollowCounts.objects.get(user=user)
+        return counts.followers, counts.following
+
+    def test_follow_and_unfollow(self):
+        """Повторная подписка и отписка не сдвигают счётчики."""
+        client = self.client
+        client.force_login(self.readers[0])
+        url = reverse('posts:profile_follow', args=(self.author.username,))
+        client.get(url)
+        client.get(url)
+        self.assertEqual(self.counts(self.author), (1, 0))
+        self.assertEqual(self.counts(self.readers[0]), (0, 1))
+        url = reverse('posts:profile_unfollow', args=(self.author.username,))
+        client.get(url)
+        client.get(url)
+        self.assertEqual(self.counts(self.author), (0, 0))
+        self.assertEqual(self.counts(self.readers[0]), (0, 0))
+
+    def test_counts_created_from_follows(self):
+        """Без строки счётчиков она создаётся пересчётом подписок."""
+        Follow.objects.bulk_create(
+            Follow(user=reader, author=self.author)
+            for reader in self.readers[:3]
+        )
+        self.assertTrue(follows.follow(self.readers[3], self.author))
+        self.assertEqual(self.counts(self.author), (4, 0))
+
+    def test_recount(self):
+        """recount_follows исправляет счётчики после обходных изменений."""
+        follows.follow(self.readers[0], self.author)
+        FollowCounts.objects.update(followers=7)
+        Follow.objects.bulk_create(
+            Follow(user=self.author, author=reader)
+            for reader in self.readers[1:3]
+        )
+        follows.recount()
+        self.assertEqual(self.counts(self.author), (1, 2))
+        self.assertEqual(self.counts(self.readers[0]), (0, 1))
+        self.assertEqual(self.counts(self.readers[1]), (1, 0))
+
+    def test_counts_never_negative(self):
+        """Разошедшийся с подписками счётчик не уходит ниже нуля."""
+        follows.follow(self.readers[0], self.author)
+        FollowCounts.objects.filter(user=self.author).update(followers=0)
+        follows.unfollow(self.readers[0], self.author)
+        self.assertEqual(self.counts(self.author), (0, 0))
+
+    def test_bulk_delete_recounts(self):
+        """Массовое удаление подписок пересчитывает счётчики порциями."""
+        for reader in self.readers:
+            follows.follow(reader, self.author)
+        follows.follow(self.author, self.readers[0])
+        bulk.delete_follows(
+            Follow.objects.filter(user__in=self.readers[:3]), chunk_size=2
+        )
+        self.assertEqual(self.counts(self.author), (2, 1))
+        self.assertEqual(self.counts(self.readers[0]), (1, 0))
+        self.assertFalse(FollowCounts.objects.filter(
+            user=self.readers[1]
+        ).exists())
+
+    @mock.patch('posts.views.USER_QUANTITY', 2)
+    def test_followers_pages(self):
+        """Подписчики листаются по курсору, новые — первыми."""
+        for reader in self.readers:
+            follows.follow(reader, self.author)
+        url = reverse('posts:followers', args=(self.author.username,))
+        pages = []
+        response = self.client.get(url)
+        while True:
+            pages.append([
+                person.username for person in response.context['people']
+            ])
+            if response.context['next_before'] is None:
+                break
+            response = self.client.get(
+                url, {'before': response.context['next_before']}
+            )
+        self.assertEqual(
+            pages,
+            [['reader4', 'reader3'], ['reader2', 'reader1'], ['reader0']],
+        )
+        self.assertContains(response, 'Подписчики author: 5')
+
+    def test_following_page(self):
+        """Страница подписок автора."""
+        follows.follow(self.author, self.readers[0])
+        response = self.client.get(
+            reverse('posts:following', args=(self.author.username,))
+        )
+        self.assertEqual(response.context['people'], [self.readers[0]])
+        self.assertIsNone(response.context['next_before'])
@@ -0,0 +1,86 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from posts import recommendations
+from posts.models import Follow, FollowSuggestion, Group, Post
+
+User = get_user_model()
+
+
+class RecommendationTests(TestCase):
+    """Рекомендации «кого почитать»."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = {
+            name: User.objects.create_user(username=name)
+            for name in ('reader', 'fan', 'star', 'hidden', 'poet', 'idle')
+        }
+        # fan подписан на того же star, что и reader, и ещё на hidden
+        for user, author in (('reader', 'star'), ('fan', 'star'),
+                             ('fan', 'hidden')):
+            Follow.objects.create(
+                user=cls.users[user], author=cls.users[author]
+            )
+        poems = Group.objects.create(title='Стихи', slug='poems')
+        for name in ('star', 'poet'):
+            Post.objects.create(
+                text='Стихотворение', author=cls.users[name], group=poems
+            )
+
+    def suggested(self, name):
+        return list(FollowSuggestion.objects.filter(
+            user=self.users[name]
+        ).values_list('author__username', flat=True))
+
+    def test_to_csr(self):
+        """Строки матрицы CSR и транспонированной к ней."""
+        indptr, indices = recommendations.to_csr([2, 0, 2], [1, 2, 0], 3)
+        self.assertEqual(list(indptr), [0, 1, 1, 3])
+        self.assertEqual(list(indices), [2, 1, 0])
+
+    def test_rebuild(self):
+        """Оценки по совместным подпискам и группам, без своих
+        подписок."""
+        written = recommendations.rebuild(batch_size=2)
+        # poet пишет в ту же группу, что и star: близость 1 против
+        # половины подписки fan
+        self.assertEqual(self.suggested('reader'), ['poet', 'hidden'])
+        # У poet подписок нет, но он пишет в те же группы, что и star
+        self.assertEqual(self.suggested('poet'), ['star'])
+        self.assertEqual(self.suggested('idle'), [])
+        self.assertEqual(written, FollowSuggestion.objects.count())
+
+    def test_rebuild_replaces_old(self):
+        """Повторный пересчёт заменяет списки."""
+        call_command(
+            'recommend_follows', '--group-weight', '0', stdout=StringIO()
+        )
+        self.assertEqual(self.suggested('reader'), ['hidden'])
+        Follow.objects.filter(author=self.users['hidden']).delete()
+        call_command('recommend_follows', stdout=StringIO())
+        self.assertEqual(self.suggested('reader'), ['poet'])
+
+    def test_profile_sidebar(self):
+        """Хозяин профиля видит рекомендации, прочитанные одним запросом,
+        без тех, на кого уже подписался."""
+        recommendations.rebuild()
+        reader = self.users['reader']
+        Follow.objects.create(user=reader, author=self.users['poet'])
+        with self.assertNumQueries(1):
+            suggestions = recommendations.suggestions_for(reader)
+            authors = [suggestion.author for suggestion in suggestions]
+        self.assertEqual(authors, [self.users['hidden']])
+        self.client.force_login(reader)
+        response = self.client.get(
+            reverse('posts:profile', args=(reader.username,))
+        )
+        self.assertContains(response, 'Кого почитать')
+        response = self.client.get(
+            reverse('posts:profile', args=('star',))
+        )
+        self.assertNotContains(response, 'Кого почитать')
@@ -0,0 +1,86 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts import sitemaps
+from posts.models import Group, Post, SitemapShard, User
+
+TEMP_SITEMAP_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(SITEMAP_ROOT=TEMP_SITEMAP_ROOT,
+                   SITEMAP_BASE_URL='https://yatube.test')
+class SitemapTests(TestCase):
+    """Карта сайта из нескольких файлов."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='mapper')
+        cls.group = Group.objects.create(title='Карта', slug='map')
+        cls.post = Post.objects.create(
+            text='Пост на карте', author=cls.author, group=cls.group
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_SITEMAP_ROOT, ignore_errors=True)
+
+    def read(self, name):
+        with open(os.path.join(TEMP_SITEMAP_ROOT, name),
+                  encoding='utf-8') as sitemap:
+            return sitemap.read()
+
+    def test_build(self):
+        """Индекс ссылается на файлы разделов, в файлах — адреса."""
+        call_command('build_sitemaps', full=True, stdout=StringIO())
+        index = self.read('sitemap.xml')
+        for section in ('posts', 'profiles', 'groups'):
+            with self.subTest(section=section):
+                self.assertIn(
+                    f'https://yatube.test/sitemaps/{section}-0.xml', index
+                )
+        self.assertIn(
+            'https://yatube.test'
+            + reverse('posts:post_detail', args=(self.post.pk,)),
+            self.read('posts-0.xml'),
+        )
+        self.assertIn('/map/', self.read('groups-0.xml'))
+
+    def test_only_dirty_shards_rebuilt(self):
+        """Повторная сборка трогает только изменившиеся файлы."""
+        sitemaps.build()
+        self.assertEqual(sitemaps.build(), [])
+        self.post.text = 'Исправленный пост'
+        self.post.save()
+        self.assertEqual(
+            sorted(sitemaps.build()),
+            ['groups-0.xml', 'posts-0.xml', 'profiles-0.xml'],
+        )
+        self.assertFalse(SitemapShard.objects.filter(dirty=True).exists())
+
+    def test_shard_numbers(self):
+        """Объект попадает в файл по своему pk."""
+        sitemaps.mark_dirty({SitemapShard.POSTS: [sitemaps.SHARD_SIZE + 1]})
+        self.assertTrue(SitemapShard.objects.filter(
+            section=SitemapShard.POSTS, number=1, dirty=True
+        ).exists())
+
+    def test_served(self):
+        """Индекс и файлы разделов отдаются по своим адресам."""
+        sitemaps.build()
+        response = self.client.get('/sitemap.xml')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'sitemapindex', b''.join(response.streaming_content))
+        response = self.client.get('/sitemaps/posts-0.xml')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.client.get('/sitemaps/posts-9.xml').status_code, 404
+        )
@@ -0,0 +1,113 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.tests.utils import ClearCachesMixin
+from posts import timeline
+from posts.models import Follow, Post
+
+User = get_user_model()
+
+
+@override_settings(TIMELINE_MERGE_MIN_AUTHORS=0)
+class TimelineTests(ClearCachesMixin, TestCase):
+    """Лента подписок слиянием лент авторов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = [
+            User.objects.create_user(username=f'author{number}')
+            for number in range(3)
+        ]
+        for author in cls.authors:
+            Follow.objects.create(user=cls.reader, author=author)
+        stranger = User.objects.create_user(username='stranger')
+        now = timezone.now()
+        # Посты авторов перемежаются во времени, у одного их больше
+        for number in range(12):
+            author = cls.authors[number % 3 if number < 9 else 0]
+            post = Post.objects.create(text=f'Пост {number}', author=author)
+            post.pub_date = now - timedelta(minutes=number)
+            post.save()
+        Post.objects.create(text='Чужой пост', author=stranger)
+
+    def pages(self, engine, per_page=5):
+        return [
+            [post.pk for post in timeline.follow_page(
+                self.reader, number, per_page, engine
+            )]
+            for number in (1, 2, 3)
+        ]
+
+    def test_same_posts_as_join(self):
+        """Слияние отдаёт те же страницы, что и соединение."""
+        self.assertEqual(self.pages('merge'), self.pages('join'))
+
+    def test_next_page_continues_from_cursor(self):
+        """Следующая страница читает только авторов, попавших на неё."""
+        timeline.follow_page(self.reader, 1, 5, 'merge')
+        page = timeline.follow_page(self.reader, 2, 5, 'merge')
+        self.assertEqual(
+            [post.text for post in page],
+            [f'Пост {number}' for number in range(5, 10)],
+        )
+        # Состояние подписок и посты одного автора третьей страницы
+        with self.assertNumQueries(2):
+            page = timeline.follow_page(self.reader, 3, 5, 'merge')
+        self.assertEqual(
+            [post.text for post in page], ['Пост 10', 'Пост 11']
+        )
+        self.assertEqual(page.paginator.count, 12)
+        self.assertEqual(page[0].author_posts_count, 6)
+
+    def test_deleted_head(self):
+        """Удалённый пост, на котором остановилась страница, пропускается."""
+        timeline.follow_page(self.reader, 1, 5, 'merge')
+        Post.objects.filter(text='Пост 5').delete()
+        page = timeline.follow_page(self.reader, 2, 5, 'merge')
+        self.assertEqual(
+            [post.text for post in page],
+            [f'Пост {number}' for number in range(6, 11)],
+        )
+
+    def test_without_cursor(self):
+        """Без курсора страница собирается соединением."""
+        self.assertEqual(
+            [post.text for post in timeline.follow_page(
+                self.reader, 2, 5, 'merge'
+            )],
+            [f'Пост {number}' for number in range(5, 10)],
+        )
+
+    def test_follow_resets_cursors(self):
+        """После отписки и новой подписки старые курсоры не находятся."""
+        timeline.follow_page(self.reader, 1, 5, 'merge')
+        Follow.objects.filter(author=self.authors[0]).delete()
+        self.assertIsNone(timeline.merge_page(self.reader, 2, 5))
+        Follow.objects.create(
+            user=self.reader,
+            author=User.objects.create_user(username='newcomer'),
+        )
+        self.assertIsNone(timeline.merge_page(self.reader, 2, 5))
+
+    @override_settings(TIMELINE_MERGE_MIN_AUTHORS=10)
+    def test_few_authors_skip_heads(self):
+        """При малой подписке головы авторов не читаются."""
+        with mock.patch.object(timeline, 'read_heads') as read_heads:
+            page = timeline.follow_page(self.reader, 1, 5, 'merge')
+        read_heads.assert_not_called()
+        self.assertEqual(len(page), 5)
+
+    def test_view(self):
+        """follow_index отдаёт страницу ленты."""
+        self.client.force_login(self.reader)
+        response = self.client.get(
+            reverse('posts:follow_index'), {'page': 2}
+        )
+        self.assertEqual(response.context['page_obj'].number, 2)
+        self.assertEqual(len(response.context['page_obj']), 2)
@@ -9,6 +9,7 @@ from django import forms
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
 
+from core.tests.utils import shared_caches
 from posts.forms import PostForm
 from posts.models import Group, Post, Follow
 from posts.views import POST_QUANTITY
@@ -444,3 +445,25 @@ class FollowTests(TestCase):
         response = unsubscribed_client.get(reverse('posts:follow_index'))
         context = response.context.get('page_obj').object_list
         self.assertNotIn(self.post1, context)
+
+    @shared_caches()
+    def test_profile_header(self):
+        """Шапка профиля и карточки постов — два запроса к базе."""
+        Follow.objects.create(user=self.user, author=self.author)
+        Follow.objects.create(
+            user=self.author,
+            author=User.objects.create_user(username='other'),
+        )
+        url = reverse('posts:profile', args=(self.author.username,))
+        # Первый запрос кладёт сессию и посетителя в кеш
+        self.authorized_client.get(url)
+        with self.assertNumQueries(2):
+            response = self.authorized_client.get(url)
+        author = response.context['author']
+        self.assertEqual(
+            (author.posts_count, author.followers_count,
+             author.following_count),
+            (2, 1, 1),
+        )
+        self.assertTrue(response.context['following'])
+        self.assertContains(response, 'Количество постов автора 2')
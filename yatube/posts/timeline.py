@@ -0,0 +1,192 @@
+"""Лента подписок (follow_index).
+
+Движок 'join' — одно соединение author__following__user: база собирает
+посты всех авторов подписки и сортирует их целиком, чтобы отдать десять.
+Чем больше подписок и постов у авторов, тем дороже каждая страница.
+
+Движок 'merge' сливает ленты авторов так, как сливают отсортированные
+списки. Голова ленты автора — ключ (pub_date, pk) его следующего
+непоказанного поста. Головы лежат в куче (heapq); очередной пост
+страницы — самая свежая голова, а посты автора читаются пачкой
+по индексу (author, -pub_date), только когда до него дошла очередь.
+Первая страница читает головы всех авторов одним запросом, остальные
+запросы — по одному на автора, попавшего на страницу. Поэтому слияние
+выгодно, когда авторов много (manage.py bench_timeline): при подписке
+меньше чем на TIMELINE_MERGE_MIN_AUTHORS авторов лента собирается
+соединением.
+
+Головы после страницы n — курсор страницы n + 1; курсоры пользователя
+хранятся в кеше TIMELINE_CACHE_ALIAS, поэтому следующая страница
+продолжает слияние, не перечитывая предыдущие. Ключ курсоров включает
+состояние подписок (follow_state), так что после подписки или отписки
+старые курсоры не найдутся ни в одном процессе, даже если кеш у каждого
+процесса свой. Страница без курсора — пришли по прямой ссылке, курсор
+вытеснен из кеша или лежит в кеше другого процесса — собирается
+соединением.
+"""
+import heapq
+from collections import deque
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.paginator import EmptyPage, Page, Paginator
+from django.db.models import Count, Max, OuterRef, Q, Subquery
+
+from .models import Follow, Post
+from .queries import count_of, visible, with_author_posts_count
+
+CURSOR_KEY = 'timeline:{}:{}:{}'
+
+
+def get_cache():
+    return caches[getattr(settings, 'TIMELINE_CACHE_ALIAS', 'default')]
+
+
+def reset(user):
+    """Забывает курсоры ленты пользователя при текущих подписках."""
+    get_cache().delete(CURSOR_KEY.format(user.pk, *follow_state(user)))
+
+
+def follow_state(user):
+    """Число подписок пользователя и id последней из них одним запросом.
+
+    Новая подписка получает id больше прежних, отписка уменьшает число,
+    поэтому пара меняется при любом изменении подписок.
+    """
+    state = Follow.objects.filter(user=user).aggregate(
+        count=Count('pk'), last=Max('pk')
+    )
+    return state['count'], state['last']
+
+
+def read_heads(user):
+    """Головы и число постов авторов подписки одним запросом:
+    ({автор: (pub_date, pk)}, {автор: число постов})."""
+    latest = Post.objects.filter(author=OuterRef('author')).order_by(
+        '-pub_date', '-pk'
+    )
+    rows = Follow.objects.filter(user=user, author__is_active=True).annotate(
+        head_date=Subquery(latest.values('pub_date')[:1]),
+        head_pk=Subquery(latest.values('pk')[:1]),
+        posts_count=count_of(Post.objects.all(), 'author', 'author'),
+    ).values_list('author_id', 'head_date', 'head_pk', 'posts_count')
+    heads = {}
+    counts = {}
+    for author_id, head_date, head_pk, posts_count in rows:
+        if head_pk is not None:
+            heads[author_id] = (head_date, head_pk)
+            counts[author_id] = posts_count
+    return heads, counts
+
+
+def read_batch(author_id, head, size):
+    """До size постов автора, начиная с головы head."""
+    pub_date, pk = head
+    return deque(
+        # Автора могли удалить, пока курсор лежал в кеше
+        visible(Post.objects.filter(author_id=author_id)).filter(
+            Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lte=pk)
+        ).select_related('author', 'group').order_by(
+            '-pub_date', '-pk'
+        )[:size]
+    )
+
+
+def heap_entry(author_id, pub_date, pk):
+    # heapq достаёт наименьшее, а нужен самый свежий пост
+    return (-pub_date.timestamp(), -pk, author_id, pub_date)
+
+
+def merge(heads, size):
+    """Следующие size постов лент с головами heads.
+
+    Возвращает посты и головы после них; авторы, чьи посты кончились,
+    из голов выпадают.
+    """
+    heap = [
+        heap_entry(author_id, pub_date, pk)
+        for author_id, (pub_date, pk) in heads.items()
+    ]
+    heapq.heapify(heap)
+    batches = {}
+    posts = []
+    while heap and len(posts) < size:
+        entry = heapq.heappop(heap)
+        author_id = entry[2]
+        if author_id not in batches:
+            # На страницу попадёт не больше size постов автора, и ещё
+            # один нужен, чтобы знать его следующую голову
+            batches[author_id] = read_batch(
+                author_id, heads[author_id], size + 1
+            )
+        batch = batches[author_id]
+        if batch and (batch[0].pub_date, batch[0].pk) == heads[author_id]:
+            posts.append(batch.popleft())
+        if batch:
+            # Если головной пост удалили, автор встаёт в кучу заново
+            # со своим настоящим следующим постом
+            heads[author_id] = (batch[0].pub_date, batch[0].pk)
+            heapq.heappush(heap, heap_entry(author_id, *heads[author_id]))
+    return posts, {
+        author_id: (pub_date, -negative_pk)
+        for _, negative_pk, author_id, pub_date in heap
+    }
+
+
+def merge_page(user, number, per_page):
+    """Страница ленты слиянием или None, если для неё нет курсора."""
+    count, last = follow_state(user)
+    if count < settings.TIMELINE_MERGE_MIN_AUTHORS:
+        # Посты нескольких авторов соединение отсортирует быстрее,
+        # а головы читать незачем
+        return None
+    cache = get_cache()
+    key = CURSOR_KEY.format(user.pk, count, last)
+    if number == 1:
+        cursors = {}
+        heads, counts = read_heads(user)
+    else:
+        cursors = cache.get(key) or {}
+        if number not in cursors:
+            return None
+        heads, counts = cursors[number]
+    paginator = Paginator(Post.objects.none(), per_page)
+    # Число постов уже известно, отдельный COUNT не нужен
+    paginator.count = sum(counts.values())
+    try:
+        paginator.validate_number(number)
+    except EmptyPage:
+        return None
+    posts, heads = merge(dict(heads), per_page)
+    for post in posts:
+        post.author_posts_count = counts[post.author_id]
+    cursors[number + 1] = (heads, counts)
+    while len(cursors) > settings.TIMELINE_CURSOR_PAGES:
+        del cursors[next(iter(cursors))]
+    cache.set(key, cursors, settings.TIMELINE_CURSOR_TIMEOUT)
+    return Page(posts, number, paginator)
+
+
+def join_page(user, number, per_page):
+    """Страница ленты одним соединением с подписками."""
+    posts = with_author_posts_count(
+        visible(Post.objects.filter(
+            author__following__user=user
+        )).select_related('author', 'group').order_by('-pub_date', '-pk')
+    )
+    return Paginator(posts, per_page).get_page(number)
+
+
+def follow_page(user, number, per_page, engine=None):
+    """Страница number ленты подписок; номер — как у Paginator.get_page.
+    engine — 'merge' или 'join', по умолчанию FOLLOW_FEED_ENGINE."""
+    engine = engine or settings.FOLLOW_FEED_ENGINE
+    try:
+        number = int(number)
+    except (TypeError, ValueError):
+        number = 1
+    if engine == 'merge' and number >= 1:
+        page = merge_page(user, number, per_page)
+        if page is not None:
+            return page
+    return join_page(user, number, per_page)
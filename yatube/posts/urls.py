@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import feeds, views
 
 
 # Эта строчка обязательна.
@@ -36,4 +36,26 @@ urlpatterns = [
         views.profile_unfollow,
         name='profile_unfollow'
     ),
+    path(
+        'profile/<str:username>/followers/',
+        views.followers,
+        name='followers'
+    ),
+    path(
+        'profile/<str:username>/following/',
+        views.following,
+        name='following'
+    ),
+    # Ленты RSS и Atom
+    path('feeds/rss/', feeds.latest_rss, name='feed_rss'),
+    path('feeds/atom/', feeds.latest_atom, name='feed_atom'),
+    path('group/<slug:slug>/rss/', feeds.group_rss, name='group_feed_rss'),
+    path('group/<slug:slug>/atom/', feeds.group_atom,
+         name='group_feed_atom'),
+    path('profile/<str:username>/rss/', feeds.author_rss,
+         name='profile_feed_rss'),
+    path('profile/<str:username>/atom/', feeds.author_atom,
+         name='profile_feed_atom'),
+    # Выгрузка своих данных
+    path('export/', views.export_data, name='export_data'),
 ]
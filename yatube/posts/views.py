@@ -1,19 +1,33 @@
 from django.core.paginator import Paginator
 from django.contrib.auth.models import User
 from django.contrib.auth.decorators import login_required
+from django.db.models import BooleanField, Exists, OuterRef, Value
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
 
+from core.cache import page_cache
 
+from . import follows
+from .recommendations import suggestions_for
 from .models import Post, Group, Comment, Follow
 from .forms import PostForm, CommentForm
+from .export import EXPORT_FORMATS, stream_export
+from .queries import (
+    count_of, visible, with_author_posts_count, with_follow_counts,
+)
+from .timeline import follow_page
 
 POST_QUANTITY = 10
+USER_QUANTITY = 50
 CACHE_REFRESH = 20
 
 
+@page_cache(lambda: ('feed',))
 def index(request):
     """Главная страница с постами."""
-    posts = Post.objects.select_related('author').select_related('group').all()
+    posts = with_author_posts_count(visible(
+        Post.objects.select_related('author').select_related('group').all()
+    ))
     paginator = Paginator(posts, POST_QUANTITY)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
@@ -28,10 +42,13 @@ def index(request):
     return render(request, 'posts/index.html', context)
 
 
+@page_cache(lambda slug: (f'group:{slug}',))
 def group_posts(request, slug):
     """Страница группы с постами."""
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    group = get_object_or_404(Group, slug=slug, deleted__isnull=True)
+    posts = with_author_posts_count(
+        visible(group.posts.select_related('author'))
+    )
     paginator = Paginator(posts, POST_QUANTITY)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
@@ -44,35 +61,63 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@page_cache(lambda username: (f'author:{username}',))
 def profile(request, username):
-    """Страница с постами автора."""
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
+    """Страница с постами автора.
+
+    Профиль неактивного пользователя — удалённого или заблокированного —
+    отвечает 404, как и его посты на других страницах (posts.deletion).
+
+    Всё для шапки — автор, число его постов, подписчиков и подписок
+    (счётчики FollowCounts) и подписан ли на него посетитель — читается
+    одним запросом, второй запрос — сама страница постов. На своём
+    профиле третий запрос читает рекомендации «кого почитать».
+    """
+    if request.user.is_authenticated:
+        following = Exists(Follow.objects.filter(
+            user=request.user, author=OuterRef('pk')
+        ))
+    else:
+        following = Value(False, output_field=BooleanField())
+    author = get_object_or_404(
+        with_follow_counts(User.objects.annotate(
+            posts_count=count_of(Post.objects.all(), 'author'),
+            is_following=following,
+        )),
+        username=username,
+        is_active=True,
+    )
+    posts = author.posts.select_related('group')
     paginator = Paginator(posts, POST_QUANTITY)
+    # Число постов уже известно, отдельный COUNT не нужен
+    paginator.count = author.posts_count
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
-
-    following = (request.user.is_authenticated
-                 and request.user.follower.filter(
-                     user=request.user,
-                     author=author
-                 ).exists())
+    for post in page_obj:
+        # Карточкам не нужно загружать автора заново
+        post.author = author
+        post.author_posts_count = author.posts_count
 
     context = {
         'author': author,
         'page_obj': page_obj,
-        'posts_count': author.posts.count(),
-        'following': following,
+        'posts_count': author.posts_count,
+        'following': author.is_following,
+        # Рекомендации видит только хозяин профиля
+        'suggestions': (
+            suggestions_for(author) if request.user == author else []
+        ),
         'cache_refresh': CACHE_REFRESH,
     }
 
     return render(request, 'posts/profile.html', context)
 
 
+@page_cache(lambda post_id: (f'post:{post_id}',))
 def post_detail(request, post_id):
     """Страница одного поста."""
-    post = get_object_or_404(Post, pk=post_id)
-    comment = Comment.objects.filter(post=post_id)
+    post = get_object_or_404(visible(Post.objects.all()), pk=post_id)
+    comment = visible(Comment.objects.filter(post=post_id))
     form = CommentForm(request.POST or None)
 
     context = {
@@ -83,7 +128,10 @@ def post_detail(request, post_id):
         'form': form,
     }
 
-    return render(request, 'posts/post_detail.html', context)
+    response = render(request, 'posts/post_detail.html', context)
+    # На странице есть число постов автора
+    response.cache_tags = (f'author:{post.author.username}',)
+    return response
 
 
 @login_required
@@ -145,11 +193,12 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
+    """Лента постов авторов, на которых подписан пользователь
+    (см. posts.timeline)."""
+    page_obj = follow_page(
+        request.user, request.GET.get('page'), POST_QUANTITY
+    )
     follow = True
-    paginator = Paginator(post_list, POST_QUANTITY)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
     context = {
         'page_obj': page_obj,
         'follow': follow,
@@ -160,14 +209,85 @@ def follow_index(request):
 
 @login_required
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(User, username=username, is_active=True)
     if author != request.user:
-        Follow.objects.get_or_create(user=request.user, author=author)
+        follows.follow(request.user, author)
     return redirect("posts:profile", username=username)
 
 
 @login_required
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    Follow.objects.filter(user=request.user, author=author).delete()
+    follows.unfollow(request.user, author)
     return redirect("posts:profile", username=username)
+
+
+def follow_list(request, username, kind):
+    """Подписчики (kind='followers') или подписки автора.
+
+    Страницы листаются по курсору ?before=<id подписки>, а не по номеру:
+    каждая следующая страница читается по индексу так же быстро, как
+    первая, сколько бы подписчиков ни было. Удалённые и заблокированные
+    пользователи в списках не показываются (posts.deletion).
+    """
+    author = get_object_or_404(
+        with_follow_counts(User.objects.all()),
+        username=username,
+        is_active=True,
+    )
+    if kind == 'followers':
+        subscriptions = Follow.objects.filter(
+            author=author, user__is_active=True
+        ).select_related('user')
+        person = 'user'
+    else:
+        subscriptions = Follow.objects.filter(
+            user=author, author__is_active=True
+        ).select_related('author')
+        person = 'author'
+    before = request.GET.get('before', '')
+    if before.isdigit():
+        subscriptions = subscriptions.filter(pk__lt=before)
+    rows = list(subscriptions.order_by('-pk')[:USER_QUANTITY + 1])
+    next_before = None
+    if len(rows) > USER_QUANTITY:
+        rows = rows[:USER_QUANTITY]
+        next_before = rows[-1].pk
+
+    context = {
+        'author': author,
+        'kind': kind,
+        'people': [getattr(row, person) for row in rows],
+        'next_before': next_before,
+        'is_first': not before.isdigit(),
+    }
+    return render(request, 'posts/follow_list.html', context)
+
+
+@page_cache(lambda username: (f'author:{username}',))
+def followers(request, username):
+    """Подписчики автора."""
+    return follow_list(request, username, 'followers')
+
+
+@page_cache(lambda username: (f'author:{username}',))
+def following(request, username):
+    """На кого подписан автор."""
+    return follow_list(request, username, 'following')
+
+
+@login_required
+def export_data(request):
+    """Выгрузка своих постов, комментариев и подписок файлом."""
+    export_format = request.GET.get('format', 'jsonl')
+    if export_format not in EXPORT_FORMATS:
+        raise Http404('Неизвестный формат выгрузки')
+    content_type, extension = EXPORT_FORMATS[export_format]
+    response = StreamingHttpResponse(
+        stream_export(request.user, export_format),
+        content_type=content_type,
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="yatube-{request.user.username}.{extension}"'
+    )
+    return response
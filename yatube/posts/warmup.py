@@ -0,0 +1,56 @@
+"""Какие страницы постов греть после деплоя (CACHE_WARMUP_PATHS).
+
+Посещений мы не считаем, поэтому «популярность» оценивается по данным,
+которые есть: группы — по числу свежих постов, профили — по числу
+подписчиков, посты — по числу свежих комментариев.
+"""
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Q
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Group, Post
+from .queries import visible
+from .views import POST_QUANTITY
+
+User = get_user_model()
+
+# За какой период считать активность групп и постов
+ACTIVITY_DAYS = 30
+
+
+def warmup_paths(pages=5, groups=10, profiles=10, posts=20):
+    """Первые pages страниц главной, затем самые активные группы,
+    профили с наибольшим числом подписчиков и самые обсуждаемые
+    посты."""
+    since = timezone.now() - timedelta(days=ACTIVITY_DAYS)
+    index = reverse('posts:index')
+    yield index
+    # Несуществующие страницы paginator.get_page отдаёт как последнюю:
+    # их прогрев только рисует её ещё раз под другим ключом
+    count = visible(Post.objects.all()).count()
+    pages = min(pages, -(-count // POST_QUANTITY))
+    for page in range(2, pages + 1):
+        yield f'{index}?page={page}'
+
+    active_groups = Group.objects.filter(deleted__isnull=True).annotate(
+        recent=Count('posts', filter=Q(posts__pub_date__gte=since))
+    ).filter(recent__gt=0).order_by('-recent').values_list('slug', flat=True)
+    for slug in active_groups[:groups]:
+        yield reverse('posts:group_posts', args=(slug,))
+
+    followed = User.objects.filter(is_active=True).annotate(
+        followers=Count('following')
+    ).filter(followers__gt=0).order_by('-followers').values_list(
+        'username', flat=True
+    )
+    for username in followed[:profiles]:
+        yield reverse('posts:profile', args=(username,))
+
+    discussed = Post.objects.annotate(
+        recent=Count('comments', filter=Q(comments__created__gte=since))
+    ).filter(recent__gt=0).order_by('-recent').values_list('pk', flat=True)
+    for pk in discussed[:posts]:
+        yield reverse('posts:post_detail', args=(pk,))
@@ -1,3 +1,18 @@
-# from django.contrib import admin
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 
-# Register your models here.
+from core.admin import SoftDeleteAdminMixin
+from posts.deletion import soft_delete_user
+
+User = get_user_model()
+
+
+class UserAdmin(SoftDeleteAdminMixin, BaseUserAdmin):
+    actions = ('delete_in_background',)
+    show_full_result_count = False
+    soft_delete_function = soft_delete_user
+
+
+admin.site.unregister(User)
+admin.site.register(User, UserAdmin)
@@ -0,0 +1,122 @@
+"""Загрузка пользователя сессии через кеш.
+
+В кеше по id пользователя лежит компактный снимок строки auth_user
+(SNAPSHOT_FIELDS, без хеша пароля) вместе с get_session_auth_hash()
+для сессии. Снимок подходит, только если этот
+хеш совпадает с хешем в сессии и бэкенд по-прежнему пускает
+пользователя (is_active), иначе пользователь загружается обычным
+путём — с проверками и сбросом сессии при смене пароля.
+
+Снимок сбрасывают сигналы сохранения и удаления пользователя, поэтому
+кеш AUTH_USER_CACHE_ALIAS должен быть общим для всех процессов:
+на locmem снимки выключены. Изменения через QuerySet.update() сигналов
+не шлют — после них зовите forget_snapshot(), иначе старые данные
+продержатся до AUTH_USER_CACHE_TIMEOUT.
+"""
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.db import router
+from django.utils.crypto import constant_time_compare
+
+from core.cache import is_shared
+
+SNAPSHOT_KEY = 'auth_user:{}'
+
+# Поля, нужные шаблонам и проверкам доступа. Хеш пароля в общий кеш
+# не кладётся: для сессии хватает хеша из get_session_auth_hash,
+# остальные поля догружаются из базы при обращении
+SNAPSHOT_FIELDS = (
+    'id', 'username', 'first_name', 'last_name', 'email',
+    'is_staff', 'is_superuser', 'is_active', 'last_login',
+)
+
+
+def get_cache_alias():
+    return getattr(settings, 'AUTH_USER_CACHE_ALIAS', 'default')
+
+
+def get_user_cache():
+    return caches[get_cache_alias()]
+
+
+def is_enabled():
+    return is_shared(get_cache_alias())
+
+
+def snapshot_key(user_id):
+    return SNAPSHOT_KEY.format(user_id)
+
+
+def make_snapshot(user):
+    fields = [
+        field.attname for field in user._meta.concrete_fields
+        if field.name in SNAPSHOT_FIELDS
+    ]
+    return {
+        'hash': user.get_session_auth_hash(),
+        'db': user._state.db,
+        'fields': fields,
+        'values': [getattr(user, name) for name in fields],
+    }
+
+
+def load_snapshot(user_id, session_hash, backend):
+    snapshot = get_user_cache().get(snapshot_key(user_id))
+    if (snapshot is None
+            or not session_hash
+            or not constant_time_compare(snapshot['hash'], session_hash)):
+        return None
+    model = get_user_model()
+    user = model.from_db(
+        snapshot.get('db') or router.db_for_read(model),
+        snapshot['fields'],
+        snapshot['values'],
+    )
+    # Та же проверка, что в ModelBackend.get_user
+    can_authenticate = getattr(backend, 'user_can_authenticate', None)
+    if can_authenticate is not None and not can_authenticate(user):
+        return None
+    return user
+
+
+def store_snapshot(user):
+    get_user_cache().set(
+        snapshot_key(user.pk),
+        make_snapshot(user),
+        getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 300),
+    )
+
+
+def forget_snapshot(user_id):
+    if is_enabled():
+        get_user_cache().delete(snapshot_key(user_id))
+
+
+def get_user(request):
+    """Аналог django.contrib.auth.get_user, читающий снимок из кеша."""
+    session = request.session
+    try:
+        user_id = get_user_model()._meta.pk.to_python(
+            session[auth.SESSION_KEY]
+        )
+        backend_path = session[auth.BACKEND_SESSION_KEY]
+    except KeyError:
+        return AnonymousUser()
+    if (not is_enabled()
+            or backend_path not in settings.AUTHENTICATION_BACKENDS):
+        return auth.get_user(request)
+    user = load_snapshot(
+        user_id,
+        session.get(auth.HASH_SESSION_KEY),
+        auth.load_backend(backend_path),
+    )
+    if user is not None:
+        user.backend = backend_path
+        return user
+    user = auth.get_user(request)
+    if user.is_authenticated:
+        store_snapshot(user)
+    return user
@@ -0,0 +1,54 @@
+import time
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+DB_ENGINES = (
+    'django.contrib.sessions.backends.db',
+    'django.contrib.sessions.backends.cached_db',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет просроченные сессии из django_session небольшими '
+        'порциями, не блокируя базу надолго.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько строк удалять за одну транзакцию.',
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0.0,
+            help='Пауза между порциями в секундах.',
+        )
+
+    def handle(self, *args, **options):
+        if settings.SESSION_ENGINE not in DB_ENGINES:
+            self.stdout.write(
+                f'{settings.SESSION_ENGINE} не хранит сессии в базе, '
+                'удаляем только оставшиеся от прежнего режима.'
+            )
+        batch_size = options['batch_size']
+        now = timezone.now()
+        expired = Session.objects.filter(expire_date__lt=now)
+        deleted = 0
+        while True:
+            keys = list(
+                expired.values_list('session_key', flat=True)[:batch_size]
+            )
+            if not keys:
+                break
+            Session.objects.filter(session_key__in=keys).delete()
+            deleted += len(keys)
+            if options['verbosity'] > 1:
+                self.stdout.write(f'Удалено {deleted}...')
+            if options['pause']:
+                time.sleep(options['pause'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Удалено просроченных сессий: {deleted}')
+        )
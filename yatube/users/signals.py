@@ -0,0 +1,15 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .auth import forget_snapshot
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_user_snapshot(sender, instance, **kwargs):
+    """Любое сохранение пользователя, включая смену пароля,
+    делает снимок в кеше недействительным."""
+    forget_snapshot(instance.pk)
@@ -0,0 +1,94 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.tests.utils import ClearCachesMixin, shared_caches
+
+User = get_user_model()
+
+
+@shared_caches()
+class CachedUserTests(ClearCachesMixin, TestCase):
+    """Загрузка пользователя сессии из кеша."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(
+            username='cached-user', password='old-password'
+        )
+        self.authorized_client = Client()
+        self.authorized_client.login(
+            username='cached-user', password='old-password'
+        )
+        self.url = reverse('posts:follow_index')
+
+    def user_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(self.url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        return [
+            query for query in queries if 'FROM "auth_user"' in query['sql']
+        ]
+
+    def test_repeat_request_skips_user_query(self):
+        """Повторный запрос не читает auth_user."""
+        self.assertEqual(len(self.user_queries()), 1)
+        self.assertEqual(self.user_queries(), [])
+
+    def test_snapshot_without_password(self):
+        """В кеше нет хеша пароля, только нужные страницам поля."""
+        self.authorized_client.get(self.url)
+        snapshot = caches['sessions'].get(f'auth_user:{self.user.pk}')
+        self.assertNotIn('password', snapshot['fields'])
+        self.assertNotIn(self.user.password, snapshot['values'])
+        self.assertIn('username', snapshot['fields'])
+
+    def test_user_save_refreshes_snapshot(self):
+        """Изменения пользователя видны на следующей странице."""
+        self.authorized_client.get(self.url)
+        self.user.first_name = 'Новое'
+        self.user.save()
+        self.assertEqual(len(self.user_queries()), 1)
+        response = self.authorized_client.get(self.url)
+        self.assertEqual(response.context['user'].first_name, 'Новое')
+
+    def test_password_change_logs_out_other_sessions(self):
+        """После смены пароля старая сессия больше не действует."""
+        self.authorized_client.get(self.url)
+        self.user.set_password('new-password')
+        self.user.save()
+        response = self.authorized_client.get(self.url)
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    def test_deactivated_user_logged_out(self):
+        """Снимок не пускает пользователя, которого отключили."""
+        self.authorized_client.get(self.url)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        snapshot = caches['sessions'].get(f'auth_user:{self.user.pk}')
+        snapshot['values'][
+            snapshot['fields'].index('is_active')
+        ] = False
+        caches['sessions'].set(f'auth_user:{self.user.pk}', snapshot)
+        response = self.authorized_client.get(self.url)
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+
+class LocalCacheTests(TestCase):
+    """На кеше одного процесса снимки не используются."""
+
+    def test_locmem_disabled(self):
+        user = User.objects.create_user(username='local-user')
+        client = Client()
+        client.force_login(user)
+        url = reverse('posts:follow_index')
+        client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            client.get(url)
+        self.assertTrue(any(
+            'FROM "auth_user"' in query['sql'] for query in queries
+        ))
@@ -0,0 +1,97 @@
+import os
+import subprocess
+import sys
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.tests.utils import ClearCachesMixin
+from posts.models import Follow, Post
+
+User = get_user_model()
+
+
+class SessionModeTests(ClearCachesMixin, TestCase):
+    """Режимы хранения сессий и число запросов к базе."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='session-user')
+        cls.author = User.objects.create_user(username='session-author')
+        Follow.objects.create(user=cls.user, author=cls.author)
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+        cls.urls = (
+            reverse('posts:follow_index'),
+            reverse('posts:post_detail', args=(cls.post.pk,)),
+        )
+
+    def count_queries(self, mode):
+        """Число запросов на повторный заход на каждую страницу."""
+        with override_settings(SESSION_ENGINE=settings.SESSION_ENGINES[mode]):
+            client = Client()
+            client.force_login(self.user)
+            counts = []
+            for url in self.urls:
+                client.get(url)
+                with CaptureQueriesContext(connection) as queries:
+                    client.get(url)
+                session_queries = [
+                    query for query in queries
+                    if 'django_session' in query['sql']
+                ]
+                self.assertEqual(len(session_queries), mode == 'db')
+                counts.append(len(queries))
+            return counts
+
+    def test_session_query_dropped(self):
+        """cached_db и signed_cookies экономят запрос к django_session."""
+        db_counts = self.count_queries('db')
+        for mode in ('cached_db', 'signed_cookies'):
+            with self.subTest(mode=mode):
+                self.assertEqual(
+                    self.count_queries(mode),
+                    [count - 1 for count in db_counts],
+                )
+
+    def test_purge_sessions_removes_only_expired(self):
+        """purge_sessions удаляет просроченные сессии порциями."""
+        now = timezone.now()
+        for number in range(5):
+            Session.objects.create(
+                session_key=f'expired{number}',
+                session_data='',
+                expire_date=now - timedelta(days=1),
+            )
+        Session.objects.create(
+            session_key='alive', session_data='',
+            expire_date=now + timedelta(days=1),
+        )
+        out = StringIO()
+        call_command('purge_sessions', batch_size=2, stdout=out)
+        self.assertIn('5', out.getvalue())
+        self.assertEqual(
+            list(Session.objects.values_list('session_key', flat=True)),
+            ['alive'],
+        )
+
+    def test_unknown_mode(self):
+        """Неизвестный SESSION_MODE — понятная ошибка настройки."""
+        result = subprocess.run(
+            [sys.executable, '-c', 'import yatube.settings'],
+            cwd=settings.BASE_DIR,
+            env={**os.environ, 'SESSION_MODE': 'memory'},
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+        )
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn('ImproperlyConfigured', result.stderr)
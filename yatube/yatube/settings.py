@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -40,6 +42,7 @@ INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'posts.apps.PostsConfig',
     'users.apps.UsersConfig',
+    'jobs.apps.JobsConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -51,11 +54,20 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     # 'querycount.middleware.QueryCountMiddleware',
+    # Первой: в профиль попадает вся цепочка
+    'core.middleware.ProfilingMiddleware',
+    'core.middleware.SlowQueryMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.StaticFilesMiddleware',
+    'core.middleware.MetricsMiddleware',
+    # Сжимаем последними: кеши фрагментов и страниц хранят несжатый HTML
+    'core.middleware.CompressionMiddleware',
+    # До сессий и аутентификации: попадание в кеш их не затрагивает
+    'core.middleware.AnonymousPageCacheMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'users.middleware.CachedAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -134,15 +146,44 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 
+STATIC_ROOT = os.path.join(BASE_DIR, 'collected_static')
+
+# Хеш содержимого в именах файлов и сжатые .gz/.br копии
+STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
+
+# max-age для статики без хеша в имени (в секундах)
+STATIC_MAX_AGE = 60
+
+# Сжатие ответов (brotli, если установлен, иначе gzip)
+
+COMPRESSION_MIN_SIZE = 512
+
+COMPRESSION_CONTENT_TYPES = (
+    'text/html',
+    'text/plain',
+    'text/css',
+    'text/csv',
+    'application/javascript',
+    'application/json',
+    'application/xml',
+    'application/rss+xml',
+    'application/atom+xml',
+    'image/svg+xml',
+)
+
+COMPRESSION_STREAMING = True
+
 # User authentication and authorisation
 
 LOGIN_URL = 'users:login'
 
 LOGIN_REDIRECT_URL = 'posts:index'
 
-# Connecting the engine filebased.EmailBackend
+# Письма отправляются фоновой задачей через filebased.EmailBackend
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+EMAIL_BACKEND = 'jobs.mail.QueuedEmailBackend'
+
+JOBS_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
@@ -151,8 +192,186 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Раздавать MEDIA_URL самим Django (core.media.serve_media)
+MEDIA_SERVE = True
+
+# max-age для файлов, имя которых не определяется содержимым
+MEDIA_MAX_AGE = 60 * 60
+
+# Передача файла фронт-прокси: None, 'x-sendfile' (Apache, lighttpd)
+# или 'x-accel-redirect' (nginx, internal location MEDIA_ACCEL_PREFIX)
+MEDIA_SENDFILE = None
+
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    # Кеш страниц тоже должен быть общим (PAGES_CACHE_BACKEND
+    # и PAGES_CACHE_LOCATION), иначе он выключен
+    'pages': {
+        'BACKEND': os.getenv(
+            'PAGES_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.getenv('PAGES_CACHE_LOCATION', 'pages'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+        },
+    },
+    # Общий для всех процессов кеш (memcached, redis) задаётся
+    # в SESSIONS_CACHE_BACKEND и SESSIONS_CACHE_LOCATION
+    'sessions': {
+        'BACKEND': os.getenv(
+            'SESSIONS_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.getenv('SESSIONS_CACHE_LOCATION', 'sessions'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+}
+
+# Кеши, которые видит только свой процесс. Сессии, снимки
+# пользователей и целые страницы в них держать нельзя: выход, смену
+# пароля или новый пост в одном процессе не заметят остальные
+# (core.cache.is_shared)
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+# Хранилище сессий:
+# 'db' — каждая страница читает django_session;
+# 'cached_db' — чтение из кеша, запись сквозная в кеш и БД;
+# 'signed_cookies' — сессия целиком в подписанной cookie, без БД.
+# По умолчанию cached_db, если кеш sessions общий для процессов, иначе db.
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
 }
+
+SESSION_CACHE_ALIAS = 'sessions'
+
+SESSION_MODE = os.getenv('SESSION_MODE') or (
+    'db' if CACHES[SESSION_CACHE_ALIAS]['BACKEND'] in PROCESS_LOCAL_CACHES
+    else 'cached_db'
+)
+
+if SESSION_MODE not in SESSION_ENGINES:
+    raise ImproperlyConfigured(
+        f'SESSION_MODE={SESSION_MODE!r}: ожидается одно из '
+        f'{", ".join(SESSION_ENGINES)}'
+    )
+
+SESSION_ENGINE = SESSION_ENGINES[SESSION_MODE]
+
+# Снимки пользователей сессий, чтобы не читать auth_user на каждой
+# странице (users.auth); на кеше из PROCESS_LOCAL_CACHES выключены
+AUTH_USER_CACHE_ALIAS = 'sessions'
+
+AUTH_USER_CACHE_TIMEOUT = 60 * 5
+
+# Кеш фрагментов шаблонов (core/templatetags/fragment_cache.py)
+
+# Сколько секунд после срока отдавать старый фрагмент, пока один запрос
+# рисует новый
+FRAGMENT_CACHE_STALE = 60
+
+# Сколько секунд держится блокировка перерисовки фрагмента
+FRAGMENT_CACHE_LOCK_TIMEOUT = 10
+
+# Множитель вероятности досрочной перерисовки; 0 — только по сроку
+FRAGMENT_CACHE_BETA = 1.0
+
+# Кеш целых страниц для анонимных посетителей (core.middleware);
+# на кеше из PROCESS_LOCAL_CACHES выключен
+
+PAGE_CACHE_ALIAS = 'pages'
+
+PAGE_CACHE_TIMEOUT = 60 * 5
+
+# GET-параметры, от которых зависит страница; остальные не влияют на ключ
+PAGE_CACHE_QUERY_PARAMS = ('page', 'before')
+
+# Очередь фоновых задач (manage.py run_workers)
+
+# Через сколько секунд задача зависшего обработчика вернётся в очередь
+JOBS_LOCK_TIMEOUT = 60 * 5
+
+# Выполнять задачи сразу в процессе, без очереди
+JOBS_EAGER = False
+
+# Через сколько секунд удалять картинку, на которую не осталось ссылок
+BLOB_GRACE_PERIOD = 60 * 60
+
+# Файлы карты сайта, их пишет manage.py build_sitemaps
+SITEMAP_ROOT = os.path.join(BASE_DIR, 'sitemaps')
+
+# Адрес сайта для ссылок в карте сайта
+SITEMAP_BASE_URL = os.getenv('SITEMAP_BASE_URL', 'http://localhost:8000')
+
+# Профили запросов с токеном сотрудника (core.profiling)
+PROFILE_ROOT = os.path.join(BASE_DIR, 'profiles')
+
+# Сколько последних профилей хранить
+PROFILE_KEEP = 50
+
+# Сколько секунд действует токен профилирования
+PROFILE_TOKEN_MAX_AGE = 60 * 60
+
+# Порог медленного запроса к базе в миллисекундах (core.slowqueries);
+# None — не записывать
+SLOW_QUERY_THRESHOLD = 100
+
+# Метрики Prometheus на /metrics (core.metrics)
+
+# Каталог, через который процессы складывают метрики; без него /metrics
+# показывает только процесс, ответивший на запрос. Файлы завершившихся
+# процессов переносятся в dead.json; каталог должен быть общим только
+# для процессов одной машины (проверка по pid).
+METRICS_DIR = os.getenv('METRICS_DIR') or None
+
+# Как часто процесс сбрасывает свои метрики в METRICS_DIR (в секундах)
+METRICS_FLUSH_INTERVAL = 5
+
+# Токен для заголовка Authorization: Bearer <токен>; без токена метрики
+# видят только сотрудники
+METRICS_TOKEN = os.getenv('METRICS_TOKEN') or None
+
+# Лента подписок (posts.timeline): 'merge' — слияние лент авторов
+# с курсорами в кеше, 'join' — одно соединение с подписками
+FOLLOW_FEED_ENGINE = os.getenv('FOLLOW_FEED_ENGINE', 'merge')
+
+# С какого числа авторов в подписке лента собирается слиянием
+TIMELINE_MERGE_MIN_AUTHORS = 50
+
+# Кеш курсоров ленты подписок. Ключи версионированы подписками, так что
+# свой кеш у каждого процесса не ошибается, но курсор из другого процесса
+# не найдётся и страница соберётся соединением; лучше общий кеш
+TIMELINE_CACHE_ALIAS = 'default'
+
+# Сколько секунд и для скольких страниц пользователя хранить курсоры
+TIMELINE_CURSOR_TIMEOUT = 60 * 30
+TIMELINE_CURSOR_PAGES = 20
+
+# Замеряет время создания миниатюр
+THUMBNAIL_BACKEND = 'core.thumbnails.TimedThumbnailBackend'
+
+# Прогрев кешей после деплоя (core.warmup, manage.py warm_caches)
+
+# Функция, возвращающая адреса для прогрева
+CACHE_WARMUP_PATHS = 'posts.warmup.warmup_paths'
+
+# Греть кеши каждого процесса при старте из wsgi.py
+CACHE_WARMUP_ON_BOOT = os.getenv('CACHE_WARMUP_ON_BOOT') == '1'
+
+# Host запросов прогрева (с портом, если он не стандартный): ключ кеша
+# страниц зависит от него, поэтому он должен совпадать с Host настоящих
+# посетителей. По умолчанию — первый конкретный адрес из ALLOWED_HOSTS
+CACHE_WARMUP_HOST = os.getenv('CACHE_WARMUP_HOST') or None
+
+CACHE_WARMUP_THREADS = 4
@@ -14,23 +14,46 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+
+from core.media import serve_media, serve_sitemap
+from core.views import profile_download, profiles, prometheus_metrics
 
 urlpatterns = [
     path('', include('posts.urls', namespace='posts')),
     path('about/', include('about.urls', namespace='about')),
     path('auth/', include('users.urls', namespace='auth')),
+    # Страницы админки, не привязанные к моделям, — до admin.site.urls
+    path('admin/profiles/', profiles, name='profiles'),
+    re_path(
+        r'^admin/profiles/(?P<name>[\w-]+\.(?:pstats|txt))$',
+        profile_download,
+        name='profile_download',
+    ),
     path('admin/', admin.site.urls),
+    path('metrics', prometheus_metrics, name='metrics'),
     path('auth/', include('django.contrib.auth.urls')),
 ]
 
+# Карту сайта собирает manage.py build_sitemaps
+urlpatterns += [
+    path('sitemap.xml', serve_sitemap, name='sitemap'),
+    re_path(
+        r'^sitemaps/(?P<path>[\w-]+\.xml)$', serve_sitemap,
+        name='sitemap_shard',
+    ),
+]
+
 handler403 = 'core.views.permission_denied'
 handler404 = 'core.views.page_not_found'
 handler500 = 'core.views.server_error'
 
-if settings.DEBUG:
-    urlpatterns += static(
-        settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
-    )
+if settings.MEDIA_SERVE:
+    urlpatterns += [
+        re_path(
+            r'^{}(?P<path>.+)$'.format(settings.MEDIA_URL.lstrip('/')),
+            serve_media,
+            name='media',
+        ),
+    ]
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+# Прогрев кешей процесса, если включён CACHE_WARMUP_ON_BOOT
+from core.warmup import warm_on_boot  # noqa: E402
+
+warm_on_boot(application)